@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: AccountTree build time, memory and query speed.
+
+Builds an AccountTree from a synthetic chart (50k accounts by default)
+and compares its retained memory with the list of frappe._dict rows it
+is built from, then times the tree queries used by the commands.
+
+Usage:
+    python3 benchmarks/bench_account_tree.py [--nodes 50000] [--fanout 8] [--repeat 1000]
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_find_children import FakeFrappe, _dict, build_synthetic_tree, install_fake, load_command_module
+
+
+def measure(func):
+    """
+    Return (result, seconds, bytes still allocated by the result).
+
+    Timed and traced in two separate calls, as tracemalloc slows
+    allocation-heavy code down several times.
+    """
+    gc.collect()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+
+    gc.collect()
+    tracemalloc.start()
+    result = func()
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, retained
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    return result, (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=50000)
+    parser.add_argument('--fanout', type=int, default=8)
+    parser.add_argument('--repeat', type=int, default=1000, help='Repetitions of the O(1)/O(depth) queries')
+    args = parser.parse_args()
+
+    accounts = build_synthetic_tree(args.nodes, args.fanout)
+    install_fake(FakeFrappe(accounts))
+    account_tree = load_command_module('account_tree')
+    fields = ('account_name', 'is_group')
+
+    print(f"\n{'='*60}")
+    print(f"AccountTree micro-benchmark")
+    print(f"   Nodes: {args.nodes}  Fan-out: {args.fanout}")
+    print(f"{'='*60}\n")
+
+    # What frappe.get_all(..., order_by='lft asc') hands back: one _dict per account
+    accounts.sort(key=lambda a: a['lft'])
+    rows, _, rows_bytes = measure(lambda: [
+        _dict((f, a[f]) for f in ('name', 'parent_account') + fields) for a in accounts
+    ])
+    tree, build_time, tree_bytes = measure(lambda: account_tree.AccountTree.from_rows(rows, fields=fields))
+
+    print(f"   Build from rows:      {build_time*1000:>10.1f} ms")
+    print(f"   Rows (frappe._dict):  {rows_bytes/1e6:>10.2f} MB")
+    print(f"   AccountTree:          {tree_bytes/1e6:>10.2f} MB (names shared with the rows)\n")
+
+    names = [a['name'] for a in accounts]
+    rng = random.Random(42)
+    pairs = [(rng.choice(names), rng.choice(names)) for _ in range(args.repeat)]
+    deepest = max(names, key=tree.depth)
+    root = tree.roots()[0]
+    middle = tree.children(root)[0]
+
+    checks = [
+        ('is_under (random pairs)', lambda: [tree.is_under(a, b) for a, b in pairs], 1, len(pairs)),
+        ('depth (random)', lambda: [tree.depth(a) for a, _ in pairs], 1, len(pairs)),
+        (f'ancestors (depth {tree.depth(deepest)})', lambda: tree.ancestors(deepest), args.repeat, 1),
+        (f'descendants of child ({len(tree.descendants(middle))})', lambda: tree.descendants(middle), 20, 1),
+        (f'leaves_first of root ({len(tree) - 1})', lambda: tree.leaves_first(root), 5, 1),
+    ]
+    for label, func, repeat, per_call in checks:
+        _, elapsed = timed(func, repeat)
+        print(f"   {label:<32} {elapsed / per_call * 1e6:>12.2f} µs/op")
+
+    # Same post-order as the nested-set query (ORDER BY rgt)
+    expected = [a['name'] for a in sorted(accounts, key=lambda a: a['rgt']) if a['name'] != root]
+    if [node.name for node in tree.leaves_first(root)] == expected:
+        print("\n✅ leaves_first matches the lft/rgt post-order.")
+    else:
+        print("\n❌ leaves_first disagrees with the lft/rgt post-order!")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Benchmark: single-query subtree fetch vs. the recursive N+1 walk.
+
+Runs outside a bench with a small in-memory stand-in for the parts of
+`frappe` used by find_children_recursive. Every get_all/get_value call
+counts as one round trip and can be given an artificial latency to
+approximate MariaDB over the Docker network.
+
+Usage:
+    python3 benchmarks/bench_find_children.py [--nodes 10000] [--fanout 8] [--latency-ms 0.2]
+"""
+import argparse
+import importlib
+import os
+import sys
+import time
+import types
+
+from sqlite_frappe import Cache, ValidationError
+
+
+class _dict(dict):
+    """Attribute access dict, like frappe._dict."""
+    __getattr__ = dict.get
+
+
+class FakeFrappe:
+    """In-memory Account table answering the queries used by account_manager."""
+
+    def __init__(self, accounts, latency=0.0):
+        self.accounts = accounts
+        self.by_name = {a['name']: a for a in accounts}
+        self.by_parent = {}
+        for account in accounts:
+            self.by_parent.setdefault(account['parent_account'], []).append(account)
+        self.latency = latency
+        self.queries = 0
+        self.cache_store = {}
+
+    def _round_trip(self):
+        self.queries += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def get_all(self, doctype, filters=None, fields=None, order_by=None):
+        self._round_trip()
+        filters = dict(filters or {})
+        if 'parent_account' in filters:
+            rows = self.by_parent.get(filters.pop('parent_account'), [])
+        else:
+            rows = self.accounts
+
+        def matches(row):
+            for field, condition in filters.items():
+                if isinstance(condition, list):
+                    op, value = condition
+                    if op == '>' and not row[field] > value:
+                        return False
+                    if op == '<' and not row[field] < value:
+                        return False
+                elif row[field] != condition:
+                    return False
+            return True
+
+        result = [r for r in rows if matches(r)]
+        if order_by:
+            field, _, direction = order_by.partition(' ')
+            result.sort(key=lambda r: r[field], reverse=direction.strip() == 'desc')
+        return [_dict((f, r.get(f)) for f in fields) for r in result]
+
+    def get_value(self, doctype, name, fields, as_dict=False):
+        self._round_trip()
+        row = self.by_name.get(name)
+        if not row:
+            return None
+        return _dict((f, row[f]) for f in fields)
+
+
+def build_synthetic_tree(nodes, fanout, company='BENCH'):
+    """Build a breadth-first filled tree with nested-set bounds."""
+    accounts = [{
+        'name': 'ROOT - B', 'account_name': 'ROOT', 'parent_account': '',
+        'company': company, 'is_group': 1, 'lft': 0, 'rgt': 0,
+    }]
+    children = {'ROOT - B': []}
+    for i in range(1, nodes):
+        parent = accounts[(i - 1) // fanout]
+        name = f'{i:06d} - Account {i} - B'
+        accounts.append({
+            'name': name, 'account_name': f'Account {i}', 'parent_account': parent['name'],
+            'company': company, 'is_group': 0, 'lft': 0, 'rgt': 0,
+        })
+        parent['is_group'] = 1
+        children[parent['name']].append(accounts[-1])
+        children[name] = []
+
+    # Iterative nested-set numbering, siblings in insertion order
+    counter = 1
+    stack = [(accounts[0], False)]
+    while stack:
+        node, done = stack.pop()
+        if done:
+            node['rgt'] = counter
+            counter += 1
+            continue
+        node['lft'] = counter
+        counter += 1
+        stack.append((node, True))
+        for child in reversed(children[node['name']]):
+            stack.append((child, False))
+
+    # Shuffle storage order so the nested-set query has to sort
+    accounts.sort(key=lambda a: hash(a['name']))
+    return accounts
+
+
+def legacy_find_children_recursive(frappe, account_name, company):
+    """Reference copy of the previous one-query-per-node implementation."""
+    children = []
+    direct_children = frappe.get_all('Account',
+        filters={'parent_account': account_name, 'company': company},
+        fields=['name', 'account_name', 'is_group', 'lft'],
+        order_by='lft asc'
+    )
+    for child in direct_children:
+        children.extend(legacy_find_children_recursive(frappe, child.name, company))
+        children.append(child)
+    return children
+
+
+def install_fake(fake):
+    """Register fake as `frappe`, with what the commands modules touch at import and via the tree cache."""
+    module = types.ModuleType('frappe')
+    module._dict = _dict
+    module.ValidationError = ValidationError
+    module.get_all = fake.get_all
+    module.cache = lambda: Cache(fake.cache_store)
+    module.flags = _dict()
+    module.conf = _dict(db_name='benchmark')
+    module.db = types.SimpleNamespace(get_value=fake.get_value)
+    sys.modules['frappe'] = module
+
+
+def load_command_module(name):
+    """
+    Import a commands module without running the click/bench CLI package.
+    
+    The package modules are registered by path only, so `commands/__init__.py`
+    (which needs click and frappe.commands) is never executed.
+    """
+    app_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'dm_erpnext_utilities')
+    for package, path in (
+        ('dm_erpnext_utilities', app_dir),
+        ('dm_erpnext_utilities.commands', os.path.join(app_dir, 'commands')),
+    ):
+        if package not in sys.modules:
+            module = types.ModuleType(package)
+            module.__path__ = [path]
+            sys.modules[package] = module
+    return importlib.import_module(f'dm_erpnext_utilities.commands.{name}')
+
+
+def run(label, func):
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    return label, result, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=10000)
+    parser.add_argument('--fanout', type=int, default=8)
+    parser.add_argument('--latency-ms', type=float, default=0.2,
+                        help='Simulated round-trip latency per query')
+    args = parser.parse_args()
+
+    fake = FakeFrappe(build_synthetic_tree(args.nodes, args.fanout), args.latency_ms / 1000.0)
+    install_fake(fake)
+    account_manager = load_command_module('account_manager')
+
+    print(f"\n{'='*60}")
+    print(f"find_children_recursive benchmark")
+    print(f"   Nodes: {args.nodes}  Fan-out: {args.fanout}  Latency: {args.latency_ms} ms")
+    print(f"{'='*60}\n")
+
+    results = []
+    for label, func in (
+        ('recursive (legacy)', lambda: legacy_find_children_recursive(sys.modules['frappe'], 'ROOT - B', 'BENCH')),
+        ('nested set (lft/rgt)', lambda: account_manager.find_children_recursive('ROOT - B', 'BENCH')),
+        ('in-memory index', lambda: account_manager.find_children_in_memory('ROOT - B', 'BENCH')),
+    ):
+        fake.queries = 0
+        label, children, elapsed = run(label, func)
+        results.append([c.name for c in children])
+        print(f"   {label:<22} {elapsed*1000:>10.1f} ms  {fake.queries:>6} queries  {len(children)} accounts")
+
+    if all(r == results[0] for r in results[1:]):
+        print("\n✅ All implementations return the same children-before-parent order.")
+    else:
+        print("\n❌ Implementations disagree on the returned order!")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: chart commands against a SQLite stand-in for frappe.db.
+
+For every chart size a synthetic company is generated (nested-set
+bounds, GL entries on the leaves of the Assets branch) in an in-memory
+SQLite database (see sqlite_frappe.py). Each operation then runs on a
+fresh copy of that database and reports its wall time, the number of
+database round trips and its peak Python memory. Results are written as
+JSON; pass an earlier file with --compare to see the change per row.
+
+Usage:
+    python3 benchmarks/run_suite.py [--sizes 100 1000 10000 100000] [--gl-rows 1000000]
+                                    [--max-docwise 1000] [--output results/HEAD.json]
+                                    [--compare results/BASE.json]
+"""
+import argparse
+import contextlib
+import csv
+import datetime
+import gc
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_find_children import load_command_module
+from sqlite_frappe import SqliteFrappe
+
+COMPANY = 'Bench Co'
+ABBR = 'BC'
+IMPORT_COMPANY = 'Import Co'
+IMPORT_ABBR = 'IC'
+
+ROOTS = (
+    ('Assets', 'Asset'),
+    ('Liabilities', 'Liability'),
+    ('Equity', 'Equity'),
+    ('Income', 'Income'),
+    ('Expenses', 'Expense'),
+)
+
+FANOUT = 8
+
+
+def build_chart(size):
+    """
+    Return (name, account_name, number, parent index, root_type) rows.
+
+    Five roots, then every node gets up to FANOUT children breadth first.
+    """
+    rows = [(name, name, '', -1, root_type) for name, root_type in ROOTS]
+    for i in range(len(ROOTS), size):
+        parent = (i - len(ROOTS)) // FANOUT
+        number = str(100000 + i)
+        rows.append((f'Account {i}', f'Account {i}', number, parent, rows[parent][4]))
+    return rows
+
+
+def seed_company(backend, company, abbr, chart, gl_rows=0):
+    """Insert a company and its chart with valid lft/rgt; add GL rows."""
+    conn = backend.conn
+    conn.execute("INSERT INTO `tabCompany` VALUES (?, ?, 'BRL')", (company, abbr))
+
+    names = [f"{number} - {account_name} - {abbr}" if number else f"{account_name} - {abbr}"
+             for _, account_name, number, _, _ in chart]
+    children = {}
+    for i, (_, _, _, parent, _) in enumerate(chart):
+        children.setdefault(parent, []).append(i)
+
+    # Continue numbering after any company already in the table
+    counter = (conn.execute("SELECT MAX(rgt) FROM `tabAccount`").fetchone()[0] or 0) + 1
+    bounds = {}
+    stack = [(root, False) for root in reversed(children[-1])]
+    while stack:
+        node, done = stack.pop()
+        if done:
+            bounds[node] = (bounds[node], counter)
+            counter += 1
+            continue
+        bounds[node] = counter
+        counter += 1
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(children.get(node, [])))
+
+    conn.executemany("""
+        INSERT INTO `tabAccount` (name, account_name, account_number, company, parent_account,
+            root_type, is_group, lft, rgt)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (names[i], account_name, number or None, company, names[parent] if parent >= 0 else None,
+         root_type, 1 if i in children or parent < 0 else 0, bounds[i][0], bounds[i][1])
+        for i, (_, account_name, number, parent, root_type) in enumerate(chart)
+    ])
+
+    # Ledger rows go to leaves of the Assets branch only, so Expenses stay deletable
+    assets_leaves = [names[i] for i in range(len(chart))
+                     if i not in children and bounds[0][0] < bounds[i][0] < bounds[0][1]]
+    if gl_rows and assets_leaves:
+        rng = random.Random(7)
+        conn.executemany("INSERT INTO `tabGL Entry` VALUES (?, ?, ?, 1, 0)", (
+            (f'GLE-{i:08d}', rng.choice(assets_leaves), company) for i in range(gl_rows)
+        ))
+    conn.commit()
+    return names, children, assets_leaves
+
+
+def write_chart_csv(path, chart):
+    """Write the non-root part of a chart in the importer's CSV format."""
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Account Name', 'Parent Account', 'Account Number', 'Is Group', 'Root Type'])
+        has_children = {parent for _, _, _, parent, _ in chart}
+        for i, (_, account_name, number, parent, root_type) in enumerate(chart):
+            if parent < 0:
+                continue
+            parent_name, _, parent_number, _, _ = chart[parent]
+            parent_ref = f"{parent_number} - {parent_name}" if parent_number else parent_name
+            writer.writerow([account_name, parent_ref, number, 1 if i in has_children else 0, root_type])
+
+
+def measure(backend, snapshot, func):
+    """
+    Run func twice on fresh copies of the database: once for wall time and
+    round trips, once under tracemalloc for the peak memory.
+    """
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        backend.restore(snapshot)
+        gc.collect()
+        start = time.perf_counter()
+        ok = func()
+        wall = time.perf_counter() - start
+        queries = backend.queries
+
+        backend.restore(snapshot)
+        gc.collect()
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {'ok': ok is not False, 'wall_time': wall, 'queries': queries, 'peak_memory': peak}
+
+
+def run_size(backend, modules, size, gl_rows, max_docwise, workdir):
+    manager, importer, lint = modules
+    chart = build_chart(size)
+
+    scratch = SqliteFrappe()
+    scratch.create_schema()
+    backend.restore(scratch.snapshot())
+    names, children, assets_leaves = seed_company(backend, COMPANY, ABBR, chart, gl_rows)
+    seed_company(backend, IMPORT_COMPANY, IMPORT_ABBR, [row for row in chart if row[3] < 0])
+    snapshot = backend.snapshot()
+
+    csv_path = os.path.join(workdir, f'chart_{size}.csv')
+    write_chart_csv(csv_path, chart)
+
+    assets = names[0]
+    used_leaf = assets_leaves[0] if assets_leaves else names[-1]
+    # First child group of Expenses: an unused subtree of about size / 40 accounts
+    expenses = len(ROOTS) - 1
+    target = names[children[expenses][0]] if expenses in children else names[expenses]
+    subtree = backend.conn.execute(
+        "SELECT COUNT(*) FROM `tabAccount` WHERE lft >= (SELECT lft FROM `tabAccount` WHERE name = ?)"
+        " AND rgt <= (SELECT rgt FROM `tabAccount` WHERE name = ?)", (target, target)).fetchone()[0]
+
+    operations = [
+        ('find_children_recursive', lambda: manager.find_children_recursive(assets, COMPANY)),
+        ('find_children_in_memory', lambda: manager.find_children_in_memory(assets, COMPANY)),
+        ('check_account_has_transactions', lambda: manager.check_account_has_transactions(used_leaf)),
+        ('check_accounts_have_transactions (all)', lambda: manager.check_accounts_have_transactions(names)),
+        ('delete_account_and_children --bulk', lambda: manager.delete_account_and_children(target, COMPANY, bulk=True)),
+        ('import_accounts_from_csv --bulk', lambda: importer.import_accounts_from_csv(
+            [csv_path], IMPORT_COMPANY, skip_root=True, bulk=True)),
+        ('lint_chart_files', lambda: lint.lint_chart_files([csv_path])['errors'] == 0),
+    ]
+    if size <= max_docwise:
+        operations += [
+            ('delete_account_and_children', lambda: manager.delete_account_and_children(target, COMPANY)),
+            ('import_accounts_from_csv', lambda: importer.import_accounts_from_csv(
+                [csv_path], IMPORT_COMPANY, skip_root=True)),
+        ]
+
+    results = []
+    for operation, func in operations:
+        result = measure(backend, snapshot, func)
+        result.update(operation=operation, accounts=size, gl_rows=gl_rows,
+                      subtree=subtree if 'delete' in operation else None)
+        results.append(result)
+        print_result(result)
+    return results
+
+
+def print_result(result, previous=None):
+    status = "✅" if result['ok'] else "❌"
+    line = (f"   {status} {result['operation']:<40} {result['accounts']:>7} "
+            f"{result['wall_time']*1000:>10.1f} ms {result['queries']:>8} q "
+            f"{result['peak_memory']/1e6:>8.2f} MB")
+    if previous:
+        change = (result['wall_time'] / previous['wall_time'] - 1) * 100 if previous['wall_time'] else 0
+        line += f"  ({change:+.0f}% time, {result['queries'] - previous['queries']:+d} q)"
+    print(line)
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 100000])
+    parser.add_argument('--gl-rows', type=int, default=1000000)
+    parser.add_argument('--max-docwise', type=int, default=1000,
+                        help='Largest chart for the one-document-at-a-time delete and import')
+    parser.add_argument('--output', help='JSON results file (default: benchmarks/results/<git rev>.json)')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    args = parser.parse_args()
+
+    backend = SqliteFrappe()
+    backend.install()
+    modules = (load_command_module('account_manager'), load_command_module('account_importer'),
+               load_command_module('chart_lint'))
+
+    revision = git_revision()
+    print(f"\n{'='*60}")
+    print(f"Chart commands benchmark suite")
+    print(f"   Revision: {revision}  SQLite: {sqlite3.sqlite_version}  GL rows: {args.gl_rows}")
+    print(f"{'='*60}\n")
+
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in args.sizes:
+            print(f"📊 {size} accounts")
+            results += run_size(backend, modules, size, args.gl_rows, args.max_docwise, workdir)
+            print()
+
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results', f'{revision}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'revision': revision,
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'results': results,
+        }, f, indent=2)
+    print(f"💾 Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {(r['operation'], r['accounts']): r for r in json.load(f)['results']}
+        print(f"\n📈 Compared with {args.compare}:")
+        for result in results:
+            print_result(result, baseline.get((result['operation'], result['accounts'])))
+
+    if not all(result['ok'] for result in results):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,503 @@
+"""
+SQLite-backed stand-in for the parts of frappe/erpnext the commands use.
+
+SqliteFrappe keeps an ERPNext-shaped schema (tabAccount, tabGL Entry,
+tabCompany, metadata tables...) in an in-memory SQLite database and
+exposes the frappe API surface of the commands package: frappe.get_all,
+frappe.db.get_value/exists/count/sql/bulk_insert/commit/rollback/savepoint and
+their after_commit/after_rollback callbacks, frappe.get_doc(...).insert(),
+frappe.delete_doc, frappe.cache(), frappe.get_site_path and a few helpers. install() registers it as `frappe` and the Account autoname
+helper as `erpnext.accounts.doctype.account.account`.
+
+Every database round trip increments `queries`, so the suite can report
+how many statements an operation issues. Document inserts and deletes
+maintain lft/rgt the way frappe.utils.nestedset does (shift the bounds
+of every node to the right), which is what makes them expensive on a
+large tree; validation, link checks and Version records are not modelled.
+"""
+import contextlib
+import datetime
+import importlib
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import types
+import uuid
+
+SCHEMA = """
+CREATE TABLE `tabCompany` (name TEXT PRIMARY KEY, abbr TEXT, default_currency TEXT);
+CREATE TABLE `tabAccount` (
+    name TEXT PRIMARY KEY, owner TEXT, creation TEXT, modified TEXT, modified_by TEXT,
+    docstatus INTEGER DEFAULT 0, idx INTEGER DEFAULT 0,
+    account_name TEXT, account_number TEXT, company TEXT, parent_account TEXT, old_parent TEXT,
+    account_type TEXT, root_type TEXT, report_type TEXT, account_currency TEXT,
+    is_group INTEGER DEFAULT 0, lft INTEGER DEFAULT 0, rgt INTEGER DEFAULT 0
+);
+CREATE INDEX account_company ON `tabAccount` (company);
+CREATE INDEX account_parent ON `tabAccount` (parent_account);
+CREATE INDEX account_lft ON `tabAccount` (lft);
+CREATE INDEX account_rgt ON `tabAccount` (rgt);
+CREATE TABLE `tabGL Entry` (name TEXT PRIMARY KEY, account TEXT, company TEXT, debit REAL, credit REAL);
+CREATE INDEX gl_account ON `tabGL Entry` (account);
+CREATE TABLE `tabJournal Entry Account` (name TEXT PRIMARY KEY, parent TEXT, account TEXT);
+CREATE INDEX jea_account ON `tabJournal Entry Account` (account);
+CREATE TABLE `tabPayment Entry` (name TEXT PRIMARY KEY, paid_from TEXT, paid_to TEXT);
+CREATE INDEX pe_paid_from ON `tabPayment Entry` (paid_from);
+CREATE INDEX pe_paid_to ON `tabPayment Entry` (paid_to);
+CREATE TABLE `tabDocType` (name TEXT PRIMARY KEY, issingle INTEGER DEFAULT 0, is_virtual INTEGER DEFAULT 0);
+CREATE TABLE `tabDocField` (parent TEXT, fieldname TEXT, fieldtype TEXT, options TEXT);
+CREATE TABLE `tabCustom Field` (dt TEXT, fieldname TEXT, fieldtype TEXT, options TEXT);
+"""
+
+# Link fields to Account as ERPNext declares them (subset with tables here)
+DOCFIELDS = (
+    ('Account', 'parent_account'),
+    ('GL Entry', 'account'),
+    ('Journal Entry Account', 'account'),
+    ('Payment Entry', 'paid_from'),
+    ('Payment Entry', 'paid_to'),
+)
+
+OPERATORS = ('=', '!=', '>', '<', '>=', '<=', 'like', 'not like')
+
+
+class _dict(dict):
+    """Attribute access dict, like frappe._dict."""
+
+    def __getattr__(self, key):
+        return self.get(key)
+
+    def __setattr__(self, key, value):
+        self[key] = value
+
+
+class ValidationError(Exception):
+    pass
+
+
+class SqliteFrappe:
+    """One in-memory database plus the frappe functions bound to it."""
+
+    def __init__(self, conn=None):
+        self.conn = conn or sqlite3.connect(':memory:')
+        self.add_functions()
+        self.queries = 0
+        self.cache_store = {}
+        self.company_cache = {}
+        self.site_path = None
+        self.local = _dict()
+        self.after_commit = Callbacks()
+        self.after_rollback = Callbacks()
+
+    def create_schema(self):
+        self.conn.executescript(SCHEMA)
+        self.conn.executemany("INSERT INTO `tabDocType` (name) VALUES (?)",
+                              [(d,) for d in {d for d, _ in DOCFIELDS}])
+        self.conn.executemany(
+            "INSERT INTO `tabDocField` (parent, fieldname, fieldtype, options) VALUES (?, ?, 'Link', 'Account')",
+            DOCFIELDS)
+        self.conn.commit()
+
+    def add_functions(self):
+        """MariaDB named locks; one connection, so every lock is free."""
+        self.conn.create_function('GET_LOCK', 2, lambda name, wait: 1)
+        self.conn.create_function('RELEASE_LOCK', 1, lambda name: 1)
+
+    def snapshot(self):
+        """Return a copy of the current database, for restore()."""
+        copy = sqlite3.connect(':memory:')
+        self.conn.backup(copy)
+        return copy
+
+    def restore(self, snapshot):
+        """
+        Replace the database with a copy of a snapshot and reset counters.
+
+        The installed `frappe` module stays bound to this object, so
+        modules that already imported it see the restored data.
+        """
+        self.conn.close()
+        self.conn = sqlite3.connect(':memory:')
+        snapshot.backup(self.conn)
+        self.add_functions()
+        self.queries = 0
+        self.cache_store.clear()
+        self.company_cache.clear()
+        if self.site_path:
+            shutil.rmtree(self.site_path, ignore_errors=True)
+            self.site_path = None
+        self.after_commit.reset()
+        self.after_rollback.reset()
+        self.local.clear()
+
+    # --- frappe.db -------------------------------------------------------
+
+    def sql(self, query, values=None, as_dict=False, as_list=False, as_iterator=False):
+        self.queries += 1
+        query, params = translate_sql(query, values)
+        cursor = self.conn.execute(query, params)
+        if cursor.description is None:
+            return ()
+        if as_iterator:
+            # SQLite cursors already step through the result row by row
+            return iter(cursor)
+        rows = cursor.fetchall()
+        if as_dict:
+            columns = [c[0] for c in cursor.description]
+            return [_dict(zip(columns, row)) for row in rows]
+        return [list(row) for row in rows] if as_list else rows
+
+    def get_all(self, doctype, filters=None, fields=None, or_filters=None, order_by=None,
+                pluck=None, as_list=False, limit=None, limit_page_length=None, **kwargs):
+        fields = [pluck] if pluck else (fields or ['name'])
+        where, params = build_where(filters, or_filters)
+        query = f"SELECT {', '.join(quote_field(f) for f in fields)} FROM `tab{doctype}`{where}"
+        if order_by:
+            query += f" ORDER BY {order_by}"
+        limit = limit or limit_page_length
+        if limit:
+            query += f" LIMIT {int(limit)}"
+
+        self.queries += 1
+        cursor = self.conn.execute(query, params)
+        rows = cursor.fetchall()
+        if pluck:
+            return [row[0] for row in rows]
+        if as_list:
+            return rows
+        columns = [c[0] for c in cursor.description]
+        return [_dict(zip(columns, row)) for row in rows]
+
+    def get_value(self, doctype, filters=None, fieldname='name', as_dict=False, for_update=False, **kwargs):
+        filters = {'name': filters} if isinstance(filters, str) else filters
+        fields = [fieldname] if isinstance(fieldname, str) else list(fieldname)
+        rows = self.get_all(doctype, filters=filters, fields=fields, limit=1)
+        if not rows:
+            return None
+        row = rows[0]
+        if as_dict:
+            return row
+        return next(iter(row.values())) if isinstance(fieldname, str) else tuple(row.values())
+
+    def exists(self, doctype, filters=None):
+        return self.get_value(doctype, filters, 'name')
+
+    def count(self, doctype, filters=None):
+        where, params = build_where(filters)
+        self.queries += 1
+        return self.conn.execute(f"SELECT COUNT(*) FROM `tab{doctype}`{where}", params).fetchone()[0]
+
+    def bulk_insert(self, doctype, fields, values, chunk_size=10000, ignore_duplicates=False):
+        values = list(values)
+        query = (f"INSERT INTO `tab{doctype}` ({', '.join(quote_field(f) for f in fields)}) "
+                 f"VALUES ({', '.join('?' for _ in fields)})")
+        for i in range(0, len(values), chunk_size):
+            self.queries += 1
+            self.conn.executemany(query, values[i:i + chunk_size])
+
+    @contextlib.contextmanager
+    def unbuffered_cursor(self):
+        yield
+
+    def get_table_columns(self, doctype):
+        return [row[1] for row in self.conn.execute(f"PRAGMA table_info(`tab{doctype}`)")]
+
+    def get_tables(self):
+        self.queries += 1
+        return [row[0] for row in self.conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+    def commit(self):
+        self.conn.commit()
+        self.after_rollback.reset()
+        self.after_commit.run()
+
+    def rollback(self, save_point=None):
+        if save_point:
+            # Partial rollback: the transaction and its callbacks stay
+            self.conn.execute(f"ROLLBACK TO SAVEPOINT {save_point}")
+            return
+        self.conn.rollback()
+        self.after_commit.reset()
+        self.after_rollback.run()
+
+    def savepoint(self, save_point):
+        self.conn.execute(f"SAVEPOINT {save_point}")
+
+    # --- documents -------------------------------------------------------
+
+    def get_doc(self, doctype, name=None):
+        if isinstance(doctype, dict):
+            return Document(self, _dict(doctype))
+        row = self.get_value(doctype, name, ['*'], as_dict=True)
+        if not row:
+            raise ValidationError(f"{doctype} {name} not found")
+        return Document(self, _dict(row, doctype=doctype))
+
+    def delete_doc(self, doctype, name, force=False, ignore_permissions=False, **kwargs):
+        if doctype != 'Account':
+            self.sql(f"DELETE FROM `tab{doctype}` WHERE name = %s", (name,))
+            return
+        # Account.on_trash / NestedSet.on_trash: refuse nodes with children
+        if self.get_value('Account', {'parent_account': name}):
+            raise ValidationError(f"Cannot delete {name}: it has child accounts")
+        bounds = self.get_value('Account', name, ['lft', 'rgt'], as_dict=True)
+        self.sql("DELETE FROM `tabAccount` WHERE name = %s", (name,))
+        width = bounds.rgt - bounds.lft + 1
+        self.sql("UPDATE `tabAccount` SET lft = lft - %s WHERE lft > %s", (width, bounds.rgt))
+        self.sql("UPDATE `tabAccount` SET rgt = rgt - %s WHERE rgt > %s", (width, bounds.rgt))
+
+    def insert_account(self, doc):
+        doc.name = get_account_autoname(doc.account_number, doc.account_name, doc.company, self)
+        if self.exists('Account', doc.name):
+            raise ValidationError(f"Account {doc.name} already exists")
+
+        right = 1
+        if doc.parent_account:
+            parent = self.get_value('Account', doc.parent_account, ['rgt', 'root_type', 'is_group'], as_dict=True)
+            if not parent:
+                raise ValidationError(f"Parent account {doc.parent_account} does not exist")
+            right = parent.rgt
+            doc.root_type = doc.root_type or parent.root_type
+            # frappe.utils.nestedset.update_add_node: open a gap at the parent's rgt
+            self.sql("UPDATE `tabAccount` SET rgt = rgt + 2 WHERE rgt >= %s", (right,))
+            self.sql("UPDATE `tabAccount` SET lft = lft + 2 WHERE lft >= %s", (right,))
+        else:
+            right = (self.sql("SELECT MAX(rgt) FROM `tabAccount`")[0][0] or 0) + 1
+
+        now = self.now()
+        self.sql("""
+            INSERT INTO `tabAccount` (name, owner, creation, modified, modified_by, account_name,
+                account_number, company, parent_account, old_parent, account_type, root_type,
+                is_group, lft, rgt)
+            VALUES (%(name)s, 'Administrator', %(now)s, %(now)s, 'Administrator', %(account_name)s,
+                %(account_number)s, %(company)s, %(parent_account)s, %(parent_account)s,
+                %(account_type)s, %(root_type)s, %(is_group)s, %(lft)s, %(rgt)s)
+        """, dict(doc, now=now, lft=right, rgt=right + 1, is_group=doc.is_group or 0))
+        return doc
+
+    # --- misc frappe helpers ---------------------------------------------
+
+    def get_cached_value(self, doctype, name, field):
+        key = (doctype, name, field)
+        if key not in self.company_cache:
+            self.company_cache[key] = self.get_value(doctype, name, field)
+        return self.company_cache[key]
+
+    def cache(self):
+        return Cache(self.cache_store)
+
+    def get_site_path(self, *parts):
+        # A private temporary site folder per stand-in, emptied by restore()
+        if self.site_path is None:
+            self.site_path = tempfile.mkdtemp(prefix='sqlite_frappe_site_')
+        return os.path.join(self.site_path, *parts)
+
+    def clear_cache(self, doctype=None, **kwargs):
+        self.company_cache.clear()
+
+    @staticmethod
+    def now():
+        return datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S.%f')
+
+    def install(self):
+        """Register this stand-in as the `frappe` and `erpnext` modules."""
+        frappe = types.ModuleType('frappe')
+        frappe._dict = _dict
+        frappe.ValidationError = ValidationError
+        frappe.get_all = self.get_all
+        frappe.get_list = self.get_all
+        frappe.get_doc = self.get_doc
+        frappe.delete_doc = self.delete_doc
+        frappe.get_cached_value = self.get_cached_value
+        frappe.cache = self.cache
+        frappe.clear_cache = self.clear_cache
+        frappe.get_site_path = self.get_site_path
+        frappe.get_hooks = lambda name, default=None: default or []
+        frappe.get_attr = get_attr
+        frappe.generate_hash = lambda length=10: uuid.uuid4().hex[:length]
+        frappe.session = types.SimpleNamespace(user='Administrator')
+        frappe.flags = _dict()
+        frappe.local = self.local
+        frappe.conf = _dict(db_name='benchmark')
+        frappe.db = types.SimpleNamespace(
+            sql=self.sql, get_value=self.get_value, exists=self.exists, count=self.count,
+            bulk_insert=self.bulk_insert, get_tables=self.get_tables, get_table_columns=self.get_table_columns,
+            unbuffered_cursor=self.unbuffered_cursor, commit=self.commit,
+            rollback=self.rollback, savepoint=self.savepoint,
+            after_commit=self.after_commit, after_rollback=self.after_rollback,
+        )
+        utils = types.ModuleType('frappe.utils')
+        utils.now = self.now
+        frappe.utils = utils
+
+        account = types.ModuleType('erpnext.accounts.doctype.account.account')
+        account.get_account_autoname = lambda number, name, company: get_account_autoname(number, name, company, self)
+
+        modules = {'frappe': frappe, 'frappe.utils': utils,
+                   'erpnext.accounts.doctype.account.account': account}
+        for package in ('erpnext', 'erpnext.accounts', 'erpnext.accounts.doctype',
+                        'erpnext.accounts.doctype.account'):
+            modules[package] = types.ModuleType(package)
+            modules[package].__path__ = []
+        sys.modules.update(modules)
+        return frappe
+
+
+class Document(_dict):
+    """Just enough of frappe.model.document.Document for Account."""
+
+    def __init__(self, backend, values):
+        super().__init__(values)
+        dict.__setitem__(self, '_backend', backend)
+
+    def insert(self, ignore_permissions=False):
+        if self.doctype != 'Account':
+            raise NotImplementedError(self.doctype)
+        self['_backend'].insert_account(self)
+        return self
+
+
+class Callbacks:
+    """frappe.db.after_commit / after_rollback: functions run once when the transaction ends."""
+
+    def __init__(self):
+        self.functions = []
+
+    def add(self, function):
+        self.functions.append(function)
+
+    def run(self):
+        functions, self.functions = self.functions, []
+        for function in functions:
+            function()
+
+    def reset(self):
+        self.functions = []
+
+
+class Cache:
+    """Dict-backed replacement for frappe.cache(), with the raw Redis and list calls used."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def make_key(self, key):
+        return f'site:{key}'.encode()
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+    def delete(self, *keys):
+        return sum(self.store.pop(key, None) is not None for key in keys)
+
+    def get_value(self, key, generator=None, **kwargs):
+        if key not in self.store and generator:
+            self.store[key] = generator()
+        return self.store.get(key)
+
+    def set_value(self, key, value, expires_in_sec=None, **kwargs):
+        self.store[key] = value
+
+    def delete_value(self, key):
+        self.store.pop(key, None)
+
+    def lpush(self, key, value):
+        self.store.setdefault(key, []).insert(0, value.encode() if isinstance(value, str) else value)
+
+    def ltrim(self, key, start, stop):
+        if key in self.store:
+            self.store[key] = self.store[key][start:None if stop == -1 else stop + 1]
+
+    def lrange(self, key, start, stop):
+        return self.store.get(key, [])[start:None if stop == -1 else stop + 1]
+
+
+def get_attr(method):
+    """frappe.get_attr: resolve a dotted path to a function."""
+    module, _, name = method.rpartition('.')
+    return getattr(importlib.import_module(module), name)
+
+
+def get_account_autoname(account_number, account_name, company, backend):
+    """Same rule as erpnext.accounts.doctype.account.account.get_account_autoname."""
+    parts = [account_name.strip(), backend.get_cached_value('Company', company, 'abbr')]
+    if account_number:
+        parts.insert(0, str(account_number).strip())
+    return ' - '.join(parts)
+
+
+def translate_sql(query, values):
+    """Turn MariaDB/pymysql-style SQL and parameters into SQLite's."""
+    query = re.sub(r'\bFOR UPDATE\b', '', query)
+    # SQLite rejects parenthesized UNION members; make them subqueries
+    query = re.sub(r'\(\s*(SELECT\b[^()]*?(?:\([^()]*\)[^()]*?)*LIMIT \d+)\s*\)', r'SELECT * FROM (\1)', query)
+    if values is None:
+        return query.replace('%%', '%'), ()
+    if isinstance(values, (list, tuple)):
+        return query.replace('%s', '?').replace('%%', '%'), tuple(values)
+
+    params = {}
+
+    def expand(match):
+        key = match.group(1)
+        value = values[key]
+        if isinstance(value, (list, tuple, set)):
+            names = []
+            for i, item in enumerate(value):
+                params[f'{key}_{i}'] = item
+                names.append(f':{key}_{i}')
+            return f"({', '.join(names) or 'NULL'})"
+        params[key] = value
+        return f':{key}'
+
+    query = re.sub(r'%\((\w+)\)s', expand, query)
+    return query.replace('%%', '%'), params
+
+
+def build_where(filters, or_filters=None):
+    """Build a WHERE clause from frappe-style dict filters."""
+    params = []
+
+    def conditions(spec):
+        result = []
+        for field, condition in (spec or {}).items():
+            op, value = ('=', condition)
+            if isinstance(condition, (list, tuple)):
+                op, value = condition[0].lower(), condition[1]
+            column = quote_field(field)
+            if op in ('in', 'not in'):
+                value = list(value) or [None]
+                result.append(f"{column} {op.upper()} ({', '.join('?' for _ in value)})")
+                params.extend(value)
+            elif op == 'is':
+                result.append(f"IFNULL({column}, '') {'!=' if value == 'set' else '='} ''")
+            elif op in OPERATORS:
+                result.append(f"{column} {op.upper()} ?")
+                params.append(value)
+            else:
+                raise ValueError(f"Unsupported filter operator: {op}")
+        return result
+
+    clauses = conditions(filters)
+    either = conditions(or_filters)
+    if either:
+        clauses.append(f"({' OR '.join(either)})")
+    return (f" WHERE {' AND '.join(clauses)}" if clauses else ''), params
+
+
+def quote_field(field):
+    """Backtick plain field names; leave expressions (count(*), a as b) alone."""
+    return f"`{field}`" if re.fullmatch(r'\w+', field) else field
+
@@ -0,0 +1,208 @@
+"""
+Whitelisted bulk endpoints for automation.
+
+These run inside the site's web workers, so a caller pays one HTTP round
+trip per batch instead of a `bench execute` process (interpreter and
+Frappe boot) per operation. Every endpoint takes a list of operations
+and returns one result per operation, in order; a failing operation is
+rolled back and reported without stopping the others.
+
+    POST /api/method/dm_erpnext_utilities.api.get_subtrees
+    POST /api/method/dm_erpnext_utilities.api.check_usage
+    POST /api/method/dm_erpnext_utilities.api.delete_accounts
+    POST /api/method/dm_erpnext_utilities.api.import_charts
+    POST /api/method/dm_erpnext_utilities.api.get_job_status
+
+List arguments may be sent as JSON bodies or as JSON-encoded form fields.
+Writes require the Accounts Manager or System Manager role, and every
+endpoint checks read access to each company of the batch (so User
+Permissions on Company apply) before running or enqueuing anything.
+"""
+import frappe
+from frappe.utils import cint
+
+from dm_erpnext_utilities.commands.account_manager import check_accounts_have_transactions
+from dm_erpnext_utilities.commands.parallel import run_company
+from dm_erpnext_utilities.commands.tree_cache import get_company_tree
+
+WRITE_ROLES = ('Accounts Manager', 'System Manager')
+
+# Upper bound on operations per request, to keep requests within the
+# web worker timeout; larger imports belong on the queue (enqueue=1)
+MAX_BATCH = 500
+
+
+@frappe.whitelist()
+def get_subtrees(accounts):
+    """
+    Return the descendants of several accounts.
+
+    Args:
+        accounts: List of {"account", "company"}; the account may omit the
+            company abbreviation
+
+    Returns:
+        List of {"account", "company", "name", "children"}, children
+        leaves first as {"name", "account_name", "is_group"}; "name" is
+        None when the account does not exist
+    """
+    frappe.has_permission('Account', 'read', throw=True)
+    accounts = _parse_batch(accounts)
+    _check_companies(request['company'] for request in accounts)
+
+    # One cached tree per company, however many accounts are asked for
+    results = []
+    for request in accounts:
+        company = request['company']
+        tree = get_company_tree(company)
+        name = _resolve_in_tree(tree, request['account'], company)
+        children = []
+        if name:
+            children = [{'name': node.name, 'account_name': node.account_name, 'is_group': node.is_group}
+                        for node in tree.leaves_first(name)]
+        results.append({'account': request['account'], 'company': company, 'name': name, 'children': children})
+    return results
+
+
+@frappe.whitelist()
+def check_usage(accounts, subtree=False):
+    """
+    Usage preflight for many accounts in batched queries.
+
+    Args:
+        accounts: List of Account names
+        subtree: If true, also report every descendant of each account
+
+    Returns:
+        Dict of account name -> usage (see check_accounts_have_transactions)
+    """
+    frappe.has_permission('Account', 'read', throw=True)
+    names = _parse_batch(accounts)
+    companies = dict(frappe.get_all('Account', filters={'name': ['in', names]},
+                                    fields=['name', 'company'], as_list=True))
+    _check_companies(companies.values())
+
+    if cint(subtree):
+        trees = {company: get_company_tree(company) for company in set(companies.values())}
+        names = [n for name in names if name in companies for n in trees[companies[name]].subtree(name)]
+    return check_accounts_have_transactions(names)
+
+
+@frappe.whitelist(methods=['POST'])
+def delete_accounts(accounts, dry_run=False, bulk=True, enqueue=False):
+    """
+    Delete several accounts with their subtrees.
+
+    Args:
+        accounts: List of {"account", "company"}; per-operation "dry_run"
+            and "bulk" keys override the request-wide values
+        dry_run: Report what would be deleted without deleting
+        bulk: Delete each subtree with one range DELETE (default)
+        enqueue: Run each operation as a background job on the long queue
+
+    Returns:
+        List of {"company", "account", "ok", "elapsed", "output", "error"},
+        or {"company", "account", "job_id"} when enqueued
+    """
+    frappe.only_for(WRITE_ROLES)
+    accounts = _parse_batch(accounts)
+    _check_companies(request['company'] for request in accounts)
+
+    results = []
+    for request in accounts:
+        options = {
+            'account_name': request['account'],
+            'dry_run': bool(cint(request.get('dry_run', dry_run))),
+            'bulk': bool(cint(request.get('bulk', bulk))),
+        }
+        results.append(_run(request['company'], 'delete', options, enqueue,
+            'dm_erpnext_utilities.commands.account_manager.delete_company_account'))
+    return results
+
+
+@frappe.whitelist(methods=['POST'])
+def import_charts(imports, enqueue=False):
+    """
+    Import uploaded chart files into several companies.
+
+    Upload the files first (/api/method/upload_file, private) and pass
+    their file URLs.
+
+    Args:
+        imports: List of {"company", "file_urls", "skip_root", "reset",
+            "keep_used", "bulk"}; bulk defaults to true
+        enqueue: Run each import as a background job on the long queue
+
+    Returns:
+        List of {"company", "ok", "elapsed", "output", "error"}, or
+        {"company", "job_id"} when enqueued
+    """
+    frappe.only_for(WRITE_ROLES)
+    imports = _parse_batch(imports)
+    _check_companies(request['company'] for request in imports)
+
+    results = []
+    for request in imports:
+        options = {
+            'csv_files': [_file_path(url) for url in request['file_urls']],
+            'skip_root': bool(cint(request.get('skip_root'))),
+            'reset': bool(cint(request.get('reset'))),
+            'keep_used': bool(cint(request.get('keep_used'))),
+            'bulk': bool(cint(request.get('bulk', True))),
+        }
+        results.append(_run(request['company'], 'import', options, enqueue,
+            'dm_erpnext_utilities.commands.account_importer.import_accounts_from_csv'))
+    return results
+
+
+@frappe.whitelist()
+def get_job_status(job_ids):
+    """Return the progress record of each job id (None when unknown)."""
+    from dm_erpnext_utilities.commands.chart_jobs import get_job_progress
+
+    frappe.has_permission('Account', 'read', throw=True)
+    return {job_id: get_job_progress(job_id) for job_id in _parse_batch(job_ids)}
+
+
+def _run(company, operation, options, enqueue, method):
+    """Run one operation now (output captured) or enqueue it."""
+    if cint(enqueue):
+        from dm_erpnext_utilities.commands.chart_jobs import enqueue_chart_job
+
+        result = {'company': company, 'job_id': enqueue_chart_job(operation, company, options)}
+    else:
+        result = run_company(method, company, options)
+    if 'account_name' in options:
+        result['account'] = options['account_name']
+    return result
+
+
+def _check_companies(companies):
+    """Throw unless the user may read every company of the batch."""
+    for company in sorted(set(companies)):
+        frappe.has_permission('Company', doc=company, throw=True)
+
+
+def _resolve_in_tree(tree, account_name, company):
+    """Same as resolve_company_account, against a cached tree."""
+    abbr = frappe.get_cached_value('Company', company, 'abbr')
+    for name in (account_name, f"{account_name} - {abbr}"):
+        if name in tree:
+            return name
+    return None
+
+
+def _parse_batch(value):
+    value = frappe.parse_json(value) if isinstance(value, str) else value
+    if not isinstance(value, list):
+        frappe.throw('Expected a list of operations')
+    if len(value) > MAX_BATCH:
+        frappe.throw(f'At most {MAX_BATCH} operations per request (got {len(value)})')
+    return value
+
+
+def _file_path(file_url):
+    """Absolute path of an uploaded File, checking the caller may read it."""
+    file_doc = frappe.get_doc('File', {'file_url': file_url})
+    file_doc.check_permission('read')
+    return file_doc.get_full_path()
@@ -1,34 +1,79 @@
+import os
+
 import click
 from frappe.commands import pass_context
 
 
 @click.command('delete-account-recursive')
 @click.argument('account_name')
-@click.argument('company')
+@click.argument('company', required=False)
 @click.option('--dry-run', is_flag=True, default=False, help='Simulate without deleting')
+@click.option('--bulk', is_flag=True, default=False, help='Delete the whole subtree range in one transaction')
+@click.option('--company', 'extra_companies', multiple=True, help='Additional company (repeatable)')
+@click.option('--all-companies', is_flag=True, default=False, help='Run on every company of the site')
+@click.option('--workers', type=int, default=None, help='Worker processes for multi-company runs')
+@click.option('--async', 'run_async', is_flag=True, default=False, help='Enqueue on the long queue; follow with chart-job-status')
+@click.option('--impact-report', default=None, help='Stream every ledger row referencing the subtree to this CSV (or .jsonl) file')
+@click.option('--profile', is_flag=True, default=False, help='Print per-statement query counts and latencies and time per phase')
+@click.option('--profile-output', default=None, help='With --profile, also write a JSON report (or a cProfile dump for .prof/.pstats)')
 @pass_context
-def delete_account_recursive(context, account_name, company, dry_run):
+def delete_account_recursive(context, account_name, company, dry_run, bulk, extra_companies, all_companies, workers, run_async,
+                             impact_report, profile, profile_output):
     """
     Delete an ERPNext account recursively, including all child accounts.
     
+    With several companies (--company, --all-companies) ACCOUNT_NAME may be
+    given without the company abbreviation; it is resolved per company and
+    the companies are processed in parallel by a worker pool.
+    
     Example:
         bench --site erpnext.example.com delete-account-recursive "PRODUCTION COSTS - D-CASA" "DM-CASA"
         bench --site erpnext.example.com delete-account-recursive "PRODUCTION COSTS - D-CASA" "DM-CASA" --dry-run
+        bench --site erpnext.example.com delete-account-recursive "PRODUCTION COSTS - D-CASA" "DM-CASA" --bulk
+        bench --site erpnext.example.com delete-account-recursive "PRODUCTION COSTS" --all-companies --dry-run
+        bench --site erpnext.example.com delete-account-recursive "PRODUCTION COSTS - D-CASA" "DM-CASA" --async
+        bench --site erpnext.example.com delete-account-recursive "PRODUCTION COSTS - D-CASA" "DM-CASA" --profile
+        bench --site erpnext.example.com delete-account-recursive "PRODUCTION COSTS - D-CASA" "DM-CASA" --dry-run --impact-report impact.csv
     """
     import frappe
     from dm_erpnext_utilities.commands.account_manager import delete_account_and_children
     
-    frappe.init(site=context.sites[0])
+    site = context.sites[0]
+    frappe.init(site=site)
     frappe.connect()
     
     try:
+        companies = _get_companies([company] if company else [], extra_companies, all_companies)
+        if impact_report and run_async:
+            print("❌ ERROR: --impact-report cannot be used with --async")
+            exit(1)
+        if impact_report and len(companies) > 1 and '{company}' not in impact_report:
+            # One file per company
+            root, ext = os.path.splitext(impact_report)
+            impact_report = f"{root}-{{company}}{ext}"
+        
         print(f"\n📊 Configuration:")
         print(f"   Account: {account_name}")
-        print(f"   Company: {company}")
+        print(f"   Company: {', '.join(companies)}")
         print(f"   Mode: {'DRY-RUN (simulation)' if dry_run else 'REAL EXECUTION'}")
+        print(f"   Bulk: {'YES' if bulk else 'NO'}")
+        if impact_report:
+            print(f"   Impact report: {impact_report}")
         print()
         
-        result = delete_account_and_children(account_name, company, dry_run)
+        with _profiling(profile, profile_output):
+            if run_async:
+                result = _enqueue_jobs('delete', companies,
+                    {'account_name': account_name, 'dry_run': dry_run, 'bulk': bulk})
+            elif len(companies) == 1:
+                result = delete_account_and_children(account_name, companies[0], dry_run, bulk=bulk,
+                                                     impact_report=impact_report)
+            else:
+                result = _run_multi_company(site, companies,
+                    'dm_erpnext_utilities.commands.account_manager.delete_company_account',
+                    {'account_name': account_name, 'dry_run': dry_run, 'bulk': bulk,
+                     'impact_report': impact_report and os.path.abspath(impact_report)},
+                    workers)
         
         if result:
             print("\n✅ Operation completed successfully!")
@@ -45,46 +90,613 @@ def delete_account_recursive(context, account_name, company, dry_run):
         frappe.destroy()
 
 
-@click.command('import-chart-of-accounts')
-@click.argument('csv_files', nargs=-1, required=True)
+@click.command('merge-account-subtree')
+@click.argument('source')
+@click.argument('target')
 @click.argument('company')
+@click.option('--chunk-size', type=int, default=None, help='Ledger rows re-pointed per UPDATE and transaction (default 5000)')
+@click.option('--dry-run', is_flag=True, default=False, help='Report the rows that would be moved without changing anything')
+@click.option('--keep-source', is_flag=True, default=False, help='Do not delete the emptied subtree')
+@click.option('--profile', is_flag=True, default=False, help='Print per-statement query counts and latencies and time per phase')
+@click.option('--profile-output', default=None, help='With --profile, also write a JSON report (or a cProfile dump for .prof/.pstats)')
+@pass_context
+def merge_account_subtree(context, source, target, company, chunk_size, dry_run, keep_source, profile, profile_output):
+    """
+    Move every ledger reference of SOURCE and its children to TARGET.
+    
+    GL Entry, Payment Ledger Entry, Journal Entry Account and every other
+    doctype linking to Account are re-pointed with chunked UPDATEs, each
+    chunk in its own short transaction. The emptied subtree is then
+    deleted. TARGET must be a ledger account with the same root type.
+    
+    Example:
+        bench --site erpnext.example.com merge-account-subtree "OLD EXPENSES - D-CASA" "Other Expenses - D-CASA" "DM-CASA" --dry-run
+        bench --site erpnext.example.com merge-account-subtree "OLD EXPENSES" "Other Expenses" "DM-CASA"
+        bench --site erpnext.example.com merge-account-subtree "OLD EXPENSES" "Other Expenses" "DM-CASA" --chunk-size 2000
+    """
+    import frappe
+    from dm_erpnext_utilities.commands.account_merge import MERGE_CHUNK_SIZE
+    from dm_erpnext_utilities.commands.account_merge import merge_account_subtree as merge_subtree
+    
+    site = context.sites[0]
+    frappe.init(site=site)
+    frappe.connect()
+    
+    try:
+        print(f"\n📊 Configuration:")
+        print(f"   Source: {source}")
+        print(f"   Target: {target}")
+        print(f"   Company: {company}")
+        print(f"   Mode: {'DRY-RUN (simulation)' if dry_run else 'REAL EXECUTION'}")
+        print(f"   Chunk size: {chunk_size or MERGE_CHUNK_SIZE}")
+        print(f"   Delete source: {'NO' if keep_source else 'YES'}")
+        print()
+        
+        with _profiling(profile, profile_output):
+            result = merge_subtree(source, target, company, chunk_size=chunk_size or MERGE_CHUNK_SIZE,
+                                   dry_run=dry_run, keep_source=keep_source)
+        
+        if result:
+            print("\n✅ Merge completed successfully!")
+        else:
+            print("\n❌ Merge failed.")
+            exit(1)
+            
+    except Exception as e:
+        print(f"\n❌ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        exit(1)
+    finally:
+        frappe.destroy()
+
+
+@click.command('import-chart-of-accounts')
+@click.argument('args', nargs=-1, required=True, metavar='CSV_FILES... COMPANY')
 @click.option('--reset', is_flag=True, default=False, help='Delete existing accounts before importing')
 @click.option('--skip-root', is_flag=True, default=False, help='Skip root accounts (already exist)')
+@click.option('--bulk', is_flag=True, default=False, help='Validate in memory, then batch INSERT with one tree rebuild and one commit')
+@click.option('--keep-used', is_flag=True, default=False, help='With --reset, keep referenced accounts instead of refusing or clearing links')
+@click.option('--company', 'extra_companies', multiple=True, help='Target company (repeatable); all arguments are then files')
+@click.option('--all-companies', is_flag=True, default=False, help='Import into every company; all arguments are then files')
+@click.option('--workers', type=int, default=None, help='Worker processes for multi-company runs')
+@click.option('--async', 'run_async', is_flag=True, default=False, help='Enqueue on the long queue; follow with chart-job-status')
+@click.option('--resume', is_flag=True, default=False, help='Skip rows already applied by an interrupted run of the same files')
+@click.option('--no-lint', is_flag=True, default=False, help='Do not lint the files (see lint-chart) before importing')
+@click.option('--profile', is_flag=True, default=False, help='Print per-statement query counts and latencies and time per phase')
+@click.option('--profile-output', default=None, help='With --profile, also write a JSON report (or a cProfile dump for .prof/.pstats)')
 @pass_context
-def import_chart_of_accounts(context, csv_files, company, reset, skip_root):
+def import_chart_of_accounts(context, args, reset, skip_root, bulk, keep_used, extra_companies, all_companies, workers, run_async, resume,
+                             no_lint, profile, profile_output):
     """
     Import chart of accounts from one or more CSV files.
     
-    Files must be in hierarchical order (level 1, level 2, etc.)
+    Files and rows may be in any order: the chart is sorted topologically
+    and validated (orphans, cycles) before anything is written.
+    
+    The last argument is the company, unless --company or --all-companies
+    is given; several companies are imported in parallel by a worker pool.
+    
+    Progress is checkpointed with every committed batch; after a failure,
+    rerun the same command with --resume to continue where it stopped.
+    
+    The files are linted first (see lint-chart); any lint error stops the
+    import before the database is touched.
     
     Expected CSV format:
     Account Name,Parent Account,Account Type,Company
     
     Example:
         bench --site erpnext.example.com import-chart-of-accounts level2.csv level3.csv level4.csv "DM-CASA"
-        bench --site erpnext.example.com import-chart-of-accounts *.csv "DM-CASA" --skip-root
-        bench --site erpnext.example.com import-chart-of-accounts *.csv "DM-CASA" --reset
+        bench --site erpnext.example.com import-chart-of-accounts plano_de_contas_nivel_[234]*.csv "DM-CASA" --skip-root
+        bench --site erpnext.example.com import-chart-of-accounts plano_de_contas_nivel_[234]*.csv "DM-CASA" --reset
+        bench --site erpnext.example.com import-chart-of-accounts plano_de_contas_nivel_[234]*.csv "DM-CASA" --skip-root --bulk
+        bench --site erpnext.example.com import-chart-of-accounts plano_de_contas_nivel_[234]*.csv --all-companies --skip-root --bulk
+        bench --site erpnext.example.com import-chart-of-accounts plano_de_contas_nivel_[234]*.csv "DM-CASA" --skip-root --async
+        bench --site erpnext.example.com import-chart-of-accounts plano_de_contas_nivel_[234]*.csv "DM-CASA" --skip-root --resume
+        bench --site erpnext.example.com import-chart-of-accounts plano_de_contas_nivel_[234]*.csv "DM-CASA" --skip-root --profile --profile-output import.json
     """
     import frappe
     from dm_erpnext_utilities.commands.account_importer import import_accounts_from_csv
     
-    frappe.init(site=context.sites[0])
+    if extra_companies or all_companies:
+        csv_files, positional_companies = args, []
+    elif len(args) < 2:
+        raise click.UsageError('Expected one or more files followed by COMPANY')
+    else:
+        csv_files, positional_companies = args[:-1], [args[-1]]
+    
+    # Workers may run from another directory; pass absolute paths
+    csv_files = [os.path.abspath(f) for f in csv_files]
+    
+    if not no_lint:
+        from dm_erpnext_utilities.commands.chart_lint import lint_chart_files, print_lint_report
+        
+        lint = lint_chart_files(csv_files)
+        print_lint_report(lint)
+        if lint['errors']:
+            print("❌ Lint failed, nothing was imported (fix the files or pass --no-lint).")
+            exit(1)
+    
+    site = context.sites[0]
+    frappe.init(site=site)
     frappe.connect()
     
     try:
+        companies = _get_companies(positional_companies, extra_companies, all_companies)
+        
         print(f"\n📊 Configuration:")
-        print(f"   Company: {company}")
+        print(f"   Company: {', '.join(companies)}")
         print(f"   Files: {', '.join(csv_files)}")
-        print(f"   Reset: {'YES (delete existing accounts)' if reset else 'NO'}")
+        print(f"   Reset: {'YES (delete existing accounts)' if reset else 'NO'}{' keeping used accounts' if reset and keep_used else ''}")
         print(f"   Skip Root: {'YES' if skip_root else 'NO'}")
+        print(f"   Bulk: {'YES' if bulk else 'NO'}")
+        print(f"   Resume: {'YES' if resume else 'NO'}")
+        print()
+        
+        options = {
+            'csv_files': csv_files,
+            'reset': reset,
+            'skip_root': skip_root,
+            'bulk': bulk,
+            'keep_used': keep_used,
+            'resume': resume,
+        }
+        with _profiling(profile, profile_output):
+            if run_async:
+                result = _enqueue_jobs('import', companies, options)
+            elif len(companies) == 1:
+                result = import_accounts_from_csv(company=companies[0], **options)
+            else:
+                result = _run_multi_company(site, companies,
+                    'dm_erpnext_utilities.commands.account_importer.import_accounts_from_csv',
+                    options, workers)
+        
+        if result:
+            print("\n✅ Import completed successfully!")
+        else:
+            print("\n❌ Import failed.")
+            exit(1)
+            
+    except Exception as e:
+        print(f"\n❌ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        exit(1)
+    finally:
+        frappe.destroy()
+
+
+@click.command('lint-chart')
+@click.argument('files', nargs=-1, required=True)
+@click.option('--workers', type=int, default=None, help='Processes to lint files with (default: one per file, up to the CPU count)')
+@click.option('--strict', is_flag=True, default=False, help='Fail on warnings too')
+@click.option('--limit', type=int, default=None, help='Print at most this many findings')
+def lint_chart(files, workers, strict, limit):
+    """
+    Check chart of accounts files offline, without a site or database.
+    
+    Takes the CSV and JSON files of import-chart-of-accounts and reports
+    every problem at once as file:line: duplicate accounts and numbers,
+    root types that differ from the parent's, account types on groups,
+    parents spelled differently from the account they mean, mixed quoting
+    of Is Group, cycles... Files are parsed in parallel; checks that span
+    files (parents, duplicates) run on all of them together.
+    
+    Example:
+        bench lint-chart templates/account/br/csv/plano_de_contas_nivel_[234]*.csv
+        bench lint-chart chart.json --strict
+    """
+    from dm_erpnext_utilities.commands.chart_lint import lint_chart_files, print_lint_report
+    
+    result = lint_chart_files([os.path.abspath(f) for f in files], workers=workers)
+    print_lint_report(result, limit=limit)
+    
+    if result['errors'] or (strict and result['warnings']):
+        print("❌ Lint failed.")
+        exit(1)
+    print("✅ Lint passed.")
+
+
+@click.command('sync-chart-of-accounts')
+@click.argument('args', nargs=-1, required=True, metavar='CSV_FILES... COMPANY')
+@click.option('--delete', is_flag=True, default=False, help='Also delete accounts missing from the files (unused, non-root)')
+@click.option('--dry-run', is_flag=True, default=False, help='Print the changeset without applying it')
+@click.option('--company', 'extra_companies', multiple=True, help='Target company (repeatable); all arguments are then files')
+@click.option('--all-companies', is_flag=True, default=False, help='Sync every company; all arguments are then files')
+@click.option('--workers', type=int, default=None, help='Worker processes for multi-company runs')
+@click.option('--profile', is_flag=True, default=False, help='Print per-statement query counts and latencies and time per phase')
+@click.option('--profile-output', default=None, help='With --profile, also write a JSON report (or a cProfile dump for .prof/.pstats)')
+@pass_context
+def sync_chart_of_accounts(context, args, delete, dry_run, extra_companies, all_companies, workers, profile, profile_output):
+    """
+    Update an existing chart of accounts to match one or more chart files.
+    
+    Only the difference is written: new accounts, changed fields, new
+    parents, renames (matched by account number) and, with --delete,
+    accounts no longer in the files. Takes the same files as
+    import-chart-of-accounts.
+    
+    Example:
+        bench --site erpnext.example.com sync-chart-of-accounts plano_de_contas_nivel_[234]*.csv "DM-CASA" --dry-run
+        bench --site erpnext.example.com sync-chart-of-accounts plano_de_contas_nivel_[234]*.csv "DM-CASA"
+        bench --site erpnext.example.com sync-chart-of-accounts plano_de_contas_nivel_[234]*.csv "DM-CASA" --delete
+        bench --site erpnext.example.com sync-chart-of-accounts plano_de_contas_nivel_[234]*.csv "DM-CASA" --profile --profile-output sync.prof
+    """
+    import frappe
+    from dm_erpnext_utilities.commands.chart_sync import sync_chart_of_accounts as sync_chart
+    
+    if extra_companies or all_companies:
+        csv_files, positional_companies = args, []
+    elif len(args) < 2:
+        raise click.UsageError('Expected one or more files followed by COMPANY')
+    else:
+        csv_files, positional_companies = args[:-1], [args[-1]]
+    
+    csv_files = [os.path.abspath(f) for f in csv_files]
+    
+    site = context.sites[0]
+    frappe.init(site=site)
+    frappe.connect()
+    
+    try:
+        companies = _get_companies(positional_companies, extra_companies, all_companies)
+        
+        print(f"\n📊 Configuration:")
+        print(f"   Company: {', '.join(companies)}")
+        print(f"   Files: {', '.join(csv_files)}")
+        print(f"   Mode: {'DRY-RUN (simulation)' if dry_run else 'REAL EXECUTION'}")
+        print(f"   Delete missing: {'YES' if delete else 'NO'}")
+        print()
+        
+        options = {'csv_files': csv_files, 'delete': delete, 'dry_run': dry_run}
+        with _profiling(profile, profile_output):
+            if len(companies) == 1:
+                result = sync_chart(company=companies[0], **options)
+            else:
+                result = _run_multi_company(site, companies,
+                    'dm_erpnext_utilities.commands.chart_sync.sync_chart_of_accounts',
+                    options, workers)
+        
+        if result:
+            print("\n✅ Sync completed successfully!")
+        else:
+            print("\n❌ Sync failed.")
+            exit(1)
+            
+    except Exception as e:
+        print(f"\n❌ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        exit(1)
+    finally:
+        frappe.destroy()
+
+
+@click.command('run-chart-manifest')
+@click.argument('manifest_path', metavar='MANIFEST')
+@click.option('--company', 'companies', multiple=True, help='Company for steps without one (repeatable; overrides the manifest)')
+@click.option('--all-companies', is_flag=True, default=False, help='Run steps without a company on every company')
+@click.option('--atomic', is_flag=True, default=False, help='One transaction for the whole manifest, rolled back if any step fails')
+@click.option('--workers', type=int, default=None, help='Worker processes for multi-company runs')
+@click.option('--profile', is_flag=True, default=False, help='Print per-statement query counts and latencies and time per phase')
+@click.option('--profile-output', default=None, help='With --profile, also write a JSON report (or a cProfile dump for .prof/.pstats)')
+@pass_context
+def run_chart_manifest(context, manifest_path, companies, all_companies, atomic, workers, profile, profile_output):
+    """
+    Run the chart operations listed in a YAML or JSON manifest.
+    
+    Steps (delete, import, sync, reparent) run in one bench process; each
+    company's steps run in order and companies run in parallel. File paths
+    are relative to the manifest. See chart_manifest.py for the format.
+    
+    Example:
+        bench --site erpnext.example.com run-chart-manifest year_end.yml
+        bench --site erpnext.example.com run-chart-manifest year_end.yml --atomic
+        bench --site erpnext.example.com run-chart-manifest year_end.json --all-companies --workers 4
+    """
+    import frappe
+    from dm_erpnext_utilities.commands.chart_manifest import (
+        expand_steps,
+        load_manifest,
+        run_company_steps,
+        run_manifest_atomic,
+    )
+    
+    manifest_path = os.path.abspath(manifest_path)
+    
+    site = context.sites[0]
+    frappe.init(site=site)
+    frappe.connect()
+    
+    try:
+        manifest = load_manifest(manifest_path)
+        default_companies = _get_companies([], companies, all_companies) if companies or all_companies else None
+        by_company, errors = expand_steps(manifest, os.path.dirname(manifest_path), default_companies)
+        if errors:
+            print(f"\n❌ Invalid manifest {manifest_path}:")
+            for error in errors:
+                print(f"   ❌ {error}")
+            exit(1)
+        atomic = atomic or bool(manifest.get('atomic'))
+        
+        print(f"\n📊 Configuration:")
+        print(f"   Manifest: {manifest_path}")
+        print(f"   Steps: {len(manifest['steps'])}")
+        print(f"   Company: {', '.join(by_company)}")
+        print(f"   Atomic: {'YES (one transaction)' if atomic else 'NO (commit per step)'}")
+        print()
+        
+        with _profiling(profile, profile_output):
+            if atomic:
+                result = run_manifest_atomic(by_company)
+            elif len(by_company) == 1:
+                company, steps = next(iter(by_company.items()))
+                result = run_company_steps(company, steps)
+            else:
+                result = _run_multi_company(site, list(by_company),
+                    'dm_erpnext_utilities.commands.chart_manifest.run_manifest_company',
+                    {'steps_by_company': by_company}, workers)
+        
+        if result:
+            print("\n✅ Manifest completed successfully!")
+        else:
+            print("\n❌ Manifest failed.")
+            exit(1)
+            
+    except Exception as e:
+        print(f"\n❌ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        exit(1)
+    finally:
+        frappe.destroy()
+
+
+@click.command('chart-job-status')
+@click.argument('job_id', required=False)
+@click.option('--follow', is_flag=True, default=False, help='Keep printing progress until the job ends')
+@click.option('--interval', type=float, default=2.0, help='Seconds between updates with --follow')
+@click.option('--resume', is_flag=True, default=False, help='Re-enqueue an interrupted or failed job')
+@pass_context
+def chart_job_status(context, job_id, follow, interval, resume):
+    """
+    Show the progress of chart jobs started with --async.
+    
+    Without JOB_ID, lists the most recent jobs.
+    
+    Example:
+        bench --site erpnext.example.com chart-job-status
+        bench --site erpnext.example.com chart-job-status 3f9c2a1b7d4e --follow
+        bench --site erpnext.example.com chart-job-status 3f9c2a1b7d4e --resume
+    """
+    import time
+    
+    import frappe
+    from dm_erpnext_utilities.commands.chart_jobs import (
+        format_progress,
+        get_job_progress,
+        get_recent_jobs,
+        resume_chart_job,
+    )
+    
+    frappe.init(site=context.sites[0])
+    frappe.connect()
+    
+    try:
+        if not job_id:
+            jobs = get_recent_jobs()
+            if not jobs:
+                print("ℹ️  No chart jobs found.")
+            for recent in jobs:
+                progress = get_job_progress(recent)
+                if progress:
+                    print(f"{recent}  {format_progress(progress)}")
+            return
+        
+        if resume:
+            resume_chart_job(job_id)
+            print(f"🔁 Job {job_id} re-enqueued on the long queue.")
+        
+        while True:
+            progress = get_job_progress(job_id)
+            if not progress:
+                print(f"❌ Unknown job: {job_id}")
+                exit(1)
+            print(format_progress(progress))
+            if not follow or progress.get('status') in ('finished', 'failed'):
+                break
+            time.sleep(interval)
+        
+        if progress.get('status') == 'failed':
+            exit(1)
+    finally:
+        frappe.destroy()
+
+
+@click.command('chart-lock-status')
+@click.option('--company', 'companies', multiple=True, help='Company to show (repeatable; default: all)')
+@click.option('--last', type=int, default=20, help='Number of recent acquisitions to list')
+@pass_context
+def chart_lock_status(context, companies, last):
+    """
+    Show who holds the chart locks and how long operations wait and hold them.
+    
+    Chart writes take a per-company lock, and structural writes (inserts,
+    deletes, moves, rebuilds) also the site-wide Account nested set lock;
+    the wait before giving up is set with
+    `bench set-config chart_lock_wait SECONDS`.
+    
+    Example:
+        bench --site erpnext.example.com chart-lock-status
+        bench --site erpnext.example.com chart-lock-status --company "DM-CASA" --last 50
+    """
+    import datetime
+    
+    import frappe
+    from dm_erpnext_utilities.commands.chart_lock import (
+        describe_holder,
+        get_holder,
+        get_lock_log,
+        lock_scope,
+        nested_set_scope,
+        summarize_lock_log,
+    )
+    from dm_erpnext_utilities.commands.parallel import get_all_companies
+    
+    frappe.init(site=context.sites[0])
+    frappe.connect()
+    
+    try:
+        scopes = {lock_scope(company) for company in (companies or get_all_companies())}
+        nested_set = nested_set_scope()
+        
+        print(f"\n{'='*60}")
+        print(f"🔒 Chart locks:")
+        for scope in sorted(scopes) + [nested_set]:
+            holder = get_holder(scope)
+            print(f"   {'🔒' if holder else '🔓'} {scope}{describe_holder(holder) or ': free'}")
+        
+        # Without --company, other trees (Cost Center, Item Group...) are listed too
+        entries = [e for e in get_lock_log() if not companies or e['scope'] in scopes or e['scope'] == nested_set]
+        # Nested set holds are short and many; keep them out of the per-company figures
+        for label, subset in (
+            ('Wait / hold times', [e for e in entries if not e['scope'].endswith(':nested set')]),
+            ('Nested set (site-wide) wait / hold times', [e for e in entries if e['scope'].endswith(':nested set')]),
+        ):
+            print(f"\n📊 {label} ({len(subset)} logged acquisitions):")
+            print(f"   {'operation':<10} {'count':>6} {'timeouts':>8} {'wait p50':>9} {'wait p95':>9} "
+                  f"{'hold p50':>9} {'hold p95':>9} {'hold max':>9}")
+            for operation, stats in sorted(summarize_lock_log(subset).items()):
+                print(f"   {operation:<10} {stats['count']:>6} {stats['timeouts']:>8} {stats['wait_p50']:>8.2f}s "
+                      f"{stats['wait_p95']:>8.2f}s {stats['hold_p50']:>8.2f}s {stats['hold_p95']:>8.2f}s "
+                      f"{stats['hold_max']:>8.2f}s")
+        
+        print(f"\n🕒 Last {min(last, len(entries))} acquisitions:")
+        for entry in entries[:last]:
+            at = datetime.datetime.fromtimestamp(entry['at']).strftime('%Y-%m-%d %H:%M:%S')
+            held = 'timed out' if entry['held'] is None else f"held {entry['held']:.2f}s"
+            job = f" job {entry['job']}" if entry.get('job') else ''
+            print(f"   {at} {entry['scope']:<30} {entry['operation']:<10} waited {entry['waited']:.2f}s, {held}{job}")
+        print(f"{'='*60}\n")
+    finally:
+        frappe.destroy()
+
+
+@click.command('delete-tree-recursive')
+@click.argument('doctype')
+@click.argument('name')
+@click.argument('company', required=False)
+@click.option('--dry-run', is_flag=True, default=False, help='Simulate without deleting')
+@click.option('--bulk', is_flag=True, default=False, help='Delete the unused subtree with one set-based DELETE in one transaction')
+@click.option('--profile', is_flag=True, default=False, help='Print per-statement query counts and latencies and time per phase')
+@click.option('--profile-output', default=None, help='With --profile, also write a JSON report (or a cProfile dump for .prof/.pstats)')
+@pass_context
+def delete_tree_recursive(context, doctype, name, company, dry_run, bulk, profile, profile_output):
+    """
+    Delete a Cost Center, Item Group or Territory and all its children.
+    
+    Same engine as delete-account-recursive: the subtree is read with one
+    nested-set query and every doctype linking to DOCTYPE is checked for
+    references before anything is deleted. COMPANY is needed for Cost
+    Center (and Account) and lets NAME omit the company abbreviation.
+    
+    Example:
+        bench --site erpnext.example.com delete-tree-recursive "Cost Center" "Obras" "DM-CASA" --dry-run
+        bench --site erpnext.example.com delete-tree-recursive "Item Group" "Old Products" --bulk
+    """
+    import frappe
+    from dm_erpnext_utilities.commands.tree_manager import TREE_DOCTYPES, delete_tree_node
+    
+    site = context.sites[0]
+    frappe.init(site=site)
+    frappe.connect()
+    
+    try:
+        if doctype not in TREE_DOCTYPES:
+            print(f"❌ ERROR: Unsupported doctype '{doctype}' (expected one of {', '.join(TREE_DOCTYPES)})")
+            exit(1)
+        if TREE_DOCTYPES[doctype]['company'] and not company:
+            print(f"❌ ERROR: {doctype} needs COMPANY")
+            exit(1)
+        
+        print(f"\n📊 Configuration:")
+        print(f"   DocType: {doctype}")
+        print(f"   Name: {name}")
+        if company:
+            print(f"   Company: {company}")
+        print(f"   Mode: {'DRY-RUN (simulation)' if dry_run else 'REAL EXECUTION'}")
+        print(f"   Bulk: {'YES' if bulk else 'NO'}")
         print()
         
-        result = import_accounts_from_csv(
-            csv_files=csv_files,
-            company=company,
-            reset=reset,
-            skip_root=skip_root
-        )
+        with _profiling(profile, profile_output):
+            result = delete_tree_node(doctype, name, company, dry_run=dry_run, bulk=bulk)
+        
+        if result:
+            print("\n✅ Operation completed successfully!")
+        else:
+            print("\n❌ Operation failed.")
+            exit(1)
+            
+    except Exception as e:
+        print(f"\n❌ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        exit(1)
+    finally:
+        frappe.destroy()
+
+
+@click.command('import-tree')
+@click.argument('doctype')
+@click.argument('csv_files', nargs=-1, required=True)
+@click.option('--company', default=None, help='Company (required for Cost Center and Account)')
+@click.option('--bulk', is_flag=True, default=False, help='Validate in memory, then batch INSERT with one tree rebuild and one commit')
+@click.option('--profile', is_flag=True, default=False, help='Print per-statement query counts and latencies and time per phase')
+@click.option('--profile-output', default=None, help='With --profile, also write a JSON report (or a cProfile dump for .prof/.pstats)')
+@pass_context
+def import_tree(context, doctype, csv_files, company, bulk, profile, profile_output):
+    """
+    Import a Cost Center, Item Group or Territory tree from CSV files.
+    
+    Rows may be in any order; parents are given by name or title and an
+    empty parent means the doctype's root. The whole tree is validated
+    (unknown parents, cycles, duplicates) before anything is written.
+    
+    Expected CSV format (Data Import headers or Portuguese labels):
+        Cost Center Name,Parent Cost Center,Cost Center Number,Is Group
+        Item Group Name,Parent Item Group,Is Group
+        Territory Name,Parent Territory,Is Group
+    
+    Example:
+        bench --site erpnext.example.com import-tree "Cost Center" centros.csv --company "DM-CASA" --bulk
+        bench --site erpnext.example.com import-tree "Item Group" grupos.csv
+    """
+    import frappe
+    from dm_erpnext_utilities.commands.tree_manager import TREE_DOCTYPES, import_tree_from_csv
+    
+    site = context.sites[0]
+    frappe.init(site=site)
+    frappe.connect()
+    
+    try:
+        if doctype not in TREE_DOCTYPES:
+            print(f"❌ ERROR: Unsupported doctype '{doctype}' (expected one of {', '.join(TREE_DOCTYPES)})")
+            exit(1)
+        if TREE_DOCTYPES[doctype]['company'] and not company:
+            print(f"❌ ERROR: {doctype} needs --company")
+            exit(1)
+        
+        print(f"\n📊 Configuration:")
+        print(f"   DocType: {doctype}")
+        print(f"   Files: {', '.join(csv_files)}")
+        if company:
+            print(f"   Company: {company}")
+        print(f"   Bulk: {'YES' if bulk else 'NO'}")
+        print()
+        
+        with _profiling(profile, profile_output):
+            result = import_tree_from_csv(doctype, list(csv_files), company, bulk=bulk)
         
         if result:
             print("\n✅ Import completed successfully!")
@@ -101,7 +713,101 @@ def import_chart_of_accounts(context, csv_files, company, reset, skip_root):
         frappe.destroy()
 
 
+@click.command('compile-chart-templates')
+@click.option('--force', is_flag=True, default=False, help='Recompile every template, even unchanged ones')
+@pass_context
+def compile_chart_templates(context, force):
+    """
+    Compile the chart of accounts templates shipped by installed apps.
+    
+    Runs by itself after install and migrate; only templates whose file
+    changed are parsed again. Use it after editing a template, or to see
+    the validation errors of one.
+    
+    Example:
+        bench --site erpnext.example.com compile-chart-templates
+        bench --site erpnext.example.com compile-chart-templates --force
+    """
+    import frappe
+    from dm_erpnext_utilities.commands import chart_templates
+    
+    frappe.init(site=context.sites[0])
+    frappe.connect()
+    
+    try:
+        result = chart_templates.compile_chart_templates(force=force)
+        chart_templates.print_compile_summary(result)
+        
+        if result['errors']:
+            print("❌ Some templates are invalid.")
+            exit(1)
+        print("✅ Templates compiled successfully!")
+            
+    except Exception as e:
+        print(f"\n❌ ERROR: {e}")
+        import traceback
+        traceback.print_exc()
+        exit(1)
+    finally:
+        frappe.destroy()
+
+
+def _enqueue_jobs(operation, companies, options):
+    """Enqueue one background job per company and print their ids."""
+    from dm_erpnext_utilities.commands.chart_jobs import enqueue_chart_job
+    
+    print(f"📨 Enqueuing {len(companies)} job(s) on the long queue...")
+    for company in companies:
+        job_id = enqueue_chart_job(operation, company, options)
+        print(f"   {company}: {job_id}")
+    print("\nFollow progress with:")
+    print("  bench --site erpnext.example.com chart-job-status JOB_ID --follow")
+    return True
+
+
+def _profiling(profile, output):
+    """Return a QueryProfiler with --profile, else a no-op context."""
+    import contextlib
+    
+    from dm_erpnext_utilities.commands.profiler import QueryProfiler
+    
+    if not profile:
+        return contextlib.nullcontext()
+    if output:
+        output = os.path.abspath(output)
+    return QueryProfiler(output)
+
+
+def _get_companies(companies, extra_companies, all_companies):
+    """Merge positional, --company and --all-companies into one list."""
+    from dm_erpnext_utilities.commands.parallel import get_all_companies
+    
+    if all_companies:
+        return get_all_companies()
+    companies = list(dict.fromkeys(list(companies) + list(extra_companies)))
+    if not companies:
+        raise click.UsageError('Give a COMPANY, --company or --all-companies')
+    return companies
+
+
+def _run_multi_company(site, companies, method, options, workers):
+    """Fan an operation out over companies and print the merged summary."""
+    from dm_erpnext_utilities.commands.parallel import print_company_summary, run_for_companies
+    
+    results = run_for_companies(site, companies, method, options, workers=workers)
+    return print_company_summary(results)
+
+
 commands = [
     delete_account_recursive,
+    merge_account_subtree,
     import_chart_of_accounts,
+    lint_chart,
+    sync_chart_of_accounts,
+    run_chart_manifest,
+    chart_job_status,
+    chart_lock_status,
+    delete_tree_recursive,
+    import_tree,
+    compile_chart_templates,
 ]
@@ -1,20 +1,63 @@
 """
-Chart of Accounts importer from CSV files.
+Chart of Accounts importer from CSV and JSON chart files.
 """
 import frappe
-import csv
 import os
+import time
 
+from dm_erpnext_utilities.commands.account_manager import reset_company_accounts
+from dm_erpnext_utilities.commands.account_tree import AccountTree
+from dm_erpnext_utilities.commands.chart_lock import company_locked, nested_set_lock
+from dm_erpnext_utilities.commands.chart_reader import read_chart
+from dm_erpnext_utilities.commands.import_journal import (
+    applied_count,
+    clear_journal,
+    is_applied,
+    mark_applied,
+    open_journal,
+    save_journal,
+    unmark_applied,
+)
+from dm_erpnext_utilities.commands.nestedset import rebuild_nested_set
+from dm_erpnext_utilities.commands.profiler import profile_phase
 
-def import_accounts_from_csv(csv_files, company, reset=False, skip_root=False):
+# Rows per multi-row INSERT statement in bulk mode
+BULK_INSERT_CHUNK_SIZE = 500
+
+# Accounts per committed batch when inserting document by document
+IMPORT_BATCH_SIZE = 100
+
+REPORT_TYPES = {
+    'Asset': 'Balance Sheet',
+    'Liability': 'Balance Sheet',
+    'Equity': 'Balance Sheet',
+    'Income': 'Profit and Loss',
+    'Expense': 'Profit and Loss',
+}
+
+
+@company_locked('import')
+def import_accounts_from_csv(csv_files, company, reset=False, skip_root=False, bulk=False,
+                             keep_used=False, resume=False, commit=True):
     """
-    Import chart of accounts from one or more CSV files.
+    Import chart of accounts from one or more CSV or JSON chart files.
+    
+    Files and rows may come in any order: the whole chart is read into a
+    parent/child graph, validated (orphans, cycles, duplicates) before
+    anything is written, and created level by level, parents first.
     
     Args:
-        csv_files: List of paths to CSV files
+        csv_files: List of paths to CSV or JSON chart files (see chart_reader)
         company: Company name
         reset: If True, delete existing accounts before importing
+        keep_used: With reset, keep accounts referenced by any registered usage table
         skip_root: If True, skip importing root accounts (already exist)
+        bulk: If True, validate all files in memory and insert them with
+            batched multi-row INSERTs, one nested-set rebuild and one commit
+        resume: Skip the rows an interrupted run of the same files already
+            committed, as recorded in the checkpoint journal
+        commit: Commit batch by batch; False writes everything in the
+            caller's transaction (an atomic manifest)
     
     Returns:
         True if success, False if failure
@@ -29,108 +72,493 @@ def import_accounts_from_csv(csv_files, company, reset=False, skip_root=False):
         print(f"❌ ERROR: Company '{company}' does not exist!")
         return False
     
-    # Reset: delete existing non-root accounts
-    if reset:
+    journal = open_journal(company, [f for f in csv_files if os.path.exists(f)], resume=resume)
+    if resume:
+        print(f"⏩ RESUME: {applied_count(journal)} row(s) already applied by a previous run\n")
+    
+    # Reset: delete existing non-root accounts (done already if resuming)
+    if reset and not applied_count(journal):
         print("🗑️  RESET: Deleting existing accounts (except root)...\n")
-        existing_accounts = frappe.get_all('Account',
-            filters={
-                'company': company,
-                'parent_account': ['!=', '']
-            },
-            fields=['name', 'account_name']
-        )
-        
-        print(f"   Found {len(existing_accounts)} accounts to delete...")
-        deleted = 0
-        for acc in existing_accounts:
-            try:
-                frappe.delete_doc('Account', acc.name, force=1, ignore_permissions=True)
-                deleted += 1
-            except Exception as e:
-                print(f"   ⚠️  Error deleting {acc.name}: {e}")
-        
+        outcome = reset_company_accounts(company, keep_used=keep_used, commit=commit)
+        if not outcome['ok']:
+            return False
+        print(f"   ✅ Deleted {outcome['deleted']} accounts, kept {outcome['kept']} "
+              f"in {outcome['elapsed']:.2f}s\n")
+        profile_phase('reset')
+    
+    start = time.perf_counter()
+    plan = plan_import(csv_files, company, skip_root=skip_root, journal=journal)
+    profile_phase('plan')
+    
+    if plan['errors']:
+        print(f"\n❌ Validation failed, nothing was imported:")
+        for error in plan['errors']:
+            print(f"   ❌ {error}")
+        print_import_summary(0, plan['skipped'], len(plan['errors']), time.perf_counter() - start)
+        return False
+    
+    total = sum(len(level) for level in plan['levels'])
+    print(f"\n🌳 {total} account(s) to create in {len(plan['levels'])} level(s)\n")
+    
+    if bulk:
+        imported, errors = bulk_insert_accounts(plan, company, commit=commit)
+    else:
+        imported, errors = insert_accounts_by_level(plan, company, commit=commit)
+    profile_phase('insert')
+    
+    if errors == 0 and commit:
+        clear_journal(journal)
         frappe.db.commit()
-        print(f"   ✅ Deleted {deleted} accounts\n")
+        profile_phase('commit')
     
-    # Process each CSV file
-    total_imported = 0
-    total_skipped = 0
-    total_errors = 0
+    # Final summary
+    print_import_summary(imported, plan['skipped'], errors, time.perf_counter() - start)
+    
+    return errors == 0
+
+
+def print_import_summary(imported, skipped, errors, elapsed):
+    """Print the final import report, including throughput."""
+    rate = imported / elapsed if elapsed > 0 else 0
+    print(f"{'='*60}")
+    print(f"📊 Import Summary:")
+    print(f"   ✅ Imported: {imported}")
+    print(f"   ⏭️  Skipped: {skipped}")
+    print(f"   ❌ Errors: {errors}")
+    print(f"   ⏱️  Elapsed: {elapsed:.2f}s ({rate:.1f} rows/s)")
+    print(f"{'='*60}\n")
+
+
+def plan_import(csv_files, company, skip_root=False, journal=None):
+    """
+    Read every file and sort the accounts to create topologically.
+    
+    Names are computed with ERPNext's autoname rule and parents are
+    resolved against the existing chart and the rows being imported, in
+    any file or row order. Rows whose parent cannot be found (orphans),
+    rows that take part in a parent cycle and all their descendants are
+    reported as errors before anything is written. Root and report types
+    are inherited from the parent, as Account.validate would do.
+    
+    Rows the checkpoint journal marks as applied are skipped before they
+    are named or looked up; their accounts are already in the index.
+    
+    Returns:
+        Dict with 'levels' (list of lists of rows, parents before
+        children), 'existing', 'index', 'journal',
+        'skipped', 'resumed' and 'errors'
+    """
+    from erpnext.accounts.doctype.account.account import get_account_autoname
     
+    index = build_account_index(company)
+    existing = index['accounts']
+    
+    # Pass 1: name every row
+    pending = {}
+    errors = []
+    skipped = 0
+    resumed = 0
     for csv_file in csv_files:
         if not os.path.exists(csv_file):
-            print(f"❌ File not found: {csv_file}")
+            errors.append(f"File not found: {csv_file}")
             continue
         
-        print(f"📄 Processing file: {csv_file}")
-        
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            
-            for row in reader:
-                account_name = row.get('Account Name', '').strip()
-                parent_account = row.get('Parent Account', '').strip()
-                account_type = row.get('Account Type', '').strip()
-                account_number = row.get('Account Number', '').strip()
-                
-                if not account_name:
+        print(f"📄 Reading file: {csv_file}")
+        try:
+            for row in read_chart(csv_file):
+                if not row['account_name']:
                     continue
-                
-                # Skip root accounts if skip_root=True
-                if skip_root and not parent_account:
-                    print(f"   ⏭️  Skipping (root): {account_name}")
-                    total_skipped += 1
+                if journal and is_applied(journal, row):
+                    resumed += 1
                     continue
-                
-                # Check if account already exists
-                full_account_name = f"{account_name}"
-                if frappe.db.exists('Account', full_account_name):
-                    print(f"   ⏭️  Already exists: {account_name}")
-                    total_skipped += 1
+                if skip_root and not row['parent_account']:
+                    print(f"   ⏭️  Skipping (root): {row['account_name']}")
+                    skipped += 1
                     continue
                 
-                # Check if parent exists (if specified)
-                if parent_account and not frappe.db.exists('Account', parent_account):
-                    print(f"   ❌ Parent does not exist: {parent_account} (for {account_name})")
-                    total_errors += 1
+                name = get_account_autoname(row['account_number'], row['account_name'], company)
+                match = find_existing_account(index, name, row['account_name'], row['account_number'])
+                if match in existing:
+                    print(f"   ⏭️  Already exists: {match}")
+                    skipped += 1
+                    continue
+                if match in pending:
+                    errors.append(f"{csv_file}:{row['line']}: duplicate account {name}")
+                    continue
+                number_owner = index['by_number'].get(row['account_number'])
+                if row['account_number'] and number_owner:
+                    errors.append(f"{csv_file}:{row['line']}: account number {row['account_number']} already used by {number_owner}")
                     continue
                 
-                # Create account
-                try:
-                    account_doc = frappe.get_doc({
-                        'doctype': 'Account',
-                        'account_name': account_name,
-                        'company': company,
-                        'parent_account': parent_account or None,
-                        'account_type': account_type or None,
-                        'account_number': account_number or None,
-                        'is_group': 0  # By default, not a group
-                    })
-                    
-                    # If has potential children, mark as group
-                    # (this will be adjusted automatically by ERPNext when children are added)
-                    
+                row['name'] = name
+                row['where'] = f"{csv_file}:{row['line']}"
+                pending[name] = row
+                add_to_account_index(index, name, row['account_name'], row['account_number'])
+        except (ValueError, UnicodeDecodeError) as e:
+            errors.append(f"{csv_file}: {e}")
+    
+    # Pass 2: resolve parents
+    for row in pending.values():
+        parent = row['parent_account']
+        parent_name = None
+        if parent:
+            parent_name = resolve_account(index, parent)
+            if not parent_name:
+                errors.append(f"{row['file']}:{row['line']}: parent does not exist: {parent} (for {row['account_name']})")
+            elif parent_name in existing and not existing[parent_name].is_group:
+                errors.append(f"{row['file']}:{row['line']}: parent is not a group: {parent_name}")
+                parent_name = None
+        row['parent_name'] = parent_name
+    
+    # Pass 3: group by depth, parents first, skipping subtrees of orphans
+    orphans = {name for name, row in pending.items() if row['parent_account'] and not row['parent_name']}
+    levels = order_parents_first(pending, errors, orphans)
+    
+    for level in levels:
+        for row in level:
+            if not row['root_type']:
+                parent_name = row['parent_name']
+                parent = existing.get(parent_name) or pending.get(parent_name) or {}
+                row['root_type'] = parent.get('root_type') or ''
+            if row['root_type'] not in REPORT_TYPES:
+                errors.append(f"{row['file']}:{row['line']}: cannot determine root type for {row['account_name']}")
+    
+    if resumed:
+        print(f"   ⏩ Resumed past {resumed} already applied row(s)")
+    
+    return {
+        'levels': levels,
+        'existing': existing,
+        'index': index,
+        'journal': journal,
+        'skipped': skipped,
+        'resumed': resumed,
+        'errors': errors,
+    }
+
+
+def build_account_index(company, doctype='Account'):
+    """
+    Load the company's accounts once into in-memory lookup tables.
+    
+    Keys are case-folded, as MariaDB compares names case-insensitively.
+    The index is kept up to date with add_to_account_index while
+    importing, so existence and parent checks never hit the database.
+    
+    Args:
+        company: Company name (None for trees without a company)
+        doctype: Tree doctype (see tree_manager.TREE_DOCTYPES); its title,
+            number and parent fields are loaded as account_name,
+            account_number and parent_account
+    
+    Returns:
+        Dict with 'accounts' (name -> row), 'abbr', 'by_name',
+        'by_number' and 'by_account_name' (account_name -> list of names)
+    """
+    if doctype == 'Account':
+        fields = ['name', 'account_name', 'account_number', 'parent_account', 'account_type',
+                  'root_type', 'is_group']
+        filters = {'company': company}
+    else:
+        from dm_erpnext_utilities.commands.tree_manager import get_tree_meta
+        
+        meta = get_tree_meta(doctype)
+        fields = ['name', f"`{meta['title_field']}` as account_name", f"`{meta['parent_field']}` as parent_account",
+                  'is_group']
+        if meta['number_field']:
+            fields.append(f"`{meta['number_field']}` as account_number")
+        filters = {'company': company} if meta['company'] else {}
+    
+    index = {
+        'abbr': frappe.get_cached_value('Company', company, 'abbr') if company else None,
+        'accounts': {},
+        'by_name': {},
+        'by_number': {},
+        'by_account_name': {},
+    }
+    for account in frappe.get_all(doctype, filters=filters, fields=fields):
+        index['accounts'][account.name] = account
+        add_to_account_index(index, account.name, account.account_name, account.account_number)
+    return index
+
+
+def add_to_account_index(index, name, account_name, account_number=None):
+    """Register an account (existing, planned or just inserted) in the index."""
+    index['by_name'][name.casefold()] = name
+    if account_number:
+        index['by_number'].setdefault(account_number, name)
+    names = index['by_account_name'].setdefault(account_name.casefold(), [])
+    if name not in names:
+        names.append(name)
+
+
+def find_existing_account(index, name, account_name, account_number=None):
+    """
+    Return the account a row would duplicate, if any.
+    
+    Matches the computed name first (existing or already planned). An
+    existing account with the same account_name also counts when its
+    number is empty or equal, e.g. a chart imported before numbering.
+    """
+    match = index['by_name'].get(name.casefold())
+    if match:
+        return match
+    accounts = index['accounts']
+    candidates = [
+        n for n in index['by_account_name'].get(account_name.casefold(), [])
+        if n in accounts and accounts[n].account_number in (None, '', account_number)
+    ]
+    return candidates[0] if len(candidates) == 1 else None
+
+
+def resolve_account(index, value):
+    """
+    Resolve an account reference the way people write it in a chart.
+    
+    Accepts the full name ("1100 - Ativo Circulante - DC"), the name
+    without the company abbreviation ("1100 - Ativo Circulante" or
+    "Ativo Circulante"), an account number ("1100" or "1100 - ...") or a
+    plain account name when it is unambiguous. Returns None otherwise.
+    """
+    key = value.strip().casefold()
+    by_name = index['by_name']
+    
+    if key in by_name:
+        return by_name[key]
+    
+    abbr = (index['abbr'] or '').casefold()
+    if abbr and f"{key} - {abbr}" in by_name:
+        return by_name[f"{key} - {abbr}"]
+    
+    number, sep, rest = value.strip().partition(' - ')
+    if number in index['by_number']:
+        return index['by_number'][number]
+    
+    if abbr and key.endswith(f" - {abbr}"):
+        key = key[:-len(f" - {abbr}")]
+    names = index['by_account_name'].get(key, [])
+    if len(names) == 1:
+        return names[0]
+    if sep:
+        names = index['by_account_name'].get(rest.casefold(), [])
+        if len(names) == 1:
+            return names[0]
+    return None
+
+
+def order_parents_first(pending, errors, orphans=()):
+    """
+    Check the graph of the rows to create and group them by depth.
+    
+    Shared by the Account importer and tree_manager. Rows hanging off
+    existing records are the roots of the new forest. A row without a
+    declared Is Group becomes a group when it receives children; one
+    declared as a ledger that does receive children, and rows in a parent
+    cycle, are appended to errors as 'where: message'.
+    
+    Args:
+        pending: Dict of name -> row with 'name', 'parent_name' (resolved
+            parent, existing or pending, or None), 'is_group' (0, 1 or
+            None) and 'where' (file:line)
+        errors: List the problems are appended to
+        orphans: Names whose parent could not be resolved (already
+            reported); they and their subtrees are left out
+    
+    Returns:
+        List of levels, each a list of rows; every row comes after its
+        parent
+    """
+    tree = AccountTree(list(pending), [
+        row['parent_name'] if row['parent_name'] in pending else None for row in pending.values()
+    ])
+    
+    for row in pending.values():
+        if row['is_group'] == 0 and tree.has_children(row['name']):
+            errors.append(f"{row['where']}: {row['name']} is not a group but has children")
+        if row['is_group'] is None:
+            row['is_group'] = 1 if tree.has_children(row['name']) else 0
+    
+    levels = []
+    placed = set()
+    for root in tree.roots():
+        if root in orphans:
+            continue
+        for name in tree.subtree(root):
+            depth = tree.depth(name)
+            if depth == len(levels):
+                levels.append([])
+            levels[depth].append(pending[name])
+            placed.add(name)
+    
+    # Anything not reached hangs off an orphan or sits in a cycle
+    for name in _find_cycles(pending, placed):
+        row = pending[name]
+        errors.append(f"{row['where']}: parent cycle through {name} -> {row['parent_name']}")
+    return levels
+
+
+def _find_cycles(pending, placed):
+    """Return the names of unplaced rows that belong to a parent cycle."""
+    in_cycle = []
+    state = {}
+    for start in pending:
+        if start in placed or start in state:
+            continue
+        path = []
+        node = start
+        while node in pending and node not in placed and node not in state:
+            state[node] = start
+            path.append(node)
+            node = pending[node]['parent_name']
+        # Revisiting a node of this walk closes a cycle
+        if state.get(node) == start and node in path:
+            in_cycle.extend(path[path.index(node):])
+    return in_cycle
+
+
+def insert_accounts_by_level(plan, company, failed=None, commit=True):
+    """
+    Create the planned accounts one document at a time, parents first.
+    
+    A commit is made every IMPORT_BATCH_SIZE rows and at the end of each
+    level, together with the checkpoint journal when the plan has one. A
+    row whose parent failed is not attempted.
+    
+    Args:
+        plan: Result of plan_import
+        company: Company name
+        failed: Names of rows that failed so far; pass the same set when a
+            plan is inserted in several calls
+        commit: Commit the batches; False leaves them to the caller
+    
+    Returns:
+        (imported, errors)
+    """
+    imported = 0
+    errors = 0
+    failed = set() if failed is None else failed
+    journal = plan.get('journal')
+    uncommitted = 0
+    
+    for depth, level in enumerate(plan['levels'], start=1):
+        print(f"📂 Level {depth}: {len(level)} account(s)")
+        for row in level:
+            if row['parent_name'] in failed:
+                print(f"   ❌ Parent failed: {row['parent_name']} (for {row['account_name']})")
+                failed.add(row['name'])
+                errors += 1
+                continue
+            
+            try:
+                account_doc = frappe.get_doc({
+                    'doctype': 'Account',
+                    'account_name': row['account_name'],
+                    'company': company,
+                    'parent_account': row['parent_name'],
+                    'account_type': row['account_type'] or None,
+                    'account_number': row['account_number'] or None,
+                    'root_type': row['root_type'] or None,
+                    'is_group': row['is_group']
+                })
+                with nested_set_lock('import'):
                     account_doc.insert(ignore_permissions=True)
-                    print(f"   ✅ Imported: {account_name}")
-                    total_imported += 1
-                    
-                except Exception as e:
-                    print(f"   ❌ Error importing {account_name}: {e}")
-                    total_errors += 1
+                if account_doc.name != row['name']:
+                    add_to_account_index(plan['index'], account_doc.name, row['account_name'], row['account_number'])
+                print(f"   ✅ Imported: {row['account_name']}")
+                imported += 1
+                if journal:
+                    mark_applied(journal, row)
+            except Exception as e:
+                print(f"   ❌ Error importing {row['account_name']}: {e}")
+                failed.add(row['name'])
+                errors += 1
+            
+            uncommitted += 1
+            if uncommitted >= IMPORT_BATCH_SIZE:
+                _commit_batch(journal, commit)
+                uncommitted = 0
         
-        # Commit after each file
-        frappe.db.commit()
-        print(f"   💾 Saved changes from {csv_file}\n")
+        # Commit after each level
+        _commit_batch(journal, commit)
+        uncommitted = 0
+        print(f"   💾 Saved level {depth}\n")
     
-    # Final summary
-    print(f"{'='*60}")
-    print(f"📊 Import Summary:")
-    print(f"   ✅ Imported: {total_imported}")
-    print(f"   ⏭️  Skipped: {total_skipped}")
-    print(f"   ❌ Errors: {total_errors}")
-    print(f"{'='*60}\n")
+    return imported, errors
+
+
+def _commit_batch(journal, commit=True):
+    if not commit:
+        return
+    # The journal file is rewritten once this commit succeeds
+    if journal:
+        save_journal(journal)
+    frappe.db.commit()
+
+
+def bulk_insert_accounts(plan, company, commit=True):
+    """
+    Insert the planned accounts with batched INSERTs.
+    
+    Rows are written with multi-row INSERTs, `lft`/`rgt` are rebuilt once
+    with rebuild_nested_set and the transaction is committed once, with
+    the checkpoint journal if any; any failure rolls everything back. The
+    nested set lock is taken before the first INSERT and kept until that
+    commit, so companies imported at the same time never rebuild over
+    each other's rows. With commit=False the rows are left for the
+    caller to commit.
+    
+    Returns:
+        (imported, errors)
+    """
+    rows = [row for level in plan['levels'] for row in level]
+    journal = plan.get('journal')
+    print(f"💾 Inserting {len(rows)} account(s) in batches of {BULK_INSERT_CHUNK_SIZE}...")
+    try:
+        with nested_set_lock('import'):
+            insert_account_rows(rows, company)
+            rebuild_nested_set('Account')
+        if journal:
+            for row in rows:
+                mark_applied(journal, row)
+        _commit_batch(journal, commit)
+    except Exception as e:
+        frappe.db.rollback()
+        if journal:
+            for row in rows:
+                unmark_applied(journal, row)
+        print(f"   ❌ Bulk insert failed, rolled back: {e}")
+        return 0, len(rows)
+    
+    return len(rows), 0
+
+
+def insert_account_rows(rows, company):
+    """
+    Write planned rows with multi-row INSERTs, leaving lft/rgt at 0.
+    
+    Rows need 'name', 'parent_name', 'root_type' and 'is_group' set. The
+    caller rebuilds the nested set and commits.
+    """
+    from frappe.utils import now as now_datetime
     
-    return total_errors == 0
+    currency = frappe.get_cached_value('Company', company, 'default_currency')
+    now = now_datetime()
+    user = frappe.session.user
+    fields = [
+        'name', 'owner', 'creation', 'modified', 'modified_by', 'docstatus', 'idx',
+        'account_name', 'account_number', 'company', 'parent_account', 'old_parent',
+        'account_type', 'root_type', 'report_type', 'account_currency', 'is_group',
+        'lft', 'rgt',
+    ]
+    values = [(
+        row['name'], user, now, now, user, 0, 0,
+        row['account_name'], row['account_number'] or None, company,
+        row['parent_name'], row['parent_name'],
+        row['account_type'] or None, row['root_type'], REPORT_TYPES[row['root_type']], currency,
+        row['is_group'],
+        0, 0,
+    ) for row in rows]
+    frappe.db.bulk_insert('Account', fields, values, chunk_size=BULK_INSERT_CHUNK_SIZE)
 
 
 def get_root_accounts(company):
@@ -1,60 +1,201 @@
 """
 Account management functions for ERPNext.
 """
+import time
+
 import frappe
 
+from dm_erpnext_utilities.commands.account_tree import AccountTree
+from dm_erpnext_utilities.commands.account_usage import get_usage_checks, split_usage_checks
+from dm_erpnext_utilities.commands.chart_lock import company_locked, nested_set_lock
+from dm_erpnext_utilities.commands.nestedset import rebuild_nested_set
+from dm_erpnext_utilities.commands.profiler import profile_phase
+from dm_erpnext_utilities.commands.tree_cache import get_company_tree, invalidate_company_trees
+
+# Accounts per batched DELETE statement
+DELETE_CHUNK_SIZE = 500
+
 
 def find_children_recursive(account_name, company):
-    """Find all children of an account recursively."""
-    children = []
+    """
+    Find all children of an account recursively.
+    
+    The whole subtree is loaded with a single query on the nested-set
+    bounds (lft/rgt). Ordering by rgt returns a post-order walk, so every
+    account comes after all of its descendants (children before parent).
+    Falls back to find_children_in_memory when the bounds are not usable,
+    e.g. while a nested-set rebuild is pending.
+    """
+    bounds = frappe.db.get_value('Account', account_name, ['lft', 'rgt'], as_dict=True)
+    if not bounds:
+        return []
+    
+    if not bounds.lft or not bounds.rgt or bounds.rgt <= bounds.lft:
+        return find_children_in_memory(account_name, company)
     
-    # Find direct children
-    direct_children = frappe.get_all('Account',
+    # A leaf has rgt == lft + 1, nothing to fetch
+    if bounds.rgt - bounds.lft == 1:
+        return []
+    
+    return frappe.get_all('Account',
         filters={
-            'parent_account': account_name,
-            'company': company
+            'company': company,
+            'lft': ['>', bounds.lft],
+            'rgt': ['<', bounds.rgt]
         },
-        fields=['name', 'account_name', 'is_group']
+        fields=['name', 'account_name', 'is_group'],
+        order_by='rgt asc'
     )
+
+
+def find_children_in_memory(account_name, company):
+    """
+    Find all children of an account from one company-wide fetch.
     
-    for child in direct_children:
-        # First add grandchildren (recursion)
-        grandchildren = find_children_recursive(child.name, company)
-        children.extend(grandchildren)
-        # Then add the child
-        children.append(child)
-    
-    return children
+    The company's tree comes from the tree cache (one query when cold)
+    and is walked in memory, so it does not depend on lft/rgt being
+    consistent. Accounts caught in a corrupt parent cycle are never
+    reached, so the walk always ends.
+    """
+    tree = get_company_tree(company)
+    if account_name not in tree:
+        return []
+    return tree.leaves_first(account_name)
+
+
+# Result keys kept for the historical per-account dict shape;
+# every other registered doctype is summed into 'other_entries'
+USAGE_KEYS = {
+    'GL Entry': 'gl_entries',
+    'Journal Entry Account': 'journal_entries',
+    'Payment Entry': 'payment_entries',
+}
+
+# Maximum number of account names sent in a single IN (...) list
+USAGE_CHUNK_SIZE = 500
 
 
 def check_account_has_transactions(account_name):
     """Check if account has transactions."""
-    # Check General Ledger Entries
-    gl_entries = frappe.db.count('GL Entry', filters={'account': account_name})
+    return check_accounts_have_transactions([account_name])[account_name]
+
+
+def check_accounts_have_transactions(account_names, chunk_size=USAGE_CHUNK_SIZE, doctype='Account', checks=None):
+    """
+    Check transactions for many accounts at once.
+    
+    Every (doctype, link field) pair in the usage registry is probed in a
+    single `UNION ALL` of `GROUP BY` queries per chunk of at most
+    chunk_size account names, so the database scans all tables in one
+    round trip.
+    
+    Args:
+        account_names: Iterable of Account names
+        chunk_size: Maximum number of names per IN (...) list
+        doctype: Tree doctype the names belong to (e.g. 'Cost Center'),
+            selecting its usage registry
+        checks: (doctype, fieldname) pairs to probe instead of the whole
+            registry (see account_usage.split_usage_checks)
+    
+    Returns:
+        Dict of account name -> {'gl_entries', 'journal_entries',
+        'payment_entries', 'other_entries', 'total', 'by_doctype'}
+    """
+    account_names = list(dict.fromkeys(account_names))
+    usage = {name: _empty_usage() for name in account_names}
+    checks = get_usage_checks(doctype) if checks is None else checks
+    if not checks:
+        return usage
+    
+    query = ' UNION ALL '.join(f"""
+        SELECT %(doctype_{i})s, `{fieldname}`, COUNT(*)
+        FROM `tab{usage_doctype}`
+        WHERE `{fieldname}` IN %(accounts)s
+        GROUP BY `{fieldname}`
+    """ for i, (usage_doctype, fieldname) in enumerate(checks))
+    doctype_params = {f'doctype_{i}': usage_doctype for i, (usage_doctype, _) in enumerate(checks)}
+    
+    for chunk in _chunks(account_names, chunk_size):
+        rows = frappe.db.sql(query, dict(doctype_params, accounts=tuple(chunk)))
+        for usage_doctype, account, count in rows:
+            # MariaDB compares case-insensitively; ignore stray spellings
+            if account not in usage:
+                continue
+            entry = usage[account]
+            entry[USAGE_KEYS.get(usage_doctype, 'other_entries')] += count
+            entry['by_doctype'][usage_doctype] = entry['by_doctype'].get(usage_doctype, 0) + count
+            entry['total'] += count
+    
+    return usage
+
+
+def any_account_has_transactions(account_names, chunk_size=USAGE_CHUNK_SIZE, doctype='Account', checks=None):
+    """
+    Return the first (account, doctype) found in use, or None.
     
-    # Check other relevant tables
-    journal_entries = frappe.db.count('Journal Entry Account', filters={'account': account_name})
-    payment_entries = frappe.db.count('Payment Entry', filters={
-        'paid_from': account_name
-    }) + frappe.db.count('Payment Entry', filters={
-        'paid_to': account_name
-    })
+    Early-exit variant of check_accounts_have_transactions for when only a
+    yes/no answer is needed: each table is probed with `LIMIT 1` and the
+    scan stops at the first chunk with a hit.
+    """
+    checks = get_usage_checks(doctype) if checks is None else checks
+    if not checks:
+        return None
+    query = ' UNION ALL '.join(f"""
+        (SELECT %(doctype_{i})s, `{fieldname}`
+        FROM `tab{usage_doctype}`
+        WHERE `{fieldname}` IN %(accounts)s
+        LIMIT 1)
+    """ for i, (usage_doctype, fieldname) in enumerate(checks)) + ' LIMIT 1'
+    doctype_params = {f'doctype_{i}': usage_doctype for i, (usage_doctype, _) in enumerate(checks)}
     
+    for chunk in _chunks(list(account_names), chunk_size):
+        hit = frappe.db.sql(query, dict(doctype_params, accounts=tuple(chunk)))
+        if hit:
+            return hit[0][1], hit[0][0]
+    return None
+
+
+def _empty_usage():
     return {
-        'gl_entries': gl_entries,
-        'journal_entries': journal_entries,
-        'payment_entries': payment_entries,
-        'total': gl_entries + journal_entries + payment_entries
+        'gl_entries': 0,
+        'journal_entries': 0,
+        'payment_entries': 0,
+        'other_entries': 0,
+        'total': 0,
+        'by_doctype': {},
     }
 
 
-def delete_account_and_children(account_name, company, dry_run=False):
-    """Delete an account and all its children."""
+def _chunks(items, size):
+    """Yield successive slices of at most size items."""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+@company_locked('delete')
+def delete_account_and_children(account_name, company, dry_run=False, bulk=False, impact_report=None, commit=True):
+    """
+    Delete an account and all its children.
+    
+    With bulk=True, once the usage preflight shows the subtree is unused,
+    the whole lft..rgt range is removed in one transaction with a single
+    DELETE and the nested-set gap is closed once; any error rolls the
+    whole operation back. Per-phase timings are reported in both modes.
+    
+    With impact_report (a CSV or .jsonl path, where '{company}' is
+    replaced by the company), every row referencing the subtree is
+    streamed to that file after the preflight (see impact_report).
+    
+    With commit=False the deletes are left for the caller to commit or
+    roll back (an atomic manifest).
+    """
+    timings = {}
+    phase_start = time.perf_counter()
     
     print(f"\n{'='*60}")
     print(f"Deleting account: {account_name}")
     print(f"Company: {company}")
-    print(f"Mode: {'DRY RUN (simulation)' if dry_run else 'REAL DELETE'}")
+    print(f"Mode: {'DRY RUN (simulation)' if dry_run else 'REAL DELETE'}{' (bulk)' if bulk else ''}")
     print(f"{'='*60}\n")
     
     # Check if account exists
@@ -72,14 +213,29 @@ def delete_account_and_children(account_name, company, dry_run=False):
     print(f"   Is group: {'Yes' if main_account.is_group else 'No'}")
     print(f"   Root Type: {main_account.root_type}")
     
-    # Check transactions in main account
-    print(f"\n🔍 Checking transactions in main account...")
-    main_transactions = check_account_has_transactions(account_name)
+    # Find all children recursively
+    print(f"\n🔍 Finding child accounts recursively...")
+    children = find_children_recursive(account_name, company)
+    phase_start = _record_phase(timings, 'resolve', phase_start)
+    
+    # Check transactions for the whole subtree in one batched pass
+    print(f"\n🔍 Checking transactions in {len(children) + 1} account(s)...")
+    usage = check_accounts_have_transactions([account_name] + [c.name for c in children])
+    phase_start = _record_phase(timings, 'check', phase_start)
+    if impact_report:
+        from dm_erpnext_utilities.commands.impact_report import write_impact_report
+        
+        used = [name for name, entry in usage.items() if entry['total']]
+        write_impact_report(used, impact_report.replace('{company}', company))
+        phase_start = _record_phase(timings, 'report', phase_start)
+    main_transactions = usage[account_name]
     if main_transactions['total'] > 0:
         print(f"⚠️  WARNING: Main account has {main_transactions['total']} transaction(s):")
         print(f"   - GL Entries: {main_transactions['gl_entries']}")
         print(f"   - Journal Entries: {main_transactions['journal_entries']}")
         print(f"   - Payment Entries: {main_transactions['payment_entries']}")
+        if main_transactions['other_entries']:
+            print(f"   - Other references: {main_transactions['other_entries']}")
         
         if not dry_run:
             print("\n⚠️  Account has transactions! Use --dry-run first to review.")
@@ -87,21 +243,20 @@ def delete_account_and_children(account_name, company, dry_run=False):
     else:
         print("✅ Main account has no transactions.")
     
-    # Find all children recursively
-    print(f"\n🔍 Finding child accounts recursively...")
-    children = find_children_recursive(account_name, company)
-    
     if not children:
         print("ℹ️  No child accounts found.")
     else:
         print(f"📊 Found {len(children)} child account(s):\n")
         
-        # Check transactions in each child
+        # Report transactions in each child
         children_with_transactions = []
         for child in children:
-            trans = check_account_has_transactions(child.name)
+            trans = usage[child.name]
             status = "✅" if trans['total'] == 0 else "⚠️"
-            trans_info = f" ({trans['total']} transactions)" if trans['total'] > 0 else ""
+            trans_info = ""
+            if trans['total'] > 0:
+                breakdown = ', '.join(f"{d}: {n}" for d, n in sorted(trans['by_doctype'].items()))
+                trans_info = f" ({trans['total']} transactions - {breakdown})"
             print(f"   {status} {child.account_name} - {child.name}{trans_info}")
             if trans['total'] > 0:
                 children_with_transactions.append((child, trans))
@@ -123,25 +278,265 @@ def delete_account_and_children(account_name, company, dry_run=False):
         print(f"{'='*60}")
         print("\nTo delete for real, execute without --dry-run:")
         print(f'  bench --site erpnext.example.com delete-account-recursive "{account_name}" "{company}"')
+        print_phase_timings(timings)
         return True
     
+    if bulk:
+        return bulk_delete_subtree(main_account, len(to_delete), timings, phase_start, commit=commit)
+    
     # REAL DELETE - execute directly
-    print(f"\n🗑️  Deleting {len(to_delete)} account(s)...\n")
-    deleted_count = 0
+    delete_docs([account.name for account in to_delete], timings, phase_start, commit=commit)
+    return True
+
+
+def resolve_company_account(account_name, company):
+    """Return the company's account named as given or with its abbreviation suffix."""
+    abbr = frappe.get_cached_value('Company', company, 'abbr')
+    for name in (account_name, f"{account_name} - {abbr}"):
+        if frappe.db.get_value('Account', {'name': name, 'company': company}):
+            return name
+    return None
+
+
+def delete_company_account(account_name, company, dry_run=False, bulk=False, impact_report=None, commit=True):
+    """
+    Delete an account given with or without the company abbreviation.
+    
+    Used by multi-company runs, where the same chart is shared and the
+    account name differs only by each company's abbreviation suffix.
+    """
+    name = resolve_company_account(account_name, company)
+    if not name:
+        print(f"❌ ERROR: Account '{account_name}' does not exist in {company}!")
+        return False
+    return delete_account_and_children(name, company, dry_run, bulk=bulk, impact_report=impact_report,
+                                       commit=commit)
+
+
+def delete_docs(names, timings, phase_start, doctype='Account', commit=True):
+    """
+    Delete records one document at a time, in the given order, and commit
+    (unless commit is False).
+    
+    names must come leaves first (children before parents), as
+    find_children_recursive returns them. Every delete goes through
+    frappe.delete_doc (on_trash checks, Deleted Document records, the
+    nested-set update) under the nested set lock; a failing record is
+    reported and skipped. Shared by the Account deleter and tree_manager.
     
-    for account in to_delete:
+    Returns:
+        Number of records deleted
+    """
+    noun = 'account(s)' if doctype == 'Account' else 'record(s)'
+    print(f"\n🗑️  Deleting {len(names)} {noun}...\n")
+    deleted = 0
+    for name in names:
         try:
-            frappe.delete_doc('Account', account.name, force=1, ignore_permissions=True)
-            deleted_count += 1
-            print(f"   ✅ Deleted: {account.account_name} - {account.name}")
+            with nested_set_lock('delete', doctype):
+                frappe.delete_doc(doctype, name, force=1, ignore_permissions=True)
+            deleted += 1
+            print(f"   ✅ Deleted: {name}")
         except Exception as e:
-            print(f"   ❌ Error deleting {account.name}: {str(e)}")
+            print(f"   ❌ Error deleting {name}: {e}")
+    phase_start = _record_phase(timings, 'delete', phase_start)
     
-    frappe.db.commit()
+    if commit:
+        frappe.db.commit()
+        _record_phase(timings, 'commit', phase_start)
     
     print(f"\n{'='*60}")
     print(f"✅ Operation completed!")
-    print(f"   Accounts deleted: {deleted_count}/{len(to_delete)}")
+    print(f"   {'Accounts' if doctype == 'Account' else 'Records'} deleted: {deleted}/{len(names)}")
     print(f"{'='*60}\n")
+    print_phase_timings(timings)
+    return deleted
+
+
+def bulk_delete_subtree(main_account, expected_count, timings, phase_start, doctype='Account', commit=True):
+    """
+    Remove an unused subtree with one DELETE on its nested-set range.
+    
+    The range is locked and counted first; if it no longer holds exactly
+    the accounts that were checked (a concurrent change), nothing is
+    deleted. The gap is then closed with two UPDATEs over the whole
+    tree, as frappe.utils.nestedset does when removing a node. Works for
+    any nested-set doctype (Account by default, Cost Center, ...).
+    Everything runs in one transaction, under the doctype's nested set
+    lock, that is rolled back on any error and committed at the end unless
+    commit is False.
+    
+    Note: unlike frappe.delete_doc, no Deleted Document or Version
+    records are kept for the removed accounts.
+    """
+    noun = 'account(s)' if doctype == 'Account' else 'record(s)'
+    print(f"\n🗑️  Deleting {expected_count} {noun} in one statement...\n")
+    try:
+        with nested_set_lock('delete', doctype):
+            bounds = frappe.db.get_value(doctype, main_account.name, ['lft', 'rgt'],
+                as_dict=True, for_update=True)
+            if not bounds or not bounds.lft or bounds.rgt <= bounds.lft:
+                raise frappe.ValidationError(
+                    f"Invalid nested-set bounds for {main_account.name}; run rebuild_tree('{doctype}') first")
+            
+            in_range = frappe.db.sql(f"""
+                SELECT COUNT(*) FROM `tab{doctype}`
+                WHERE lft >= %(lft)s AND rgt <= %(rgt)s
+                FOR UPDATE
+            """, bounds)[0][0]
+            if in_range != expected_count:
+                raise frappe.ValidationError(
+                    f"Subtree changed since it was checked ({in_range} records in range, expected {expected_count})")
+            
+            width = bounds.rgt - bounds.lft + 1
+            frappe.db.sql(f"""
+                DELETE FROM `tab{doctype}`
+                WHERE lft >= %(lft)s AND rgt <= %(rgt)s
+            """, bounds)
+            frappe.db.sql(f"""
+                UPDATE `tab{doctype}` SET lft = lft - %(width)s WHERE lft > %(rgt)s
+            """, {'width': width, 'rgt': bounds.rgt})
+            frappe.db.sql(f"""
+                UPDATE `tab{doctype}` SET rgt = rgt - %(width)s WHERE rgt > %(rgt)s
+            """, {'width': width, 'rgt': bounds.rgt})
+            if doctype == 'Account':
+                invalidate_company_trees()
+        phase_start = _record_phase(timings, 'delete', phase_start)
+        
+        if commit:
+            frappe.db.commit()
+            _record_phase(timings, 'commit', phase_start)
+    except Exception as e:
+        frappe.db.rollback()
+        print(f"   ❌ Bulk delete failed, rolled back: {e}")
+        print_phase_timings(timings)
+        return False
+    
+    print(f"{'='*60}")
+    print(f"✅ Operation completed!")
+    print(f"   {'Accounts' if doctype == 'Account' else 'Records'} deleted: {expected_count}/{expected_count}")
+    print(f"{'='*60}\n")
+    print_phase_timings(timings)
     
     return True
+
+
+def reset_company_accounts(company, keep_used=False, commit=True):
+    """
+    Delete every non-root account of a company, leaves first.
+    
+    The deletion set is computed from one query over the company's tree,
+    loaded into an AccountTree and taken leaves first. Accounts
+    are removed with batched DELETE statements, lft/rgt are rebuilt once
+    and the transaction is committed once (rolled back on any error).
+    
+    Ledger references (account_usage.LEDGER_DOCTYPES) block the reset.
+    Configuration references (Company defaults, Mode of Payment Account,
+    Party Account, ...) are cleared in the same transaction, or kept
+    together with their accounts when keep_used is set.
+    
+    Args:
+        company: Company name
+        keep_used: If True, keep accounts referenced by any registered
+            usage table (and their ancestors); otherwise refuse to reset
+            when any account is referenced by a ledger table
+        commit: Commit at the end; False leaves it to the caller
+    
+    Returns:
+        Dict with 'deleted', 'kept', 'cleared' (doctype -> links set to
+        NULL), 'elapsed' and 'ok'
+    """
+    start = time.perf_counter()
+    result = {'deleted': 0, 'kept': 0, 'cleared': {}, 'elapsed': 0.0, 'ok': False}
+    
+    tree = AccountTree.from_company(company, fields=())
+    # Accounts stuck in a parent cycle are not in the walk but go as well
+    names = [node.name for node in tree.leaves_first() if node.parent_account]
+    names += [name for name in tree.unreached() if tree.parent(name)]
+    ledger_checks, config_checks = split_usage_checks()
+    
+    keep = set()
+    if keep_used:
+        usage = check_accounts_have_transactions(names)
+        for name, entry in usage.items():
+            # A used account keeps its whole ancestor chain, roots aside
+            if entry['total']:
+                keep.add(name)
+                keep.update(a for a in tree.ancestors(name) if tree.parent(a))
+    else:
+        # A raw DELETE skips Account.on_trash, so probe every ledger table,
+        # not only GL Entry
+        hit = any_account_has_transactions(names, checks=ledger_checks)
+        if hit:
+            print(f"   ❌ Account {hit[0]} is referenced by {hit[1]}; use --keep-used to keep used accounts")
+            result['elapsed'] = time.perf_counter() - start
+            return result
+    
+    to_delete = [name for name in names if name not in keep]
+    print(f"   Found {len(to_delete)} accounts to delete ({len(keep)} kept)...")
+    
+    try:
+        with nested_set_lock('reset'):
+            if to_delete and config_checks:
+                result['cleared'] = clear_account_links(to_delete, config_checks)
+            for chunk in _chunks(to_delete, DELETE_CHUNK_SIZE):
+                frappe.db.sql("""
+                    DELETE FROM `tabAccount` WHERE name IN %(names)s
+                """, {'names': tuple(chunk)})
+            rebuild_nested_set('Account')
+        if commit:
+            frappe.db.commit()
+    except Exception as e:
+        frappe.db.rollback()
+        print(f"   ❌ Reset failed, rolled back: {e}")
+        result['elapsed'] = time.perf_counter() - start
+        return result
+    
+    for usage_doctype, count in result['cleared'].items():
+        print(f"   🔗 Cleared {count} {usage_doctype} link(s) to deleted accounts")
+    result.update(deleted=len(to_delete), kept=len(keep), ok=True,
+        elapsed=time.perf_counter() - start)
+    return result
+
+
+def clear_account_links(names, checks):
+    """
+    Set the given link fields to NULL where they point at one of names.
+    
+    Only the (doctype, fieldname) pairs found in use are updated. Does
+    not commit.
+    
+    Returns:
+        Dict of doctype -> number of links cleared
+    """
+    hits = {}
+    for name, entry in check_accounts_have_transactions(names, checks=checks).items():
+        for usage_doctype, count in entry['by_doctype'].items():
+            hits[usage_doctype] = hits.get(usage_doctype, 0) + count
+    
+    for usage_doctype, fieldname in checks:
+        if usage_doctype not in hits:
+            continue
+        for chunk in _chunks(list(names), DELETE_CHUNK_SIZE):
+            frappe.db.sql(f"""
+                UPDATE `tab{usage_doctype}` SET `{fieldname}` = NULL
+                WHERE `{fieldname}` IN %(names)s
+            """, {'names': tuple(chunk)})
+        # Company and other cached documents must not serve the old links
+        frappe.clear_cache(doctype=usage_doctype)
+    return hits
+
+
+def _record_phase(timings, phase, started):
+    """Store the elapsed time of a phase and return the new start time."""
+    now = time.perf_counter()
+    timings[phase] = now - started
+    profile_phase(phase)
+    return now
+
+
+def print_phase_timings(timings):
+    """Print the elapsed time of each phase."""
+    print(f"⏱️  Timings:")
+    for phase, elapsed in timings.items():
+        print(f"   {phase:<8} {elapsed*1000:>10.1f} ms")
+    print(f"   {'total':<8} {sum(timings.values())*1000:>10.1f} ms\n")
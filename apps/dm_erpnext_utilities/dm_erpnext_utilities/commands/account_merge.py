@@ -0,0 +1,202 @@
+"""
+Set-based merge of an account subtree into one ledger account.
+
+ERPNext's merge (rename_doc with merge=True) rewrites the references of
+one account document by document. merge_account_subtree moves every
+reference of a whole subtree at once: for each (doctype, link field) in
+the usage registry, rows are re-pointed to the target in chunks of at
+most chunk_size rows. A chunk is one SELECT of primary keys on the
+link-field index plus one UPDATE of exactly those rows, committed on its
+own, so locks on GL Entry are held only for one short transaction. Every
+chunk's updated row count is checked and the totals are compared with
+the usage preflight. The emptied subtree is then deleted in bulk.
+"""
+import time
+
+import frappe
+
+from dm_erpnext_utilities.commands.account_manager import (
+    USAGE_CHUNK_SIZE,
+    check_accounts_have_transactions,
+    delete_account_and_children,
+    find_children_recursive,
+    resolve_company_account,
+)
+from dm_erpnext_utilities.commands.account_usage import get_usage_checks
+from dm_erpnext_utilities.commands.chart_lock import company_locked
+
+# Ledger rows re-pointed per committed chunk
+MERGE_CHUNK_SIZE = 5000
+
+
+@company_locked('merge')
+def merge_account_subtree(source, target, company, chunk_size=MERGE_CHUNK_SIZE, dry_run=False, keep_source=False):
+    """
+    Re-point all references of source and its descendants to target.
+
+    Args:
+        source: Account (group or ledger) whose subtree is merged away;
+            may omit the company abbreviation
+        target: Ledger account receiving the references
+        company: Company name
+        chunk_size: Rows per UPDATE and per transaction
+        dry_run: Only report what would be moved
+        keep_source: Do not delete the emptied subtree
+
+    Returns:
+        True if success, False if failure
+    """
+    print(f"\n{'='*60}")
+    print(f"Merging account subtree")
+    print(f"Company: {company}")
+    print(f"Mode: {'DRY RUN (simulation)' if dry_run else 'REAL MERGE'}")
+    print(f"{'='*60}\n")
+
+    source_name = resolve_company_account(source, company)
+    target_name = resolve_company_account(target, company)
+    if not source_name or not target_name:
+        print(f"❌ ERROR: Account '{source if not source_name else target}' does not exist in {company}!")
+        return False
+
+    names = [c.name for c in find_children_recursive(source_name, company)] + [source_name]
+    errors = validate_merge(names, target_name)
+    if errors:
+        for error in errors:
+            print(f"❌ ERROR: {error}")
+        return False
+
+    print(f"📋 {source_name} ({len(names)} account(s)) → {target_name}")
+
+    # Rows to move per (doctype, field); the totals are checked at the end
+    expected = count_references(names)
+    total = sum(expected.values())
+    for (doctype, fieldname), count in sorted(expected.items()):
+        print(f"   {doctype}.{fieldname}: {count} row(s)")
+    if not total:
+        print("   No references to move.")
+
+    if dry_run:
+        print(f"\n🔍 DRY-RUN mode: {total} row(s) would be re-pointed"
+              f"{'' if keep_source else f' and {len(names)} account(s) deleted'}.")
+        return True
+
+    start = time.perf_counter()
+    moved = {}
+    for (doctype, fieldname), count in sorted(expected.items()):
+        print(f"\n🔀 {doctype}.{fieldname}: re-pointing {count} row(s) in chunks of {chunk_size}...")
+        moved[(doctype, fieldname)] = repoint_references(doctype, fieldname, names, target_name, chunk_size)
+
+    print(f"\n{'='*60}")
+    print(f"📊 Merge Summary:")
+    mismatched = False
+    for key, count in sorted(moved.items()):
+        status = "✅" if count == expected[key] else "⚠️ "
+        mismatched = mismatched or count != expected[key]
+        print(f"   {status} {key[0]}.{key[1]}: {count}/{expected[key]}")
+    elapsed = time.perf_counter() - start
+    print(f"   ⏱️  Elapsed: {elapsed:.2f}s ({sum(moved.values()) / max(elapsed, 1e-6):.0f} rows/s)")
+    print(f"{'='*60}\n")
+    if mismatched:
+        # Rows posted or cancelled meanwhile; the re-check below decides
+        print("⚠️  Moved counts differ from the preflight (concurrent postings?)")
+
+    leftover = [n for n, usage in check_accounts_have_transactions(names).items() if usage['total']]
+    if leftover:
+        print(f"❌ {len(leftover)} account(s) still referenced, subtree kept: {', '.join(leftover[:10])}")
+        return False
+
+    if keep_source:
+        print(f"ℹ️  Subtree {source_name} kept (--keep-source).")
+        return True
+    return delete_account_and_children(source_name, company, bulk=True)
+
+
+def validate_merge(names, target):
+    """Return the reasons the subtree cannot be merged into target."""
+    errors = []
+    if target in names:
+        errors.append(f"Target {target} is inside the subtree being merged")
+        return errors
+
+    target_doc = frappe.db.get_value('Account', target,
+        ['is_group', 'root_type', 'account_currency', 'company'], as_dict=True)
+    if target_doc.is_group:
+        errors.append(f"Target {target} is a group; ledger rows can only point to a ledger account")
+
+    accounts = frappe.get_all('Account',
+        filters={'name': ['in', names]},
+        fields=['name', 'root_type', 'account_currency', 'company']
+    )
+    for account in accounts:
+        if account.company != target_doc.company:
+            errors.append(f"{account.name} belongs to {account.company}, target to {target_doc.company}")
+        elif account.root_type != target_doc.root_type:
+            errors.append(f"{account.name} is {account.root_type}, target is {target_doc.root_type}")
+        elif account.account_currency and target_doc.account_currency \
+                and account.account_currency != target_doc.account_currency:
+            errors.append(f"{account.name} is in {account.account_currency}, target in {target_doc.account_currency}")
+    return errors[:20]
+
+
+def count_references(names, chunk_size=USAGE_CHUNK_SIZE):
+    """
+    Rows per (doctype, link field) referencing any of the accounts.
+
+    Every registered link field is counted in one `UNION ALL` query per
+    chunk of at most chunk_size account names, as in
+    check_accounts_have_transactions, but keyed per field.
+    """
+    checks = get_usage_checks()
+    if not checks:
+        return {}
+    query = ' UNION ALL '.join(f"""
+        SELECT {i}, COUNT(*) FROM `tab{usage_doctype}` WHERE `{fieldname}` IN %(accounts)s
+    """ for i, (usage_doctype, fieldname) in enumerate(checks))
+
+    names = list(names)
+    counts = {}
+    for start in range(0, len(names), chunk_size):
+        chunk = names[start:start + chunk_size]
+        for i, count in frappe.db.sql(query, {'accounts': tuple(chunk)}):
+            if count:
+                key = checks[int(i)]
+                counts[key] = counts.get(key, 0) + count
+    return counts
+
+
+def repoint_references(doctype, fieldname, names, target, chunk_size=MERGE_CHUNK_SIZE):
+    """
+    Point fieldname from any of names to target, chunk by chunk.
+
+    Each chunk is committed on its own. Rows already re-pointed no longer
+    match, so the next SELECT simply returns the next chunk.
+
+    Returns:
+        Number of rows re-pointed
+    """
+    accounts = tuple(names)
+    moved = 0
+    while True:
+        chunk = [row[0] for row in frappe.db.sql(f"""
+            SELECT name FROM `tab{doctype}` WHERE `{fieldname}` IN %(accounts)s LIMIT {int(chunk_size)}
+        """, {'accounts': accounts})]
+        if not chunk:
+            return moved
+
+        frappe.db.sql(f"""
+            UPDATE `tab{doctype}` SET `{fieldname}` = %(target)s
+            WHERE name IN %(rows)s AND `{fieldname}` IN %(accounts)s
+        """, {'target': target, 'rows': tuple(chunk), 'accounts': accounts})
+        updated = frappe.db.sql(f"""
+            SELECT COUNT(*) FROM `tab{doctype}` WHERE name IN %(rows)s AND `{fieldname}` = %(target)s
+        """, {'target': target, 'rows': tuple(chunk)})[0][0]
+        frappe.db.commit()
+
+        if not updated:
+            raise frappe.ValidationError(f"No row of a {doctype} chunk could be re-pointed; stopping")
+        if updated != len(chunk):
+            # A row changed between the SELECT and the UPDATE; it is picked up
+            # again by the next SELECT if it still references the subtree
+            print(f"   ⚠️  Chunk of {len(chunk)} row(s): {updated} re-pointed")
+        moved += updated
+        print(f"   ✅ {moved} row(s) re-pointed")
@@ -0,0 +1,235 @@
+"""
+Compact in-memory account tree.
+
+AccountTree keeps a chart as parallel arrays indexed by node number:
+interned names, parent indices (array('i'), -1 for roots), the pre-order
+sequence with each node's position in it, subtree sizes, depths and the
+post-order sequence. It is built once, from a single query
+(from_company), from rows already in memory (from_rows) or from chart
+files (from_chart), and then answers without touching the database:
+
+    is X under Y                      O(1)
+    depth, parent                     O(1)
+    descendants, leaves-first order   O(subtree)
+    ancestors                         O(depth)
+
+Nodes are handed out as AccountNode views (__slots__, no per-node dict).
+Extra columns loaded with the tree are readable as attributes, so a view
+can stand in for the frappe._dict rows returned by frappe.get_all.
+"""
+import sys
+from array import array
+
+import frappe
+
+
+class AccountNode:
+    """Read-only view of one node of an AccountTree."""
+
+    __slots__ = ('tree', 'index')
+
+    def __init__(self, tree, index):
+        self.tree = tree
+        self.index = index
+
+    @property
+    def name(self):
+        return self.tree.names[self.index]
+
+    @property
+    def parent_account(self):
+        parent = self.tree.parents[self.index]
+        return self.tree.names[parent] if parent >= 0 else None
+
+    @property
+    def depth(self):
+        return self.tree.depths[self.index]
+
+    def get(self, field, default=None):
+        column = self.tree.columns.get(field)
+        return default if column is None else column[self.index]
+
+    def __getattr__(self, field):
+        column = self.tree.columns.get(field)
+        if column is None:
+            raise AttributeError(field)
+        return column[self.index]
+
+    def __repr__(self):
+        return f"<AccountNode {self.name}>"
+
+
+class AccountTree:
+    """Array-backed forest of accounts; see the module docstring."""
+
+    __slots__ = ('names', 'positions', 'parents', 'columns', 'child_start', 'child_list',
+                 'order', 'pre', 'size', 'depths', 'post_order')
+
+    def __init__(self, names, parents, columns=None):
+        """
+        Args:
+            names: Node names, in sibling order
+            parents: Parent name of each node; None, empty or unknown
+                names make the node a root
+            columns: Optional dict of field -> list of values, one per node
+        """
+        count = len(names)
+        self.names = [sys.intern(name) for name in names]
+        self.positions = {}
+        for i, name in enumerate(self.names):
+            self.positions.setdefault(name, i)
+        self.columns = columns or {}
+
+        positions = self.positions
+        self.parents = array('i', (positions.get(parent, -1) if parent else -1 for parent in parents))
+
+        # Children in CSR layout; slot 0 holds the roots, slot i + 1 node i
+        start = array('i', [0]) * (count + 2)
+        for parent in self.parents:
+            start[parent + 2] += 1
+        for slot in range(2, count + 2):
+            start[slot] += start[slot - 1]
+        fill = array('i', start)
+        child_list = array('i', [0]) * count
+        for i, parent in enumerate(self.parents):
+            child_list[fill[parent + 1]] = i
+            fill[parent + 1] += 1
+        self.child_start = start
+        self.child_list = child_list
+
+        # Iterative pre-order; nodes in a parent cycle are never reached
+        self.pre = array('i', [-1]) * count
+        self.depths = array('i', [0]) * count
+        self.order = array('i')
+        stack = list(reversed(child_list[start[0]:start[1]]))
+        while stack:
+            node = stack.pop()
+            if self.pre[node] >= 0:
+                continue
+            self.pre[node] = len(self.order)
+            self.order.append(node)
+            parent = self.parents[node]
+            if parent >= 0:
+                self.depths[node] = self.depths[parent] + 1
+            stack.extend(reversed(child_list[start[node + 1]:start[node + 2]]))
+
+        # Subtree sizes bottom-up, then post-order positions from pre, depth and size
+        self.size = array('i', [1]) * count
+        for node in reversed(self.order):
+            parent = self.parents[node]
+            if parent >= 0:
+                self.size[parent] += self.size[node]
+        self.post_order = array('i', [0]) * len(self.order)
+        for node in self.order:
+            self.post_order[self.pre[node] - self.depths[node] + self.size[node] - 1] = node
+
+    @classmethod
+    def from_rows(cls, rows, parent_field='parent_account', fields=()):
+        """Build from mappings with 'name', the parent field and extra fields."""
+        rows = list(rows)
+        columns = {field: [row.get(field) for row in rows] for field in fields}
+        return cls([row['name'] for row in rows], [row.get(parent_field) for row in rows], columns)
+
+    @classmethod
+    def from_company(cls, company, fields=('account_name', 'is_group')):
+        """Build a company's live tree from one query, siblings in lft order."""
+        rows = frappe.get_all('Account',
+            filters={'company': company},
+            fields=['name', 'parent_account', *fields],
+            order_by='lft asc'
+        )
+        return cls.from_rows(rows, fields=fields)
+
+    @classmethod
+    def from_chart(cls, paths, fields=('account_name', 'account_number', 'is_group')):
+        """
+        Build from chart files (see chart_reader).
+
+        Nodes are named by the ID column when the file has one, else by
+        account name, which is how Parent Account refers to them.
+        """
+        from dm_erpnext_utilities.commands.chart_reader import read_charts
+
+        rows = [dict(record, name=record['name'] or record['account_name'])
+                for record in read_charts(paths) if record['account_name']]
+        return cls.from_rows(rows, fields=fields)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.positions
+
+    def __iter__(self):
+        """Reachable nodes in pre-order (parents before children)."""
+        return (AccountNode(self, node) for node in self.order)
+
+    def __getitem__(self, name):
+        return AccountNode(self, self.positions[name])
+
+    def get(self, name):
+        position = self.positions.get(name)
+        return None if position is None else AccountNode(self, position)
+
+    def parent(self, name):
+        parent = self.parents[self.positions[name]]
+        return self.names[parent] if parent >= 0 else None
+
+    def children(self, name):
+        node = self.positions[name]
+        return [self.names[child] for child in self.child_list[self.child_start[node + 1]:self.child_start[node + 2]]]
+
+    def has_children(self, name):
+        node = self.positions[name]
+        return self.child_start[node + 2] > self.child_start[node + 1]
+
+    def roots(self):
+        return [self.names[root] for root in self.child_list[self.child_start[0]:self.child_start[1]]]
+
+    def depth(self, name):
+        return self.depths[self.positions[name]]
+
+    def ancestors(self, name):
+        """Ancestor names, nearest first."""
+        result = []
+        node = self.parents[self.positions[name]]
+        while node >= 0 and len(result) < len(self.names):
+            result.append(self.names[node])
+            node = self.parents[node]
+        return result
+
+    def is_under(self, name, ancestor):
+        """True if name is a strict descendant of ancestor."""
+        node = self.pre[self.positions[name]]
+        top = self.positions[ancestor]
+        return node >= 0 and self.pre[top] < node < self.pre[top] + self.size[top]
+
+    def subtree(self, name):
+        """Names of the node and its descendants, in pre-order."""
+        node = self.positions[name]
+        first = self.pre[node]
+        if first < 0:
+            return []
+        return [self.names[i] for i in self.order[first:first + self.size[node]]]
+
+    def descendants(self, name):
+        """Names of the strict descendants, in pre-order."""
+        return self.subtree(name)[1:]
+
+    def leaves_first(self, name=None):
+        """
+        Strict descendants of name (the whole forest when None) as views,
+        every node after all of its descendants.
+        """
+        if name is None:
+            return [AccountNode(self, node) for node in self.post_order]
+        node = self.positions[name]
+        if self.pre[node] < 0:
+            return []
+        last = self.pre[node] - self.depths[node] + self.size[node] - 1
+        first = last - self.size[node] + 1
+        return [AccountNode(self, i) for i in self.post_order[first:last]]
+
+    def unreached(self):
+        """Names of nodes caught in a parent cycle (or hanging off one)."""
+        return [name for name, position in zip(self.names, self.pre) if position < 0]
@@ -0,0 +1,112 @@
+"""
+Registry of the (doctype, link field) pairs that reference a tree record.
+
+Built once per tree doctype (Account, Cost Center, ...) from DocField/
+Custom Field metadata (every Link field whose options is that doctype)
+and cached in Redis. Other apps, or this app's hooks.py, can add pairs
+through the `account_usage_checks` hook (Account) or the
+`tree_usage_checks` hook (any tree doctype):
+
+    account_usage_checks = [
+        {"doctype": "My Ledger", "fieldname": "account"},
+    ]
+    tree_usage_checks = [
+        {"tree": "Cost Center", "doctype": "My Ledger", "fieldname": "cost_center"},
+    ]
+"""
+import frappe
+
+CACHE_KEY = 'dm_erpnext_utilities:usage_checks:{}'
+
+# Always probed, even if metadata introspection misses them
+CORE_USAGE_CHECKS = {
+    'Account': (
+        ('GL Entry', 'account'),
+        ('Journal Entry Account', 'account'),
+        ('Payment Entry', 'paid_from'),
+        ('Payment Entry', 'paid_to'),
+    ),
+    'Cost Center': (
+        ('GL Entry', 'cost_center'),
+        ('Budget', 'cost_center'),
+    ),
+    'Item Group': (
+        ('Item', 'item_group'),
+    ),
+    'Territory': (
+        ('Customer', 'territory'),
+    ),
+}
+
+# Ledger and payment tables: rows there are bookings, not configuration.
+# A reset refuses to delete (or keeps) accounts they reference; links from
+# every other registered table (Company defaults, Mode of Payment Account,
+# Party Account, Item Default, ...) are configuration
+LEDGER_DOCTYPES = frozenset({
+    'GL Entry',
+    'Payment Ledger Entry',
+    'Journal Entry Account',
+    'Payment Entry',
+})
+
+
+def get_usage_checks(doctype='Account'):
+    """Return the cached, sorted list of (doctype, fieldname) pairs linking to doctype."""
+    checks = frappe.cache().get_value(CACHE_KEY.format(doctype),
+                                      generator=lambda: build_usage_checks(doctype))
+    return [tuple(check) for check in checks]
+
+
+def split_usage_checks(doctype='Account'):
+    """Return the registry as (ledger, configuration) lists of (doctype, fieldname) pairs."""
+    checks = get_usage_checks(doctype)
+    return ([c for c in checks if c[0] in LEDGER_DOCTYPES],
+            [c for c in checks if c[0] not in LEDGER_DOCTYPES])
+
+
+def clear_usage_checks_cache():
+    """Drop the cached registries (called after migrate)."""
+    for doctype in CORE_USAGE_CHECKS:
+        frappe.cache().delete_value(CACHE_KEY.format(doctype))
+
+
+def build_usage_checks(doctype='Account'):
+    """Introspect Link fields to doctype and merge the hook entries."""
+    checks = set(CORE_USAGE_CHECKS.get(doctype, ()))
+
+    for parent, fieldname in frappe.get_all('DocField',
+        filters={'fieldtype': 'Link', 'options': doctype},
+        fields=['parent', 'fieldname'],
+        as_list=True
+    ):
+        checks.add((parent, fieldname))
+
+    for dt, fieldname in frappe.get_all('Custom Field',
+        filters={'fieldtype': 'Link', 'options': doctype},
+        fields=['dt', 'fieldname'],
+        as_list=True
+    ):
+        checks.add((dt, fieldname))
+
+    if doctype == 'Account':
+        for entry in frappe.get_hooks('account_usage_checks') or []:
+            checks.add((entry['doctype'], entry['fieldname']))
+    for entry in frappe.get_hooks('tree_usage_checks') or []:
+        if entry.get('tree') == doctype:
+            checks.add((entry['doctype'], entry['fieldname']))
+
+    # Singles and virtual doctypes have no table of their own to probe
+    no_table = set(frappe.get_all('DocType',
+        filters={'name': ['in', list({d for d, _ in checks})]},
+        or_filters={'issingle': 1, 'is_virtual': 1},
+        pluck='name'
+    ))
+    tables = set(frappe.db.get_tables())
+
+    # The tree's own parent links are part of the tree itself, not usage
+    return sorted(
+        (dt, fieldname) for dt, fieldname in checks
+        if dt != doctype
+        and dt not in no_table
+        and f'tab{dt}' in tables
+    )
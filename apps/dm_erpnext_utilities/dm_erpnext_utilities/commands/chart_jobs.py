@@ -0,0 +1,307 @@
+"""
+Background chart operations on the RQ `long` queue.
+
+enqueue_chart_job stages the chart files under the site's private folder
+(the sites volume is shared with the queue workers) and enqueues
+run_chart_job with frappe.enqueue. The job works in batches, committing
+each one (a --bulk import is a single transaction instead), so a job that is re-enqueued with the same id simply continues
+with what is left: the import skips the rows its checkpoint journal
+records as applied and the delete re-resolves the remaining subtree.
+
+Progress (rows done, rate, ETA) is published to Redis after every batch
+and read back by the `chart-job-status` command. Every function takes an
+optional `cache` object with frappe's get_value/set_value interface, so a
+local fake can stand in for Redis, and `now=True` runs the job inline
+instead of going through RQ.
+"""
+import contextlib
+import os
+import shutil
+import time
+
+import frappe
+
+from dm_erpnext_utilities.commands.chart_lock import company_lock, nested_set_lock
+
+JOBS_KEY = 'dm_erpnext_utilities:chart_jobs'
+PROGRESS_KEY = 'dm_erpnext_utilities:chart_job:{}'
+
+# Progress records expire after a week
+PROGRESS_TTL = 7 * 24 * 3600
+
+# Rows (accounts) handled per committed batch
+JOB_BATCH_SIZE = 200
+
+# Number of job ids kept for `chart-job-status` without arguments
+RECENT_JOBS = 50
+
+
+def enqueue_chart_job(operation, company, options, now=False, cache=None):
+    """
+    Enqueue an 'import' or 'delete' operation for one company.
+
+    Args:
+        operation: 'import' or 'delete'
+        company: Company name
+        options: Keyword arguments of the operation; for imports,
+            'csv_files' are copied to the site's private folder first
+        now: Run inline in this process instead of on the queue
+        cache: Progress store (default: frappe.cache())
+
+    Returns:
+        The job id
+    """
+    job_id = frappe.generate_hash(length=12)
+    options = dict(options)
+    if operation == 'import':
+        options['csv_files'] = stage_chart_files(job_id, options['csv_files'])
+
+    publish_progress(job_id, cache=cache, operation=operation, company=company, options=options,
+                     status='queued', total=0, done=0, message='Waiting for a worker')
+    _remember_job(job_id, cache)
+    _enqueue(job_id, operation, company, options, now)
+    return job_id
+
+
+def resume_chart_job(job_id, now=False, cache=None):
+    """
+    Re-enqueue an interrupted or failed job under the same id.
+
+    Batches that were committed are not redone: the import resumes from
+    its checkpoint journal and the delete only sees what is left of the subtree.
+    """
+    progress = get_job_progress(job_id, cache)
+    if not progress:
+        raise ValueError(f"Unknown chart job: {job_id}")
+    if progress.get('status') == 'finished':
+        raise ValueError(f"Chart job {job_id} already finished")
+
+    publish_progress(job_id, cache=cache, status='queued', message='Resume requested')
+    _enqueue(job_id, progress['operation'], progress['company'], progress['options'], now)
+    return job_id
+
+
+def _enqueue(job_id, operation, company, options, now):
+    frappe.enqueue('dm_erpnext_utilities.commands.chart_jobs.run_chart_job',
+        queue='long',
+        timeout=6 * 3600,
+        job_id=f'chart-job-{job_id}-{frappe.generate_hash(length=6)}',
+        job_name=f'{operation} chart of accounts: {company}',
+        now=now,
+        chart_job_id=job_id,
+        operation=operation,
+        company=company,
+        options=options,
+    )
+
+
+def run_chart_job(chart_job_id, operation, company, options, cache=None):
+    """Queue entry point: run the operation in committed batches."""
+    # Rate and ETA only count rows done by this run, not by earlier attempts
+    done = _get_progress(chart_job_id, cache).get('done') or 0
+    publish_progress(chart_job_id, cache=cache, status='running', started=time.time(),
+                     done_at_start=done, message='Starting')
+    try:
+        if operation not in ('import', 'delete'):
+            raise ValueError(f"Unknown chart operation: {operation}")
+        # Held across all batches: nothing else may change the chart between them
+        lock = contextlib.nullcontext() if options.get('dry_run') else company_lock(company, operation, job=chart_job_id)
+        with lock:
+            if operation == 'import':
+                ok = _run_import(chart_job_id, company, options, cache)
+            else:
+                ok = _run_delete(chart_job_id, company, options, cache)
+    except Exception as e:
+        frappe.db.rollback()
+        publish_progress(chart_job_id, cache=cache, status='failed', message=str(e))
+        raise
+
+    publish_progress(chart_job_id, cache=cache, status='finished' if ok else 'failed',
+                     message='Completed' if ok else 'Completed with errors, see worker log')
+    if operation == 'import':
+        shutil.rmtree(_staging_dir(chart_job_id), ignore_errors=True)
+    return ok
+
+
+def _run_import(job_id, company, options, cache):
+    from dm_erpnext_utilities.commands.account_importer import (
+        bulk_insert_accounts,
+        insert_accounts_by_level,
+        plan_import,
+    )
+    from dm_erpnext_utilities.commands.account_manager import reset_company_accounts
+    from dm_erpnext_utilities.commands.import_journal import (
+        applied_count,
+        clear_journal,
+        open_journal,
+    )
+
+    # A re-enqueued job picks up the checkpoint journal of its earlier runs
+    resume = options.get('resume') or bool(_get_progress(job_id, cache).get('done'))
+    journal = open_journal(company, options['csv_files'], resume=resume)
+
+    reset_done = _get_progress(job_id, cache).get('reset_done') or applied_count(journal)
+    if options.get('reset') and not reset_done:
+        if not reset_company_accounts(company, keep_used=options.get('keep_used'))['ok']:
+            return False
+        publish_progress(job_id, cache=cache, reset_done=1)
+
+    plan = plan_import(options['csv_files'], company, skip_root=options.get('skip_root'),
+                       journal=journal)
+    if plan['errors']:
+        publish_progress(job_id, cache=cache, message=f"{len(plan['errors'])} validation error(s)")
+        for error in plan['errors']:
+            print(f"   ❌ {error}")
+        return False
+
+    rows = [row for level in plan['levels'] for row in level]
+    if options.get('bulk'):
+        # One transaction and one nested-set rebuild; report it as one batch
+        progress = _start_batches(job_id, 1, cache)
+        _, errors = bulk_insert_accounts(plan, company)
+        _advance(job_id, progress, 1, cache)
+        if errors == 0:
+            clear_journal(journal)
+            frappe.db.commit()
+        return errors == 0
+
+    # Level order keeps parents ahead of their children across batches, and
+    # the shared failed set skips the descendants of a row that failed earlier
+    progress = _start_batches(job_id, len(rows), cache)
+    failed = set()
+    errors = 0
+    for i in range(0, len(rows), JOB_BATCH_SIZE):
+        batch = dict(plan, levels=[rows[i:i + JOB_BATCH_SIZE]])
+        _, batch_errors = insert_accounts_by_level(batch, company, failed=failed)
+        errors += batch_errors
+        progress = _advance(job_id, progress, len(batch['levels'][0]), cache)
+    if errors == 0:
+        clear_journal(journal)
+        frappe.db.commit()
+    return errors == 0
+
+
+def _run_delete(job_id, company, options, cache):
+    from dm_erpnext_utilities.commands.account_manager import (
+        check_accounts_have_transactions,
+        delete_company_account,
+        find_children_recursive,
+        resolve_company_account,
+    )
+
+    if options.get('dry_run') or options.get('bulk'):
+        # Single transaction either way; report it as one batch
+        progress = _start_batches(job_id, 1, cache)
+        ok = delete_company_account(company=company, **options)
+        _advance(job_id, progress, 1, cache)
+        return ok
+
+    account_name = resolve_company_account(options['account_name'], company)
+    if not account_name:
+        # Already gone: a resumed job that finished its last batch
+        print(f"ℹ️  Account '{options['account_name']}' no longer exists in {company}.")
+        return True
+
+    names = [c.name for c in find_children_recursive(account_name, company)] + [account_name]
+    used = [n for n, usage in check_accounts_have_transactions(names).items() if usage['total']]
+    if used:
+        print(f"⚠️  {len(used)} account(s) have transactions, nothing deleted: {', '.join(used[:10])}")
+        return False
+
+    # Children come before parents, so every batch can be deleted as is
+    progress = _start_batches(job_id, len(names), cache)
+    for i in range(0, len(names), JOB_BATCH_SIZE):
+        batch = names[i:i + JOB_BATCH_SIZE]
+        with nested_set_lock('delete', job=job_id):
+            for name in batch:
+                frappe.delete_doc('Account', name, force=1, ignore_permissions=True)
+        frappe.db.commit()
+        progress = _advance(job_id, progress, len(batch), cache)
+    return True
+
+
+def stage_chart_files(job_id, paths):
+    """Copy chart files to the shared sites volume; return the new paths."""
+    target = _staging_dir(job_id)
+    os.makedirs(target, exist_ok=True)
+    staged = []
+    for position, path in enumerate(paths):
+        # Keep the order and the extension, avoid name clashes
+        destination = os.path.join(target, f"{position:03d}_{os.path.basename(path)}")
+        shutil.copyfile(path, destination)
+        staged.append(destination)
+    return staged
+
+
+def _staging_dir(job_id):
+    return frappe.get_site_path('private', 'chart_jobs', job_id)
+
+
+def publish_progress(job_id, cache=None, **fields):
+    """Merge fields into the job's progress record, deriving rate and ETA."""
+    cache = _get_cache(cache)
+    key = PROGRESS_KEY.format(job_id)
+    progress = cache.get_value(key) or {'job_id': job_id}
+    progress.update(fields)
+    progress['updated'] = time.time()
+
+    started = progress.get('started')
+    done = progress.get('done') or 0
+    total = progress.get('total') or 0
+    done_now = done - (progress.get('done_at_start') or 0)
+    if started and done_now > 0:
+        elapsed = max(progress['updated'] - started, 1e-6)
+        progress['rate'] = done_now / elapsed
+        progress['eta'] = (total - done) / progress['rate'] if total > done else 0
+    cache.set_value(key, progress, expires_in_sec=PROGRESS_TTL)
+    return progress
+
+
+def get_job_progress(job_id, cache=None):
+    """Return the progress record of a job, or None."""
+    return _get_cache(cache).get_value(PROGRESS_KEY.format(job_id))
+
+
+def get_recent_jobs(cache=None):
+    """Return the ids of the most recently enqueued jobs, newest first."""
+    return _get_cache(cache).get_value(JOBS_KEY) or []
+
+
+def format_progress(progress):
+    """One-line human readable progress."""
+    total = progress.get('total') or 0
+    done = progress.get('done') or 0
+    percent = f"{done * 100 / total:5.1f}%" if total else '   - '
+    rate = f"{progress['rate']:.1f} rows/s" if progress.get('rate') else '- rows/s'
+    eta = f"ETA {progress['eta']:.0f}s" if progress.get('eta') else ''
+    return (f"[{progress.get('status', '?'):<8}] {progress.get('operation', '?')} "
+            f"{progress.get('company', '?')}: {done}/{total} {percent} {rate} {eta} "
+            f"- {progress.get('message', '')}")
+
+
+def _get_cache(cache):
+    return frappe.cache() if cache is None else cache
+
+
+def _get_progress(job_id, cache):
+    return get_job_progress(job_id, cache) or {}
+
+
+def _start_batches(job_id, total, cache):
+    # A resumed job keeps counting from what earlier runs completed
+    previous = _get_progress(job_id, cache)
+    done = previous.get('done') or 0
+    return publish_progress(job_id, cache=cache, total=done + total, done=done,
+                            message=f'{total} row(s) to process')
+
+
+def _advance(job_id, progress, count, cache):
+    done = (progress.get('done') or 0) + count
+    return publish_progress(job_id, cache=cache, done=done,
+                            message=f"Batch committed ({done}/{progress.get('total')})")
+
+
+def _remember_job(job_id, cache):
+    cache = _get_cache(cache)
+    jobs = [job_id] + [j for j in get_recent_jobs(cache) if j != job_id]
+    cache.set_value(JOBS_KEY, jobs[:RECENT_JOBS])
@@ -0,0 +1,410 @@
+"""
+Offline linter for chart of accounts files.
+
+lint_chart_files reads any mix of CSV and JSON chart files (the formats
+of chart_reader) and reports every problem at once, with file and line,
+without touching the database. Each file is parsed and checked on its
+own, in a process pool when there are several; the per-file results are
+then merged for the checks that span files.
+
+Checks (code: severity):
+
+- unreadable: error. The file cannot be parsed, or has no account name column.
+- missing-name: error. A row has no account name.
+- bad-flag: error. Is Group is not one of 1/0, Yes/No, Sim/Não...
+- bad-root-type: error. Root Type is not Asset, Liability, Equity, Income or Expense.
+- missing-root-type: error. A top-level account has no Root Type.
+- duplicate-account: error. The same account (number and name) is defined twice.
+- duplicate-number: error. Two accounts share an account number.
+- root-type-mismatch: error. A child's Root Type differs from its parent's.
+- not-a-group: error. The row has children but says Is Group = 0.
+- parent-cycle: error. Parents loop back on themselves.
+- group-account-type: warning. Account Type is set on a group row.
+- parent-spelling: warning. The parent is spelled differently from the
+  account it resolves to ("ATIVO - D-CASA" vs "Ativos").
+- mixed-quoting: warning. Is Group values are quoted on some rows and bare on others.
+- external-parent: note. The parent is not defined in these files, so it
+  must already exist in the company.
+"""
+import csv
+import difflib
+import io
+import multiprocessing
+import os
+import re
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
+
+from dm_erpnext_utilities.commands.chart_reader import map_headers, parse_flag, read_json_chart
+
+ROOT_TYPES = ('Asset', 'Liability', 'Equity', 'Income', 'Expense')
+
+SEVERITIES = ('error', 'warning', 'note')
+SEVERITY_ICONS = {'error': '❌', 'warning': '⚠️ ', 'note': 'ℹ️ '}
+
+# Row fields kept per account: (line, account_name, parent, number, account_type, root_type, is_group)
+LINE, NAME, PARENT, NUMBER, ACCOUNT_TYPE, ROOT_TYPE, IS_GROUP = range(7)
+
+# A CSV field, quoted or bare, that does not span lines
+_CSV_FIELD = r'(?:"(?:[^"\r\n]|"")*"|[^,\r\n"]*)'
+# Trailing company abbreviation of a full account name ("... - D-CASA")
+_ABBR_SUFFIX = re.compile(r' - [^a-z]+$')
+_NUMBER_PREFIX = re.compile(r'^\d[\d.]* - ')
+
+
+def lint_chart_files(paths, workers=None):
+    """
+    Lint chart files, in parallel across files.
+
+    Args:
+        paths: CSV or JSON chart files
+        workers: Processes to use (default: one per file, up to the CPU count)
+
+    Returns:
+        Dict with 'findings' (list of (file, line, severity, code,
+        message), sorted by file and line), 'files', 'rows', 'errors',
+        'warnings', 'notes' and 'elapsed'
+    """
+    start = time.perf_counter()
+    paths = list(dict.fromkeys(paths))
+    workers = min(workers or os.cpu_count() or 1, len(paths))
+
+    if workers > 1:
+        # fork: workers need no imports of their own and no database
+        method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method)) as pool:
+            results = list(pool.map(lint_file, paths))
+    else:
+        results = [lint_file(path) for path in paths]
+
+    findings = []
+    for _, _, file_findings, _ in results:
+        findings.extend(file_findings)
+    findings.extend(check_chart([(path, rows) for path, rows, _, _ in results]))
+    findings.extend(check_quoting([(path, quoting) for path, _, _, quoting in results]))
+    order = {path: i for i, path in enumerate(paths)}
+    findings.sort(key=lambda f: (order[f[0]], f[1], f[3]))
+
+    counts = {severity: 0 for severity in SEVERITIES}
+    for finding in findings:
+        counts[finding[2]] += 1
+    return {
+        'findings': findings,
+        'files': len(paths),
+        'rows': sum(len(rows) for _, rows, _, _ in results),
+        'errors': counts['error'],
+        'warnings': counts['warning'],
+        'notes': counts['note'],
+        'elapsed': time.perf_counter() - start,
+    }
+
+
+def lint_file(path):
+    """
+    Parse one file and run the checks that need only its own rows.
+
+    Returns:
+        (path, rows, findings, quoting); rows are tuples indexed by LINE,
+        NAME, ... and quoting is (quoted count, bare count, line of the
+        first row quoted differently from the first one) for Is Group in
+        CSV files, else None
+    """
+    findings = []
+    try:
+        if path.lower().endswith('.json'):
+            rows, quoting = _read_json_rows(path, findings), None
+        else:
+            rows, quoting = _read_csv_rows(path, findings)
+    except (OSError, ValueError, UnicodeDecodeError, csv.Error) as e:
+        return path, [], [(path, 0, 'error', 'unreadable', str(e))], None
+
+    for row in rows:
+        if row[ROOT_TYPE] and row[ROOT_TYPE] not in ROOT_TYPES:
+            findings.append((path, row[LINE], 'error', 'bad-root-type',
+                             f"{row[NAME]}: root type '{row[ROOT_TYPE]}' is not one of {', '.join(ROOT_TYPES)}"))
+        if row[IS_GROUP] == 1 and row[ACCOUNT_TYPE]:
+            findings.append((path, row[LINE], 'warning', 'group-account-type',
+                             f"{row[NAME]}: account type '{row[ACCOUNT_TYPE]}' set on a group"))
+    return path, rows, findings, quoting
+
+
+def check_chart(files):
+    """
+    Checks across every file: duplicates, parents, root types, groups, cycles.
+
+    Args:
+        files: List of (path, rows) as returned by lint_file
+    """
+    findings = []
+    # label ('1100 - Caixa' or 'Caixa') -> (path, row), first definition wins
+    accounts = {}
+    numbers = {}
+    by_name = {}
+    for path, rows in files:
+        for row in rows:
+            label = f"{row[NUMBER]} - {row[NAME]}" if row[NUMBER] else row[NAME]
+            if label in accounts:
+                findings.append((path, row[LINE], 'error', 'duplicate-account',
+                                 f"{label} is already defined at {_where(accounts[label])}"))
+                continue
+            if row[NUMBER] in numbers:
+                owner = accounts[numbers[row[NUMBER]]]
+                findings.append((path, row[LINE], 'error', 'duplicate-number',
+                                 f"{row[NAME]}: account number {row[NUMBER]} is already used by "
+                                 f"{owner[1][NAME]} ({_where(owner)})"))
+            accounts[label] = (path, row)
+            if row[NUMBER]:
+                numbers.setdefault(row[NUMBER], label)
+            by_name.setdefault(row[NAME], label)
+
+    # Resolve parents: exact, without the company abbreviation, then
+    # ignoring case and accents; anything else may already be in the company
+    folded = None
+    resolved = {}
+    external = {}
+    for label, (path, row) in accounts.items():
+        parent = row[PARENT]
+        if not parent:
+            if not row[ROOT_TYPE]:
+                findings.append((path, row[LINE], 'error', 'missing-root-type',
+                                 f"{row[NAME]}: top-level account without a root type"))
+            continue
+        target = parent if parent in accounts else by_name.get(parent)
+        if target is None:
+            target = _resolve(parent, accounts, by_name, numbers)
+        if target is None:
+            if folded is None:
+                # Only built when some parent is not spelled exactly
+                folded = {}
+                for other, (_, other_row) in accounts.items():
+                    folded.setdefault(_fold(other), other)
+                    folded.setdefault(_fold(other_row[NAME]), other)
+            target = folded.get(_fold(parent))
+            if target is not None:
+                findings.append((path, row[LINE], 'warning', 'parent-spelling',
+                                 f"{row[NAME]}: parent '{parent}' is spelled '{target}' at {_where(accounts[target])}"))
+        if target is None:
+            external.setdefault(parent, []).append((path, row))
+            continue
+        resolved[label] = target
+
+        parent_row = accounts[target][1]
+        if row[ROOT_TYPE] != parent_row[ROOT_TYPE] and row[ROOT_TYPE] in ROOT_TYPES \
+                and parent_row[ROOT_TYPE] in ROOT_TYPES:
+            findings.append((path, row[LINE], 'error', 'root-type-mismatch',
+                             f"{row[NAME]}: root type {row[ROOT_TYPE]} differs from parent "
+                             f"{target}'s {parent_row[ROOT_TYPE]} ({_where(accounts[target])})"))
+
+    # Near misses among the accounts that have children in these files
+    has_children = set(resolved.values())
+    groups = {}
+    if external:
+        for label, (_, row) in accounts.items():
+            if row[IS_GROUP] == 1 or label in has_children:
+                groups.setdefault(_fold(label), label)
+    for parent, children in external.items():
+        path, row = children[0]
+        match = difflib.get_close_matches(_fold(parent), list(groups), n=1, cutoff=0.8)
+        if match:
+            target = groups[match[0]]
+            findings.append((path, row[LINE], 'warning', 'parent-spelling',
+                             f"{row[NAME]}: parent '{parent}' is not defined in these files; did you mean "
+                             f"'{target}' ({_where(accounts[target])})? ({len(children)} row(s))"))
+        else:
+            findings.append((path, row[LINE], 'note', 'external-parent',
+                             f"{row[NAME]}: parent '{parent}' is not defined in these files and must "
+                             f"already exist in the company ({len(children)} row(s))"))
+
+    for label in has_children:
+        path, row = accounts[label]
+        if row[IS_GROUP] == 0:
+            findings.append((path, row[LINE], 'error', 'not-a-group',
+                             f"{row[NAME]}: Is Group is 0 but it has child accounts"))
+        elif row[IS_GROUP] is None and row[ACCOUNT_TYPE]:
+            findings.append((path, row[LINE], 'warning', 'group-account-type',
+                             f"{row[NAME]}: account type '{row[ACCOUNT_TYPE]}' set on a group"))
+
+    for label in _find_cycles(resolved):
+        path, row = accounts[label]
+        findings.append((path, row[LINE], 'error', 'parent-cycle',
+                         f"{row[NAME]}: parent cycle through {row[NAME]} -> {row[PARENT]}"))
+    return findings
+
+
+def check_quoting(files):
+    """
+    Flag Is Group values quoted in some rows and bare in others, within
+    a file and across the CSV files linted together.
+
+    Args:
+        files: List of (path, quoting) as returned by lint_file
+    """
+    findings = []
+    styles = {}
+    for path, quoting in files:
+        if not quoting:
+            continue
+        quoted, bare, first_different = quoting
+        if quoted and bare:
+            findings.append((path, first_different, 'warning', 'mixed-quoting',
+                             f"Is Group is quoted on {quoted} row(s) and bare on {bare}; "
+                             f"this row is the first to differ"))
+        elif quoted or bare:
+            styles.setdefault('quoted' if quoted else 'bare', []).append(path)
+    if len(styles) > 1:
+        # Report the files of the less common style
+        (style, minority), (_, majority) = sorted(styles.items(), key=lambda item: len(item[1]))
+        for path in minority:
+            findings.append((path, 1, 'warning', 'mixed-quoting',
+                             f"Is Group is {style} here but not in {os.path.basename(majority[0])}"
+                             f"{f' and {len(majority) - 1} other file(s)' if len(majority) > 1 else ''}"))
+    return findings
+
+
+def print_lint_report(result, limit=None):
+    """Print the findings, one per line as file:line, then the totals per check."""
+    print(f"\n{'='*60}")
+    print(f"🔎 Chart lint: {result['files']} file(s), {result['rows']} row(s)")
+    print(f"{'='*60}")
+    shown = result['findings'] if limit is None else result['findings'][:limit]
+    for path, line, severity, code, message in shown:
+        print(f"{path}:{line}: {SEVERITY_ICONS[severity]} {severity} [{code}] {message}")
+    if len(shown) < len(result['findings']):
+        print(f"... {len(result['findings']) - len(shown)} more finding(s)")
+
+    by_code = {}
+    for _, _, severity, code, _ in result['findings']:
+        by_code[(severity, code)] = by_code.get((severity, code), 0) + 1
+    print(f"\n{'='*60}")
+    print(f"📊 Lint Summary:")
+    print(f"   ❌ Errors: {result['errors']}")
+    print(f"   ⚠️  Warnings: {result['warnings']}")
+    print(f"   ℹ️  Notes: {result['notes']}")
+    for (severity, code), count in sorted(by_code.items(), key=lambda item: SEVERITIES.index(item[0][0])):
+        print(f"      {code:<20} {count:>6}")
+    rate = result['rows'] / result['elapsed'] if result['elapsed'] > 0 else 0
+    print(f"   ⏱️  Elapsed: {result['elapsed']:.2f}s ({rate:.0f} rows/s)")
+    print(f"{'='*60}\n")
+
+
+def _read_csv_rows(path, findings):
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        text = f.read()
+    reader = csv.reader(io.StringIO(text, newline=''))
+    header = next(reader, None)
+    if header is None:
+        return [], None
+    columns = map_headers(header)
+    if 'account_name' not in columns:
+        raise ValueError(f"no account name column in header: {', '.join(header)}")
+
+    # Short rows are padded; absent columns read the '' appended last
+    fields = ('account_name', 'parent_account', 'account_number', 'account_type', 'root_type', 'is_group')
+    cells = itemgetter(*[columns.get(field, -1) for field in fields])
+    padding = [''] * len(header)
+    flags = {}
+    rows = []
+    for values in reader:
+        values.extend(padding[len(values):])
+        values.append('')
+        name, parent, number, account_type, root_type, flag = [cell.strip() for cell in cells(values)]
+        if not name:
+            if any(cell.strip() for cell in values):
+                findings.append((path, reader.line_num, 'error', 'missing-name', "row without an account name"))
+            continue
+        if flag not in flags:
+            flags[flag] = parse_flag(flag)
+        is_group = flags[flag]
+        if flag and is_group is None:
+            findings.append((path, reader.line_num, 'error', 'bad-flag',
+                             f"{name}: Is Group '{flag}' is not 1/0, Yes/No or Sim/Não"))
+        rows.append((reader.line_num, name, parent, number, account_type, root_type, is_group))
+
+    quoting = None
+    if 'is_group' in columns:
+        quoting = _scan_quoting(text, text.find('\n') + 1, columns['is_group'])
+    return rows, quoting
+
+
+def _read_json_rows(path, findings):
+    rows = []
+    for record in read_json_chart(path):
+        if not record['account_name']:
+            findings.append((path, record['line'], 'error', 'missing-name', "account without a name"))
+            continue
+        rows.append((record['line'], record['account_name'], record['parent_account'], record['account_number'],
+                     record['account_type'], record['root_type'], record['is_group']))
+    # A streamed tree comes children first; check it in file order
+    rows.sort(key=itemgetter(0))
+    return rows
+
+
+def _scan_quoting(text, start, index):
+    """Count quoted and bare non-empty values of column index, in one regex pass."""
+    pattern = re.compile(rf'^(?:{_CSV_FIELD},){{{index}}}(?:(")|[^,\r\n])', re.M)
+    counts = {True: 0, False: 0}
+    first_style = None
+    first_different = None
+    for match in pattern.finditer(text, start):
+        quoted = match.group(1) is not None
+        counts[quoted] += 1
+        if first_style is None:
+            first_style = quoted
+        elif quoted != first_style and first_different is None:
+            first_different = text.count('\n', 0, match.start()) + 1
+    return counts[True], counts[False], first_different
+
+
+def _resolve(parent, accounts, by_name, numbers):
+    """
+    Return the label a parent value refers to, or None: the importer's
+    rules (full name, name without abbreviation, numbered name, account
+    number, plain name) applied to the accounts of the files.
+    """
+    stripped = _strip_abbr(parent)
+    for value in (parent, stripped):
+        if value in accounts:
+            return value
+        if value in numbers:
+            return numbers[value]
+        if value in by_name:
+            return by_name[value]
+    return None
+
+
+def _fold(value):
+    """Comparison key ignoring company abbreviation, number prefix, case and accents."""
+    value = _strip_abbr(_NUMBER_PREFIX.sub('', value.strip())).casefold()
+    if value.isascii():
+        return value
+    value = unicodedata.normalize('NFKD', value)
+    return ''.join(c for c in value if not unicodedata.combining(c))
+
+
+def _strip_abbr(value):
+    # Only from names that keep a title of their own ('1000 - ATIVO' stays)
+    stripped = _ABBR_SUFFIX.sub('', value)
+    return stripped if stripped and not stripped.isdigit() else value
+
+
+def _find_cycles(parents):
+    """Return the labels on a parent cycle, given label -> parent label."""
+    state = {}
+    on_cycle = []
+    for start in parents:
+        path = []
+        node = start
+        while node in parents and node not in state:
+            state[node] = start
+            path.append(node)
+            node = parents[node]
+        if state.get(node) == start and node in parents:
+            on_cycle.extend(path[path.index(node):])
+    return on_cycle
+
+
+def _where(entry):
+    path, row = entry
+    return f"{os.path.basename(path)}:{row[LINE]}"
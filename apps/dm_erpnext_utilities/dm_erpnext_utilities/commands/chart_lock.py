@@ -0,0 +1,285 @@
+"""
+Advisory locks around chart writes.
+
+Every operation that writes a company's chart (delete, import, sync,
+merge, reparent, background jobs) runs under a MariaDB named lock
+(GET_LOCK) for its company, so two of them never work on the same
+company at once; operations on different companies take different locks
+and keep running in parallel. Named locks belong to the database
+connection: they survive commits and are released by the server if the
+process dies.
+
+lft/rgt, however, are one numbering per doctype for the whole site: an
+insert, delete or reparent in one company shifts the bounds of every
+company, and a rebuild rewrites them all. Each such structural write
+therefore also takes the doctype's site-wide nested set lock
+(nested_set_lock), always after the company lock, and keeps it until
+its transaction commits or rolls back. Reading and checking, the bulk
+of most operations, still runs in parallel across companies.
+
+The holder publishes who it is (operation, job, host, pid, since) in
+Redis, so a waiter that gives up can say "held by ... since ...". How
+long each operation waited for and held its lock is appended to a
+capped log, read back by `chart-lock-status` to size batch windows.
+
+The wait defaults to DEFAULT_LOCK_WAIT seconds and can be changed per
+site with `bench set-config chart_lock_wait SECONDS`.
+"""
+import contextlib
+import functools
+import hashlib
+import inspect
+import json
+import os
+import socket
+import time
+
+import frappe
+
+HOLDER_KEY = 'dm_erpnext_utilities:chart_lock:{}'
+# A Redis list of JSON entries, newest first
+LOG_KEY = 'dm_erpnext_utilities:chart_lock_entries'
+
+DEFAULT_LOCK_WAIT = 120
+
+# Lock acquisitions kept for `chart-lock-status`
+LOG_SIZE = 1000
+
+
+class ChartLockTimeout(frappe.ValidationError):
+    pass
+
+
+def lock_scope(company, doctype='Account'):
+    """Lock scope of a tree: the doctype and the company (or '*' for global trees)."""
+    return f"{doctype}:{company or '*'}"
+
+
+def nested_set_scope(doctype='Account'):
+    """Lock scope of a doctype's lft/rgt numbering, shared by every company."""
+    return f"{doctype}:nested set"
+
+
+@contextlib.contextmanager
+def company_lock(company, operation, doctype='Account', job=None, wait=None):
+    """
+    Hold the chart lock of a company for the duration.
+
+    Args:
+        company: Company name (None for global trees such as Item Group)
+        operation: Name shown to waiters and in the log ('import', ...)
+        doctype: Tree doctype
+        job: Background job id, if any
+        wait: Seconds to wait for the lock (default: site config
+            chart_lock_wait, else DEFAULT_LOCK_WAIT)
+
+    Raises:
+        ChartLockTimeout: The lock was still held after waiting
+    """
+    scope = lock_scope(company, doctype)
+    # Scopes held by this connection, with their nesting depth: an
+    # operation calling another one (merge -> delete) does not wait for itself
+    held_scopes = frappe.flags.setdefault('chart_locks', {})
+    if scope in held_scopes:
+        held_scopes[scope] += 1
+        try:
+            yield
+        finally:
+            held_scopes[scope] -= 1
+        return
+
+    name, waited = _acquire(scope, operation, job, wait)
+    held_scopes[scope] = 1
+    print(f"🔒 Chart lock on {scope} acquired in {waited:.2f}s")
+    acquired_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        del held_scopes[scope]
+        held = _release(scope, name, operation, job, waited, acquired_at)
+        print(f"🔓 Chart lock on {scope} released after {held:.2f}s")
+
+
+@contextlib.contextmanager
+def nested_set_lock(operation, doctype='Account', job=None, wait=None):
+    """
+    Take the site-wide nested set lock of a tree doctype for a structural write.
+
+    Wrap every statement that changes lft/rgt or the parent links: document
+    inserts, deletes and reparents (frappe's update_nsm shifts every
+    company's bounds), set-based deletes and gap shifts, and rebuilds. The
+    lock is held until the current transaction commits or rolls back, not
+    just until the block exits, so the next writer reads the bounds only
+    once they are committed. Frappe < 14 has no transaction callbacks;
+    there it is released when the block exits.
+
+    Args:
+        operation: Name shown to waiters and in the log ('import', ...)
+        doctype: Tree doctype
+        job: Background job id, if any
+        wait: Seconds to wait for the lock, as for company_lock
+
+    Raises:
+        ChartLockTimeout: The lock was still held after waiting
+    """
+    scope = nested_set_scope(doctype)
+    held_scopes = frappe.flags.setdefault('chart_locks', {})
+    if scope in held_scopes:
+        # Already held by this transaction
+        yield
+        return
+
+    name, waited = _acquire(scope, operation, job, wait)
+    held_scopes[scope] = 1
+    acquired_at = time.perf_counter()
+    released = []
+
+    def release():
+        # Registered for both commit and rollback; only the first one counts
+        if not released:
+            released.append(True)
+            held_scopes.pop(scope, None)
+            _release(scope, name, operation, job, waited, acquired_at)
+
+    callbacks = (getattr(frappe.db, 'after_commit', None), getattr(frappe.db, 'after_rollback', None))
+    if None in callbacks:
+        try:
+            yield
+        finally:
+            release()
+        return
+
+    for callback in callbacks:
+        callback.add(release)
+    yield
+
+
+def company_locked(operation):
+    """
+    Decorator running a chart operation under company_lock.
+
+    The company and tree doctype are taken from the function's 'company'
+    and 'doctype' arguments; dry runs write nothing and are not locked.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            arguments = signature.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            arguments = arguments.arguments
+            if arguments.get('dry_run'):
+                return func(*args, **kwargs)
+            with company_lock(arguments.get('company'), operation, doctype=arguments.get('doctype') or 'Account'):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def get_holder(scope):
+    """Return the published holder of a scope's lock, or None."""
+    return frappe.cache().get_value(HOLDER_KEY.format(scope))
+
+
+def describe_holder(holder):
+    if not holder:
+        return ''
+    job = f"job {holder['job']}, " if holder.get('job') else ''
+    return (f" by {holder['operation']} ({job}{holder['user']}, pid {holder['pid']} on {holder['host']})"
+            f" since {holder['since']}")
+
+
+def get_lock_log(cache=None):
+    """Return the logged acquisitions, newest first."""
+    entries = (cache or frappe.cache()).lrange(LOG_KEY, 0, -1) or []
+    return [json.loads(entry) for entry in entries]
+
+
+def summarize_lock_log(entries):
+    """
+    Wait and hold time statistics per operation.
+
+    Returns:
+        Dict of operation -> {'count', 'timeouts', 'wait_p50', 'wait_p95',
+        'wait_max', 'hold_p50', 'hold_p95', 'hold_max'}
+    """
+    by_operation = {}
+    for entry in entries:
+        by_operation.setdefault(entry['operation'], []).append(entry)
+
+    summary = {}
+    for operation, rows in by_operation.items():
+        waits = sorted(row['waited'] for row in rows)
+        holds = sorted(row['held'] for row in rows if row['held'] is not None)
+        summary[operation] = {
+            'count': len(rows),
+            'timeouts': len(rows) - len(holds),
+            'wait_p50': _percentile(waits, 50),
+            'wait_p95': _percentile(waits, 95),
+            'wait_max': waits[-1],
+            'hold_p50': _percentile(holds, 50),
+            'hold_p95': _percentile(holds, 95),
+            'hold_max': holds[-1] if holds else 0.0,
+        }
+    return summary
+
+
+def _acquire(scope, operation, job, wait):
+    """GET_LOCK a scope and publish the holder; return (lock name, seconds waited)."""
+    from frappe.utils import now as now_datetime
+
+    if wait is None:
+        wait = frappe.conf.get('chart_lock_wait', DEFAULT_LOCK_WAIT)
+    name = _lock_name(scope)
+    start = time.perf_counter()
+    acquired = frappe.db.sql("SELECT GET_LOCK(%(name)s, %(wait)s)", {'name': name, 'wait': wait})[0][0]
+    waited = time.perf_counter() - start
+    if acquired != 1:
+        _record(scope, operation, job, waited, None)
+        raise ChartLockTimeout(f"Chart of {scope} is locked{describe_holder(get_holder(scope))}; "
+                               f"gave up after waiting {waited:.0f}s (site config chart_lock_wait)")
+
+    holder = {
+        'operation': operation,
+        'job': job,
+        'user': frappe.session.user,
+        'host': socket.gethostname(),
+        'pid': os.getpid(),
+        'since': now_datetime(),
+    }
+    frappe.cache().set_value(HOLDER_KEY.format(scope), holder)
+    return name, waited
+
+
+def _release(scope, name, operation, job, waited, acquired_at):
+    """RELEASE_LOCK a scope, log the acquisition and return the seconds it was held."""
+    held = time.perf_counter() - acquired_at
+    frappe.cache().delete_value(HOLDER_KEY.format(scope))
+    frappe.db.sql("SELECT RELEASE_LOCK(%(name)s)", {'name': name})
+    _record(scope, operation, job, waited, held)
+    return held
+
+
+def _lock_name(scope):
+    # Named locks are server-wide and at most 64 characters: qualify with
+    # the site's database and hash
+    digest = hashlib.sha1(f"{frappe.conf.db_name}:{scope}".encode()).hexdigest()
+    return f"dm_erpnext_utilities:{digest}"
+
+
+def _record(scope, operation, job, waited, held):
+    cache = frappe.cache()
+    entry = {'scope': scope, 'operation': operation, 'job': job, 'waited': waited, 'held': held,
+             'at': time.time()}
+    # Two constant-time list commands, safe with any number of writers
+    cache.lpush(LOG_KEY, json.dumps(entry))
+    cache.ltrim(LOG_KEY, 0, LOG_SIZE - 1)
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
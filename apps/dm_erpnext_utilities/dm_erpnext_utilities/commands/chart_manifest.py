@@ -0,0 +1,294 @@
+"""
+Manifest-driven batches of chart operations.
+
+A manifest (YAML or JSON) lists steps: delete a subtree, import or sync
+chart files, move an account under another parent, merge a subtree into
+another account. All steps run in one process with one database
+connection, so Frappe boots once and caches (usage registry, company
+abbreviations) stay warm from step to step.
+
+    companies: [DM-CASA, ACME]       # default for steps without one
+    atomic: false                    # true: one transaction for everything
+    steps:
+      - {op: delete, account: PRODUCTION COSTS, bulk: true}
+      - {op: import, files: [nivel2.csv, nivel3.csv], skip_root: true, bulk: true}
+      - {op: reparent, account: Fixed Expenses, parent: Expenses, company: DM-CASA}
+      - {op: sync, files: [revised.csv], delete: false}
+      - {op: merge, account: OLD EXPENSES, target: Other Expenses}
+
+Steps of one company run in manifest order; different companies are
+independent and run concurrently on the worker pool. Each company's tree
+is loaded once to resolve names given without the company abbreviation
+and to reject impossible moves before anything is written; the steps
+themselves read the live tree again, since every earlier step changes it.
+By default every step commits on its own and a failed step stops the
+remaining steps of its company; with atomic, the companies run one after
+another in this process and all steps share one transaction that is
+committed only if every step succeeds: the steps are called with
+commit=False. Merges commit chunk by chunk to keep ledger row locks
+short and cannot be part of an atomic manifest.
+"""
+import contextlib
+import json
+import os
+import time
+
+import frappe
+
+from dm_erpnext_utilities.commands.chart_lint import lint_chart_files
+from dm_erpnext_utilities.commands.chart_lock import company_lock, company_locked, nested_set_lock
+from dm_erpnext_utilities.commands.tree_cache import get_company_tree
+
+OPERATIONS = ('delete', 'import', 'sync', 'reparent', 'merge')
+
+
+def load_manifest(path):
+    """Read a manifest file; YAML needs PyYAML, JSON does not."""
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(('.yml', '.yaml')):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("YAML manifests need PyYAML (pip install pyyaml); use JSON instead")
+            manifest = yaml.safe_load(f)
+        else:
+            manifest = json.load(f)
+    if not isinstance(manifest, dict) or not isinstance(manifest.get('steps'), list):
+        raise ValueError(f"{path}: expected a mapping with a 'steps' list")
+    return manifest
+
+
+def expand_steps(manifest, base_dir, companies=None):
+    """
+    Validate the steps and return them grouped by company, in order.
+
+    Steps naming several companies (or none, using the manifest's or the
+    caller's default companies) are repeated for each of them. Relative
+    file paths are resolved against base_dir.
+
+    Returns:
+        (dict of company -> list of steps, list of errors)
+    """
+    default_companies = list(companies or manifest.get('companies') or [])
+    by_company = {}
+    errors = []
+    for number, step in enumerate(manifest['steps'], start=1):
+        if not isinstance(step, dict) or step.get('op') not in OPERATIONS:
+            errors.append(f"step {number}: 'op' must be one of {', '.join(OPERATIONS)}")
+            continue
+        step = dict(step, number=number)
+        op = step['op']
+        if op in ('delete', 'reparent', 'merge') and not step.get('account'):
+            errors.append(f"step {number}: {op} needs 'account'")
+        if op == 'reparent' and not step.get('parent'):
+            errors.append(f"step {number}: reparent needs 'parent'")
+        if op == 'merge' and not step.get('target'):
+            errors.append(f"step {number}: merge needs 'target'")
+        if op in ('import', 'sync'):
+            files = step.get('files') or []
+            files = [files] if isinstance(files, str) else files
+            step['files'] = [os.path.join(base_dir, f) for f in files]
+            missing = [f for f in step['files'] if not os.path.exists(f)]
+            if not files or missing:
+                errors.append(f"step {number}: {op} needs existing 'files' ({', '.join(missing) or 'none given'})")
+            elif op == 'import':
+                # Same offline check as import-chart-of-accounts, before any step runs
+                errors.extend(f"step {number}: {path}:{line}: [{code}] {message}"
+                              for path, line, severity, code, message in lint_chart_files(step['files'])['findings']
+                              if severity == 'error')
+
+        step_companies = step.pop('companies', None) or step.pop('company', None) or default_companies
+        step_companies = [step_companies] if isinstance(step_companies, str) else step_companies
+        if not step_companies:
+            errors.append(f"step {number}: no company (set 'company' or the manifest's 'companies')")
+        for company in step_companies:
+            by_company.setdefault(company, []).append(step)
+    return by_company, errors
+
+
+def plan_company_steps(company, steps):
+    """
+    Resolve account names against the company's (cached) tree.
+
+    Names found with the company abbreviation appended are rewritten; names
+    not in the tree are kept, as an earlier step may create them. Moves of
+    an account under itself or its own subtree are reported as errors.
+
+    Returns:
+        (list of resolved steps, list of errors)
+    """
+    tree = get_company_tree(company)
+    abbr = frappe.get_cached_value('Company', company, 'abbr')
+
+    def resolve(name):
+        if name in tree:
+            return name
+        suffixed = f"{name} - {abbr}"
+        return suffixed if suffixed in tree else name
+
+    resolved = []
+    errors = []
+    for step in steps:
+        step = dict(step)
+        if step.get('account'):
+            step['account'] = resolve(step['account'])
+        if step['op'] == 'merge':
+            step['target'] = resolve(step['target'])
+        if step['op'] == 'reparent':
+            step['parent'] = resolve(step['parent'])
+            account, parent = step['account'], step['parent']
+            if account in tree and parent in tree and (parent == account or tree.is_under(parent, account)):
+                errors.append(f"step {step['number']} ({company}): cannot move {account} under its own subtree")
+        resolved.append(step)
+    return resolved, errors
+
+
+def run_company_steps(company, steps):
+    """
+    Run one company's steps in order, each committing on its own.
+
+    A failed step is rolled back and the company's remaining steps are
+    skipped.
+
+    Returns:
+        True if every step succeeded
+    """
+    ok, timings = _run_steps(company, steps)
+    print_step_timings(company, timings)
+    return ok
+
+
+def run_manifest_company(company, steps_by_company):
+    """Worker pool entry point (see parallel.run_for_companies)."""
+    return run_company_steps(company, steps_by_company[company])
+
+
+def run_manifest_atomic(by_company):
+    """
+    Run every company's steps in one transaction, in this process.
+
+    The steps run with commit=False; the transaction is committed once if
+    every step succeeded and rolled back otherwise. Manifests with merge
+    steps are refused, as a merge commits every chunk. The chart
+    locks of every company are taken up front and kept until then (the
+    steps re-enter them), and the nested set lock of the first structural
+    step is kept as well, so nobody sees or builds on uncommitted work.
+    The row locks the steps take are held just as long: a nested-set
+    rebuild or rename_doc locks Account rows until the manifest ends.
+    Keep atomic manifests short.
+
+    Returns:
+        True if every step succeeded (and was committed)
+    """
+    merges = sorted({step['number'] for steps in by_company.values() for step in steps if step['op'] == 'merge'})
+    if merges:
+        print(f"❌ Step(s) {', '.join(map(str, merges))}: merge commits chunk by chunk and cannot run in an atomic manifest")
+        return False
+
+    ok = True
+    with contextlib.ExitStack() as locks:
+        # Always in the same order, so two atomic manifests cannot deadlock
+        for company in sorted(by_company):
+            locks.enter_context(company_lock(company, 'manifest'))
+
+        for company, steps in by_company.items():
+            if ok:
+                ok, timings = _run_steps(company, steps, commit=False)
+            else:
+                timings = [(step, None, 0.0) for step in steps]
+            print_step_timings(company, timings)
+
+        if ok:
+            frappe.db.commit()
+            print("✅ Manifest committed.")
+        else:
+            frappe.db.rollback()
+            print("❌ Manifest rolled back, nothing was changed.")
+    return ok
+
+
+def _run_steps(company, steps, commit=True):
+    """Run steps in order until one fails; return (ok, [(step, ok, seconds)])."""
+    steps, errors = plan_company_steps(company, steps)
+    if errors:
+        for error in errors:
+            print(f"   ❌ {error}")
+        return False, [(step, None, 0.0) for step in steps]
+
+    timings = []
+    ok = True
+    for step in steps:
+        if not ok:
+            timings.append((step, None, 0.0))
+            continue
+        start = time.perf_counter()
+        try:
+            ok = bool(run_step(company, step, commit=commit))
+        except Exception as e:
+            print(f"❌ Step {step['number']} failed: {e}")
+            ok = False
+        if not ok:
+            frappe.db.rollback()
+        timings.append((step, ok, time.perf_counter() - start))
+    return ok, timings
+
+
+def run_step(company, step, commit=True):
+    """Dispatch one step to the command function it names; commit=False leaves committing to the caller."""
+    op = step['op']
+    if op == 'delete':
+        from dm_erpnext_utilities.commands.account_manager import delete_company_account
+
+        return delete_company_account(step['account'], company, dry_run=step.get('dry_run', False),
+                                      bulk=step.get('bulk', False), commit=commit)
+    if op == 'import':
+        from dm_erpnext_utilities.commands.account_importer import import_accounts_from_csv
+
+        return import_accounts_from_csv(step['files'], company, reset=step.get('reset', False),
+            skip_root=step.get('skip_root', False), bulk=step.get('bulk', False),
+            keep_used=step.get('keep_used', False), commit=commit)
+    if op == 'merge':
+        from dm_erpnext_utilities.commands.account_merge import MERGE_CHUNK_SIZE, merge_account_subtree
+
+        return merge_account_subtree(step['account'], step['target'], company,
+            chunk_size=step.get('chunk_size', MERGE_CHUNK_SIZE), dry_run=step.get('dry_run', False),
+            keep_source=step.get('keep_source', False))
+    if op == 'sync':
+        from dm_erpnext_utilities.commands.chart_sync import sync_chart_of_accounts
+
+        return sync_chart_of_accounts(step['files'], company, delete=step.get('delete', False),
+                                      dry_run=step.get('dry_run', False), commit=commit)
+    return reparent_account(step['account'], step['parent'], company, commit=commit)
+
+
+@company_locked('reparent')
+def reparent_account(account_name, parent, company, commit=True):
+    """Move an account (and its subtree) under another group account."""
+    print(f"\n🔀 Moving {account_name} under {parent}...")
+    doc = frappe.get_doc('Account', account_name)
+    if doc.company != company:
+        print(f"❌ ERROR: Account '{account_name}' does not belong to {company}!")
+        return False
+    if doc.parent_account == parent:
+        print("   Already there, nothing to do.")
+        return True
+    # Account validation checks the parent is a group of the same company;
+    # NestedSet.on_update moves the subtree's lft/rgt
+    doc.parent_account = parent
+    with nested_set_lock('reparent'):
+        doc.save(ignore_permissions=True)
+    if commit:
+        frappe.db.commit()
+    print("   ✅ Moved.")
+    return True
+
+
+def print_step_timings(company, timings):
+    print(f"\n{'='*60}")
+    print(f"📋 Manifest steps for {company}:")
+    for step, ok, elapsed in timings:
+        status = "⏭️ " if ok is None else ("✅" if ok else "❌")
+        target = step.get('account') or ', '.join(os.path.basename(f) for f in step.get('files', []))
+        print(f"   {status} {step['number']:>3}. {step['op']:<8} {target[:36]:<36} {elapsed:>8.2f}s")
+    print(f"   {'total':<50} {sum(t[2] for t in timings):>8.2f}s")
+    print(f"{'='*60}\n")
@@ -0,0 +1,249 @@
+"""
+Streaming readers for chart of accounts files.
+
+Every reader is a generator yielding one normalized record per account:
+
+    {
+        'file': path, 'line': position in the file,
+        'name': full account name when the source has one (ID column),
+        'account_name', 'parent_account', 'account_number',
+        'account_type', 'root_type', 'company',
+        'is_group': 1, 0 or None when the source does not say,
+    }
+
+Supported formats:
+    - CSV with English or Portuguese headers (see HEADER_ALIASES),
+      including the flat `BR/Account.csv` export from ERPNext
+    - ERPNext nested JSON charts ({"tree": {"Account": {...}}})
+    - Flat JSON charts ({"accounts": [{"account_name": ...}, ...]})
+
+CSV is always read row by row. JSON is streamed when the optional ijson
+package is installed (pip install ijson); otherwise the whole document
+is loaded with the json module first, so without ijson a JSON chart
+costs memory in proportion to its size.
+"""
+import csv
+import json
+
+# Normalized field -> accepted headers (compared case-insensitively)
+HEADER_ALIASES = {
+    'name': ('id', 'name'),
+    'account_name': ('account name', 'account_name', 'nome da conta'),
+    'parent_account': ('parent account', 'parent_account', 'conta pai', 'conta superior'),
+    'account_number': ('account number', 'account_number', 'número da conta', 'numero da conta'),
+    'account_type': ('account type', 'account_type', 'tipo de conta', 'tipo da conta'),
+    'root_type': ('root type', 'root_type', 'tipo raiz'),
+    'is_group': ('is group', 'is_group', 'é grupo', 'e grupo'),
+    'company': ('company', 'empresa'),
+}
+
+RECORD_FIELDS = tuple(HEADER_ALIASES)
+
+TRUE_VALUES = ('1', 'yes', 'y', 'true', 'sim', 's')
+FALSE_VALUES = ('0', 'no', 'n', 'false', 'não', 'nao')
+
+# Keys of a nested tree node that are properties, not child accounts
+TREE_NODE_PROPERTIES = ('account_type', 'root_type', 'is_group', 'tax_rate', 'account_number',
+                        'account_currency', 'account_category')
+
+
+def read_chart(path):
+    """Yield normalized account records from a CSV or JSON chart file."""
+    if path.lower().endswith('.json'):
+        return read_json_chart(path)
+    return read_csv_chart(path)
+
+
+def read_charts(paths):
+    """Yield the records of several chart files, one file after the other."""
+    for path in paths:
+        yield from read_chart(path)
+
+
+def read_csv_chart(path):
+    """
+    Yield records from a CSV chart, one row at a time.
+
+    Headers are mapped through HEADER_ALIASES, so both the English
+    import format and the Portuguese ERPNext export are understood.
+    Unknown columns are ignored.
+    """
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = map_headers(header)
+
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            values = {field: (row[i] if i < len(row) else '') for field, i in columns.items()}
+            yield make_record(path, reader.line_num, values)
+
+
+def read_json_chart(path):
+    """
+    Yield records from an ERPNext nested tree or a flat accounts list.
+
+    With ijson installed the file is parsed as a stream: a flat list
+    yields each account as soon as it is read, and a tree yields each
+    account when its node closes (ERPNext charts may list root_type or
+    is_group after the children), so memory is bounded by the depth of
+    the tree, not the size of the file. Records come children first but
+    keep their pre-order position as 'line'. Without ijson the document
+    is loaded whole with the standard library and walked parents first.
+    """
+    try:
+        import ijson
+    except ImportError:
+        ijson = None
+
+    if ijson is None:
+        with open(path, 'r', encoding='utf-8') as f:
+            chart = json.load(f)
+        if isinstance(chart.get('accounts'), list):
+            for position, account in enumerate(chart['accounts'], start=1):
+                yield make_record(path, position, account)
+        elif isinstance(chart.get('tree'), dict):
+            yield from walk_tree(path, chart['tree'])
+        else:
+            raise ValueError(f"{path}: unrecognized chart format (expected 'tree' or 'accounts')")
+        return
+
+    with open(path, 'rb') as f:
+        try:
+            yield from stream_json_chart(path, ijson.parse(f), ijson.ObjectBuilder)
+        except ijson.JSONError as e:
+            raise ValueError(f"{path}: invalid JSON: {e}")
+
+
+def stream_json_chart(path, events, object_builder):
+    """
+    Turn ijson parse events of a chart into records (see read_json_chart).
+
+    Args:
+        path: File name for the records
+        events: (prefix, event, value) tuples from ijson.parse
+        object_builder: ijson.ObjectBuilder, to assemble flat list items
+    """
+    found = False
+    position = 0
+    builder = None
+    # Open tree nodes: [account_name, values, has_children, position]
+    nodes = []
+    in_tree = False
+    key = None
+    # Depth of a value being skipped (non-object node, object property)
+    skip = 0
+
+    for prefix, event, value in events:
+        if builder is not None:
+            if prefix == 'accounts.item' and event == 'end_map':
+                position += 1
+                yield make_record(path, position, builder.value)
+                builder = None
+            else:
+                builder.event(event, value)
+            continue
+
+        if not in_tree:
+            if prefix == 'accounts' and event == 'start_array':
+                found = True
+            elif prefix == 'accounts.item' and event == 'start_map':
+                builder = object_builder()
+                builder.event(event, value)
+            elif prefix == 'tree' and event == 'start_map':
+                found = in_tree = True
+            continue
+
+        if skip:
+            if event in ('start_map', 'start_array'):
+                skip += 1
+            elif event in ('end_map', 'end_array'):
+                skip -= 1
+        elif event == 'map_key':
+            key = value
+        elif event == 'start_map' and not (nodes and key in TREE_NODE_PROPERTIES):
+            if nodes:
+                nodes[-1][2] = True
+            position += 1
+            nodes.append([key, {}, False, position])
+        elif event in ('start_map', 'start_array'):
+            skip = 1
+        elif event == 'end_map':
+            if not nodes:
+                in_tree = False
+                continue
+            account_name, values, has_children, node_position = nodes.pop()
+            # Same rule as ERPNext's identify_is_group
+            is_group = values.get('is_group')
+            if is_group is None and has_children:
+                is_group = 1
+            parent = nodes[-1][0] if nodes else ''
+            values.update(account_name=account_name, parent_account=parent, is_group=is_group)
+            yield make_record(path, node_position, values)
+        elif nodes:
+            values = nodes[-1][1]
+            values[key] = value
+
+    if not found:
+        raise ValueError(f"{path}: unrecognized chart format (expected 'tree' or 'accounts')")
+
+
+def walk_tree(path, tree):
+    """Walk an ERPNext nested chart iteratively, parents before children."""
+    position = 0
+    stack = [(None, name, node) for name, node in reversed(list(tree.items())) if isinstance(node, dict)]
+    while stack:
+        parent, account_name, node = stack.pop()
+        children = [(k, v) for k, v in node.items()
+                    if isinstance(v, dict) and k not in TREE_NODE_PROPERTIES]
+
+        # Same rule as ERPNext's identify_is_group
+        is_group = node.get('is_group')
+        if is_group is None and children:
+            is_group = 1
+
+        position += 1
+        values = dict(node, account_name=account_name, parent_account=parent or '', is_group=is_group)
+        yield make_record(path, position, values)
+
+        for child_name, child in reversed(children):
+            stack.append((account_name, child_name, child))
+
+
+def map_headers(header, header_aliases=HEADER_ALIASES):
+    """Return normalized field -> column index for a CSV header row."""
+    aliases = {alias: field for field, names in header_aliases.items() for alias in names}
+    columns = {}
+    for i, title in enumerate(header):
+        field = aliases.get(title.strip().casefold())
+        if field and field not in columns:
+            columns[field] = i
+    return columns
+
+
+def make_record(path, line, values):
+    """Build a normalized record from a mapping of raw values."""
+    record = {'file': path, 'line': line}
+    for field in RECORD_FIELDS:
+        value = values.get(field)
+        record[field] = '' if value is None else str(value).strip()
+    record['is_group'] = parse_flag(values.get('is_group'))
+    return record
+
+
+def parse_flag(value):
+    """Parse 1/0, Yes/No, Sim/Não... into 1 or 0; None when empty or unknown."""
+    if value is None or isinstance(value, bool):
+        return None if value is None else int(value)
+    if isinstance(value, int):
+        return 1 if value else 0
+    text = str(value).strip().casefold()
+    if text in TRUE_VALUES:
+        return 1
+    if text in FALSE_VALUES:
+        return 0
+    return None
+
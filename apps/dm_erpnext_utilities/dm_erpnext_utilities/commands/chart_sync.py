@@ -0,0 +1,409 @@
+"""
+Incremental chart of accounts sync.
+
+sync_chart_of_accounts loads the company's live tree in one query, reads
+the source chart in one streaming pass and computes the changeset that
+turns one into the other: accounts to create, fields to update, parents
+to change, accounts to rename (matched by account number) and, with
+delete=True, accounts missing from the source. The changeset is applied
+with batched statements, one nested-set rebuild and one commit, so an
+unchanged account costs nothing.
+"""
+import contextlib
+import os
+import time
+
+import frappe
+
+from dm_erpnext_utilities.commands.account_importer import (
+    REPORT_TYPES,
+    add_to_account_index,
+    build_account_index,
+    find_existing_account,
+    insert_account_rows,
+    resolve_account,
+)
+from dm_erpnext_utilities.commands.account_manager import (
+    DELETE_CHUNK_SIZE,
+    check_accounts_have_transactions,
+)
+from dm_erpnext_utilities.commands.account_tree import AccountTree
+from dm_erpnext_utilities.commands.chart_lock import company_locked, nested_set_lock
+from dm_erpnext_utilities.commands.chart_reader import read_charts
+from dm_erpnext_utilities.commands.nestedset import rebuild_nested_set
+from dm_erpnext_utilities.commands.profiler import profile_phase
+from dm_erpnext_utilities.commands.tree_cache import invalidate_company_trees
+
+# Rows per batched UPDATE statement
+UPDATE_CHUNK_SIZE = 500
+
+# Account fields compared between the source chart and the live tree
+SYNC_FIELDS = ('account_name', 'account_number', 'account_type', 'is_group', 'parent_account', 'root_type')
+
+
+@company_locked('sync')
+def sync_chart_of_accounts(csv_files, company, delete=False, dry_run=False, commit=True):
+    """
+    Bring a company's chart in line with one or more chart files.
+
+    Args:
+        csv_files: List of paths to CSV or JSON chart files (see chart_reader)
+        company: Company name
+        delete: Also delete accounts that are not in the source (never
+            root accounts, accounts with ledger entries or their ancestors)
+        dry_run: Only print the changeset
+        commit: Commit the changeset; False leaves it to the caller
+
+    Returns:
+        True if success, False if failure
+    """
+    print(f"\n{'='*60}")
+    print(f"Syncing Chart of Accounts")
+    print(f"{'='*60}\n")
+
+    if not frappe.db.exists('Company', company):
+        print(f"❌ ERROR: Company '{company}' does not exist!")
+        return False
+
+    missing = [f for f in csv_files if not os.path.exists(f)]
+    if missing:
+        print(f"❌ ERROR: File not found: {', '.join(missing)}")
+        return False
+
+    start = time.perf_counter()
+    changes = plan_sync(csv_files, company, delete=delete)
+    profile_phase('plan')
+    print_changeset(changes)
+
+    if changes['errors']:
+        print(f"\n❌ Validation failed, nothing was changed:")
+        for error in changes['errors']:
+            print(f"   ❌ {error}")
+        return False
+
+    if not changeset_size(changes):
+        print("✅ Chart is already in sync, nothing to do.")
+        return True
+
+    if dry_run:
+        print("🔍 DRY-RUN mode: no changes were made.")
+        return True
+
+    try:
+        writes = apply_changeset(changes, company, commit=commit)
+        profile_phase('apply')
+    except Exception as e:
+        frappe.db.rollback()
+        print(f"❌ Sync failed, rolled back: {e}")
+        return False
+
+    print(f"\n{'='*60}")
+    print(f"📊 Sync Summary:")
+    print(f"   ✅ Applied: {changeset_size(changes)} change(s) in {writes} statement(s)")
+    print(f"   ⏸️  Unchanged: {changes['unchanged']}")
+    print(f"   ⏱️  Elapsed: {time.perf_counter() - start:.2f}s")
+    print(f"{'='*60}\n")
+    return True
+
+
+def plan_sync(csv_files, company, delete=False):
+    """
+    Compute the changeset between the chart files and the live tree.
+
+    A source row matches a live account by account number first, then by
+    name as the importer does. Empty account numbers and account types in
+    the source keep the live value; an empty Is Group keeps the live value
+    or, for new accounts, depends on whether they receive children. Root
+    types follow the parent, as Account.validate would set them.
+
+    Returns:
+        Dict with 'creates' (rows), 'updates' (name -> {field: (old, new)}),
+        'renames' ((old, new) pairs), 'deletes' (names), 'unchanged' and
+        'errors'
+    """
+    from erpnext.accounts.doctype.account.account import get_account_autoname
+
+    index = build_account_index(company)
+    live = index['accounts']
+
+    # Pass 1: match every source row to a live account or a new name
+    matched = {}
+    creates = {}
+    errors = []
+    try:
+        for row in read_charts(csv_files):
+            if not row['account_name']:
+                continue
+            where = f"{row['file']}:{row['line']}"
+            number = row['account_number']
+
+            match = index['by_number'].get(number) if number else None
+            if match not in live:
+                name = get_account_autoname(number, row['account_name'], company)
+                match = find_existing_account(index, name, row['account_name'], number)
+            if match in matched or match in creates:
+                errors.append(f"{where}: duplicate account {match}")
+                continue
+
+            if match in live:
+                number = number or live[match].account_number or ''
+                new_name = get_account_autoname(number, row['account_name'], company)
+                owner = index['by_name'].get(new_name.casefold())
+                if owner not in (None, match):
+                    errors.append(f"{where}: cannot rename {match} to {new_name}, the name is taken")
+                    continue
+                row['name'] = match
+                row['new_name'] = new_name
+                matched[match] = row
+                index['by_name'][new_name.casefold()] = match
+            else:
+                match = get_account_autoname(number, row['account_name'], company)
+                row['name'] = match
+                creates[match] = row
+
+            owner = index['by_number'].get(number)
+            if number and owner not in (None, match):
+                errors.append(f"{where}: account number {number} already used by {owner}")
+                continue
+            add_to_account_index(index, match, row['account_name'], number)
+    except (ValueError, UnicodeDecodeError) as e:
+        errors.append(str(e))
+
+    # Pass 2: resolve parents against the live tree and the source rows
+    for row in list(matched.values()) + list(creates.values()):
+        row['parent_name'] = None
+        if row['parent_account']:
+            row['parent_name'] = resolve_account(index, row['parent_account'])
+            if not row['parent_name']:
+                errors.append(f"{row['file']}:{row['line']}: parent does not exist: {row['parent_account']} (for {row['account_name']})")
+
+    target = build_target_tree(live, matched, creates)
+    tree = AccountTree(list(target), [account['parent_account'] for account in target.values()])
+
+    for name, account in target.items():
+        row = matched.get(name) or creates.get(name)
+        if account['is_group'] is None:
+            account['is_group'] = 1 if tree.has_children(name) else 0
+        if not account['is_group'] and tree.has_children(name):
+            where = f"{row['file']}:{row['line']}: " if row else ''
+            errors.append(f"{where}{name} is not a group but has child accounts")
+
+    # Root types flow down from the roots; whatever is not reached is in a cycle
+    for node in tree:
+        name = node.name
+        if node.parent_account:
+            target[name]['root_type'] = target[node.parent_account]['root_type']
+        if name in creates and target[name]['root_type'] not in REPORT_TYPES:
+            row = creates[name]
+            errors.append(f"{row['file']}:{row['line']}: cannot determine root type for {row['account_name']}")
+    for name in tree.unreached():
+        errors.append(f"parent cycle through {name} -> {target[name]['parent_account']}")
+
+    deletes = find_deletes(live, tree, matched, creates) if delete else []
+
+    # A ledger with GL entries cannot become a group
+    to_group = [n for n in matched if target[n]['is_group'] and not live[n].is_group]
+    for name, usage in check_accounts_have_transactions(to_group).items():
+        if usage['gl_entries']:
+            errors.append(f"{name} has ledger entries and cannot become a group")
+
+    updates = {}
+    removed = set(deletes)
+    for name, account in live.items():
+        if name in removed:
+            continue
+        current = live_values(account)
+        changed = {
+            field: (current[field], target[name][field]) for field in SYNC_FIELDS
+            if current[field] != target[name][field]
+        }
+        if changed:
+            updates[name] = changed
+
+    renames = [(name, row['new_name']) for name, row in matched.items() if row['new_name'] != name]
+    for row in creates.values():
+        row.update(is_group=target[row['name']]['is_group'], root_type=target[row['name']]['root_type'])
+
+    return {
+        'creates': list(creates.values()),
+        'updates': updates,
+        'renames': renames,
+        'deletes': deletes,
+        'unchanged': len(live) - len(updates) - len(removed),
+        'errors': errors,
+    }
+
+
+def live_values(account):
+    """Return the SYNC_FIELDS of a live account, normalized like the target."""
+    return {
+        'account_name': account.account_name,
+        'account_number': account.account_number or '',
+        'account_type': account.account_type or '',
+        'is_group': account.is_group,
+        'parent_account': account.parent_account or None,
+        'root_type': account.root_type or '',
+    }
+
+
+def build_target_tree(live, matched, creates):
+    """Return name -> desired SYNC_FIELDS for every live and new account."""
+    target = {name: live_values(account) for name, account in live.items()}
+
+    for name, row in matched.items():
+        account = target[name]
+        account['account_name'] = row['account_name']
+        account['parent_account'] = row['parent_name']
+        for field in ('account_number', 'account_type', 'root_type'):
+            if row[field]:
+                account[field] = row[field]
+        if row['is_group'] is not None:
+            account['is_group'] = row['is_group']
+
+    for name, row in creates.items():
+        target[name] = {
+            'account_name': row['account_name'],
+            'account_number': row['account_number'],
+            'account_type': row['account_type'],
+            'is_group': row['is_group'],
+            'parent_account': row['parent_name'],
+            'root_type': row['root_type'],
+        }
+    return target
+
+
+def find_deletes(live, tree, matched, creates):
+    """
+    Return the live accounts absent from the source that can be deleted.
+
+    Roots, accounts still needed as an ancestor of a kept account and
+    accounts referenced by ledger entries (with their ancestors) are kept.
+    tree is the AccountTree of the target chart.
+    """
+    def keep_with_ancestors(name):
+        kept.add(name)
+        kept.update(tree.ancestors(name))
+
+    kept = set(tree.roots())
+    for name in list(matched) + list(creates):
+        keep_with_ancestors(name)
+
+    candidates = [name for name in live if name not in kept]
+    for name, usage in check_accounts_have_transactions(candidates).items():
+        if usage['total']:
+            print(f"   ⚠️  Keeping {name}: referenced by {usage['total']} ledger row(s)")
+            keep_with_ancestors(name)
+
+    return [name for name in candidates if name not in kept]
+
+
+def changeset_size(changes):
+    # A rename always comes with an account_name or account_number update
+    return len(changes['creates']) + len(changes['updates']) + len(changes['deletes'])
+
+
+def print_changeset(changes):
+    """Print the planned changes, one line per account."""
+    print(f"\n📋 Changeset:")
+    for row in changes['creates']:
+        print(f"   ➕ Create: {row['name']} (under {row['parent_name'] or '-'})")
+    for name, changed in changes['updates'].items():
+        for field, (old, new) in changed.items():
+            icon = "🔀" if field == 'parent_account' else "✏️ "
+            print(f"   {icon} {name}: {field} {old or '-'} → {new or '-'}")
+    for old, new in changes['renames']:
+        print(f"   🏷️  Rename: {old} → {new}")
+    for name in changes['deletes']:
+        print(f"   🗑️  Delete: {name}")
+
+    reparents = sum(1 for changed in changes['updates'].values() if 'parent_account' in changed)
+    print(f"\n   Creates: {len(changes['creates'])}, Updates: {len(changes['updates'])} "
+          f"({reparents} re-parent), Renames: {len(changes['renames'])}, "
+          f"Deletes: {len(changes['deletes'])}, Unchanged: {changes['unchanged']}\n")
+
+
+def apply_changeset(changes, company, commit=True):
+    """
+    Write a changeset in one transaction and commit it (unless commit is False).
+
+    New accounts are inserted with multi-row INSERTs, changed fields are
+    written with one CASE statement per field and batch, deletes with
+    batched DELETEs, renames go through frappe.rename_doc so every link
+    follows, and lft/rgt are rebuilt once when the tree shape changed.
+    A changeset that changes the tree shape is written under the nested
+    set lock.
+
+    Returns:
+        Number of write statements issued (renames count as one each)
+    """
+    from frappe.utils import now as now_datetime
+
+    # Creates, deletes, renames and re-parents change lft/rgt of every company
+    structural = (changes['creates'] or changes['deletes'] or changes['renames']
+                  or any('parent_account' in changed for changed in changes['updates'].values()))
+    lock = nested_set_lock('sync') if structural else contextlib.nullcontext()
+    with lock:
+        writes = 0
+        if changes['creates']:
+            insert_account_rows(changes['creates'], company)
+            writes += -(-len(changes['creates']) // UPDATE_CHUNK_SIZE)
+
+        columns = {}
+        for name, changed in changes['updates'].items():
+            for field, (_, new) in changed.items():
+                columns.setdefault(field, []).append((name, new))
+                # Keep the companion columns consistent with raw updates
+                if field == 'parent_account':
+                    columns.setdefault('old_parent', []).append((name, new))
+                elif field == 'root_type':
+                    columns.setdefault('report_type', []).append((name, REPORT_TYPES.get(new)))
+        for field, values in columns.items():
+            for i in range(0, len(values), UPDATE_CHUNK_SIZE):
+                write_column('Account', field, values[i:i + UPDATE_CHUNK_SIZE])
+                writes += 1
+
+        updated = list(changes['updates'])
+        for i in range(0, len(updated), UPDATE_CHUNK_SIZE):
+            frappe.db.sql("""
+                UPDATE `tabAccount` SET modified = %(now)s, modified_by = %(user)s
+                WHERE name IN %(names)s
+            """, {'now': now_datetime(), 'user': frappe.session.user,
+                  'names': tuple(updated[i:i + UPDATE_CHUNK_SIZE])})
+            writes += 1
+
+        deletes = changes['deletes']
+        for i in range(0, len(deletes), DELETE_CHUNK_SIZE):
+            frappe.db.sql("DELETE FROM `tabAccount` WHERE name IN %(names)s",
+                          {'names': tuple(deletes[i:i + DELETE_CHUNK_SIZE])})
+            writes += 1
+
+        for old, new in changes['renames']:
+            frappe.rename_doc('Account', old, new, force=True, ignore_permissions=True)
+            writes += 1
+
+        if changes['creates'] or deletes or 'parent_account' in columns:
+            rebuild_nested_set('Account')
+            writes += 1
+        elif updated:
+            invalidate_company_trees(company)
+
+    if commit:
+        frappe.db.commit()
+    return writes
+
+
+def write_column(doctype, field, rows):
+    """Set one column for (name, value) rows in a single statement."""
+    values = {}
+    cases = []
+    for i, (name, value) in enumerate(rows):
+        values[f'n{i}'] = name
+        values[f'v{i}'] = value
+        cases.append(f"WHEN %(n{i})s THEN %(v{i})s")
+    values['names'] = tuple(name for name, _ in rows)
+
+    frappe.db.sql(f"""
+        UPDATE `tab{doctype}`
+        SET `{field}` = CASE name {' '.join(cases)} END
+        WHERE name IN %(names)s
+    """, values)
@@ -0,0 +1,310 @@
+"""
+Chart of accounts templates shipped by apps, compiled once per site.
+
+Apps register directories of ERPNext nested JSON charts through the
+`chart_of_accounts_templates` hook (this app ships `charts/`):
+
+    chart_of_accounts_templates = [
+        {"app": "my_app", "path": "charts"},
+    ]
+
+compile_chart_templates() runs after install and after every migrate. It
+validates each template, normalizes it (trimmed names, is_group as 0/1,
+properties before children) and writes it to the site's private files as
+`chart_templates/<hash>.json`, where the hash is the SHA-256 of the
+source file. A small `index.json` maps template names to country, hash
+and account count. A template whose source hash is unchanged is neither
+parsed nor rewritten; an invalid one is reported and its last good
+compilation, if any, stays in use.
+
+Listing charts reads only the index (kept per process until its mtime
+changes); applying one loads that template's compiled file, once per
+process, keyed by hash. See dm_erpnext_utilities/overrides.py for how
+ERPNext's chart listing and company creation are pointed at them.
+"""
+import copy
+import glob
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import frappe
+
+from dm_erpnext_utilities.commands.chart_reader import TREE_NODE_PROPERTIES, parse_flag
+
+COMPILED_DIR = 'chart_templates'
+INDEX_FILE = 'index.json'
+
+# Bumped whenever the compiled layout changes; part of every hash
+COMPILED_FORMAT = 1
+
+ROOT_TYPES = ('Asset', 'Liability', 'Equity', 'Income', 'Expense')
+
+# Decoded trees kept per process, most recently used last
+TREE_CACHE_SIZE = 8
+_trees = OrderedDict()
+_index = {'mtime': None, 'templates': {}}
+
+
+def get_template_sources():
+    """Return (label, directory) of the template directories registered by installed apps."""
+    sources = {}
+    for entry in frappe.get_hooks('chart_of_accounts_templates') or []:
+        path = frappe.get_app_path(entry['app'], *entry['path'].split('/'))
+        if os.path.isdir(path):
+            sources.setdefault(f"{entry['app']}/{entry['path']}", path)
+    return list(sources.items())
+
+
+def compile_chart_templates(force=False):
+    """
+    Compile changed templates of every registered directory into the site.
+
+    Args:
+        force: Recompile every template, even when its hash is unchanged
+
+    Returns:
+        Dict with lists of template names under 'added', 'updated',
+        'unchanged', 'removed', and (name or file, message) pairs under
+        'errors'
+    """
+    directory = frappe.get_site_path('private', COMPILED_DIR)
+    os.makedirs(directory, exist_ok=True)
+    previous = {} if force else {entry['source']: entry for entry in _read_index(directory).values()}
+
+    result = {'added': [], 'updated': [], 'unchanged': [], 'removed': [], 'errors': []}
+    templates = {}
+    for label, source_dir in get_template_sources():
+        for path in sorted(glob.glob(os.path.join(source_dir, '*.json'))):
+            source = f"{label}/{os.path.basename(path)}"
+            with open(path, 'rb') as f:
+                raw = f.read()
+            digest = hashlib.sha256(f"{COMPILED_FORMAT}:".encode() + raw).hexdigest()
+
+            entry = previous.get(source)
+            if entry and entry['hash'] == digest and os.path.exists(os.path.join(directory, f"{digest}.json")):
+                status = 'unchanged'
+            else:
+                try:
+                    entry, tree = compile_template(raw)
+                except ValueError as e:
+                    result['errors'].append((source, str(e)))
+                    # Keep serving the last good compilation
+                    entry = previous.get(source)
+                    if entry:
+                        templates[entry['name']] = entry
+                    continue
+                entry.update(source=source, hash=digest)
+                _write_json(os.path.join(directory, f"{digest}.json"), tree)
+                status = 'updated' if source in previous else 'added'
+
+            if entry['name'] in templates:
+                result['errors'].append((source, f"Template name '{entry['name']}' is already used by "
+                                                 f"{templates[entry['name']]['source']}"))
+                continue
+            templates[entry['name']] = entry
+            result[status].append(entry['name'])
+
+    kept = {entry['source'] for entry in templates.values()}
+    result['removed'] = [entry['name'] for source, entry in previous.items() if source not in kept]
+
+    if result['added'] or result['updated'] or result['removed'] or force or not previous:
+        _write_json(os.path.join(directory, INDEX_FILE), templates)
+    # Compiled files nobody points at any more (old versions, removed templates)
+    hashes = {entry['hash'] for entry in templates.values()}
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        name = os.path.basename(path)
+        if name != INDEX_FILE and name[:-len('.json')] not in hashes:
+            os.remove(path)
+    return result
+
+
+def install_chart_templates():
+    """after_install / after_migrate hook: compile and print what changed."""
+    result = compile_chart_templates()
+    print_compile_summary(result)
+
+
+def compile_template(raw):
+    """
+    Validate and normalize one template.
+
+    Args:
+        raw: Contents of the JSON file
+
+    Returns:
+        (index entry, normalized tree)
+
+    Raises:
+        ValueError: Listing every problem found in the template
+    """
+    try:
+        chart = json.loads(raw)
+    except ValueError as e:
+        raise ValueError(f"invalid JSON: {e}")
+    if not isinstance(chart, dict) or not isinstance(chart.get('tree'), dict):
+        raise ValueError('expected an ERPNext nested chart ({"name", "country_code", "tree"})')
+    name = str(chart.get('name') or '').strip()
+    country_code = str(chart.get('country_code') or '').strip().lower()
+
+    errors = []
+    if not name:
+        errors.append("missing 'name'")
+    if not country_code:
+        errors.append("missing 'country_code'")
+    tree, accounts = normalize_tree(chart['tree'], errors)
+    if not accounts:
+        errors.append("the tree has no accounts")
+    if errors:
+        raise ValueError('; '.join(errors))
+
+    entry = {
+        'name': name,
+        'country_code': country_code,
+        'disabled': str(chart.get('disabled') or 'No'),
+        'accounts': accounts,
+    }
+    return entry, tree
+
+
+def normalize_tree(tree, errors):
+    """
+    Return (normalized copy of tree, number of accounts), appending problems to errors.
+
+    Checks that every root has a valid root_type, that children do not
+    contradict their parent's root_type, and that account names and
+    numbers are unique.
+    """
+    normalized = {}
+    names = set()
+    numbers = {}
+    accounts = 0
+    # (parent's normalized children, account name, node, inherited root_type)
+    stack = [(normalized, name, node, None) for name, node in reversed(list(tree.items()))]
+    while stack:
+        siblings, account_name, node, parent_root_type = stack.pop()
+        if not isinstance(node, dict):
+            errors.append(f"'{account_name}': expected an object")
+            continue
+        account_name = account_name.strip()
+        if not account_name:
+            errors.append("account with an empty name")
+            continue
+        if account_name in names:
+            errors.append(f"'{account_name}': duplicate account name")
+        names.add(account_name)
+        accounts += 1
+
+        properties = {}
+        for key in TREE_NODE_PROPERTIES:
+            value = node.get(key)
+            if value is None or value == '' or isinstance(value, dict):
+                continue
+            properties[key] = value.strip() if isinstance(value, str) else value
+        children = [(k, v) for k, v in node.items() if k not in TREE_NODE_PROPERTIES]
+
+        root_type = properties.get('root_type')
+        if parent_root_type is None and root_type not in ROOT_TYPES:
+            errors.append(f"'{account_name}': root account needs a root_type in {', '.join(ROOT_TYPES)}")
+        elif parent_root_type and root_type and root_type != parent_root_type:
+            errors.append(f"'{account_name}': root_type {root_type} differs from its parent's {parent_root_type}")
+
+        if 'is_group' in properties:
+            is_group = parse_flag(properties['is_group'])
+            if is_group is None:
+                errors.append(f"'{account_name}': is_group must be 0 or 1")
+            else:
+                properties['is_group'] = is_group
+        if 'account_number' in properties:
+            number = properties['account_number'] = str(properties['account_number'])
+            if number in numbers:
+                errors.append(f"'{account_name}': account number {number} is also used by '{numbers[number]}'")
+            numbers[number] = account_name
+
+        siblings[account_name] = properties
+        for child_name, child in reversed(children):
+            stack.append((properties, child_name, child, root_type or parent_root_type))
+
+    return normalized, accounts
+
+
+def get_templates(country_code=None):
+    """
+    Return the compiled templates' index entries, without reading any tree.
+
+    Args:
+        country_code: Only templates of this country (e.g. 'br')
+
+    Returns:
+        Dict of template name -> {'name', 'country_code', 'disabled',
+        'accounts', 'source', 'hash'}
+    """
+    templates = _load_index()
+    if country_code:
+        country_code = country_code.lower()
+        return {name: entry for name, entry in templates.items() if entry['country_code'] == country_code}
+    return dict(templates)
+
+
+def get_template_tree(name):
+    """
+    Return a copy of a compiled template's tree, or None if no app ships it.
+
+    The compiled file is read once per process; callers get their own copy.
+    """
+    entry = _load_index().get(name)
+    if not entry:
+        return None
+    digest = entry['hash']
+    if digest not in _trees:
+        path = frappe.get_site_path('private', COMPILED_DIR, f"{digest}.json")
+        with open(path, 'r', encoding='utf-8') as f:
+            _trees[digest] = json.load(f)
+        while len(_trees) > TREE_CACHE_SIZE:
+            _trees.popitem(last=False)
+    _trees.move_to_end(digest)
+    return copy.deepcopy(_trees[digest])
+
+
+def print_compile_summary(result):
+    print(f"\n{'='*60}")
+    print(f"📚 Chart templates:")
+    for status, icon in (('added', '➕'), ('updated', '🔄'), ('removed', '➖'), ('unchanged', '✓')):
+        for name in result[status]:
+            print(f"   {icon} {status:<9} {name}")
+    for source, message in result['errors']:
+        print(f"   ❌ {source}: {message}")
+    print(f"{'='*60}\n")
+
+
+def _load_index():
+    """Return the site's index, re-read only when another process rewrote it."""
+    directory = frappe.get_site_path('private', COMPILED_DIR)
+    path = os.path.join(directory, INDEX_FILE)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        # Installed before templates were compiled: compile now, once
+        compile_chart_templates()
+        mtime = os.stat(path).st_mtime_ns
+    if _index['mtime'] != mtime:
+        _index['templates'] = _read_index(directory)
+        _index['mtime'] = mtime
+    return _index['templates']
+
+
+def _read_index(directory):
+    try:
+        with open(os.path.join(directory, INDEX_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_json(path, data):
+    # Readers in other processes only ever see a complete file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
@@ -0,0 +1,134 @@
+"""
+Streaming report of the ledger rows that reference an account subtree.
+
+write_impact_report goes through every (doctype, link field) pair of the
+usage registry and writes each referencing row (voucher, posting date,
+debit/credit... whichever of REPORT_COLUMNS the table has) to CSV, or to
+JSON Lines when the path ends in .jsonl/.ndjson. Rows are read through
+an unbuffered server-side cursor and written IMPACT_CHUNK_SIZE at a
+time, so memory stays flat however many GL rows an account has. On
+Frappe versions without unbuffered cursors, each account's rows are
+paged by primary key instead.
+"""
+import csv
+import json
+import os
+import time
+from itertools import islice
+
+import frappe
+
+from dm_erpnext_utilities.commands.account_usage import get_usage_checks
+
+# Rows fetched from the cursor and written per chunk
+IMPACT_CHUNK_SIZE = 10000
+
+# Maximum number of account names in a single IN (...) list
+ACCOUNT_CHUNK_SIZE = 500
+
+# Written when the table has them; every table has 'name'
+REPORT_COLUMNS = ('name', 'parent', 'parenttype', 'docstatus', 'posting_date', 'voucher_type',
+                  'voucher_no', 'debit', 'credit', 'is_cancelled')
+CSV_HEADER = ('doctype', 'fieldname', 'account') + REPORT_COLUMNS
+
+
+def write_impact_report(account_names, path, chunk_size=IMPACT_CHUNK_SIZE):
+    """
+    Write every row referencing any of the accounts to path.
+
+    Args:
+        account_names: Accounts of the subtree
+        path: Output file; .jsonl or .ndjson for JSON Lines, else CSV
+        chunk_size: Rows fetched and written at a time
+
+    Returns:
+        List of (doctype, fieldname, rows, seconds), one per registry pair
+    """
+    names = list(dict.fromkeys(account_names))
+    jsonl = path.endswith(('.jsonl', '.ndjson'))
+    print(f"\n📄 Writing impact report to {path}...")
+
+    stats = []
+    start = time.perf_counter()
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = None if jsonl else csv.writer(f)
+        if writer:
+            writer.writerow(CSV_HEADER)
+
+        for doctype, fieldname in get_usage_checks():
+            table_start = time.perf_counter()
+            table_columns = set(frappe.db.get_table_columns(doctype))
+            if writer:
+                # Missing columns come back as NULL, so rows are written as fetched
+                columns = list(REPORT_COLUMNS)
+                select = [f"`{c}`" if c in table_columns else 'NULL' for c in columns]
+            else:
+                columns = [c for c in REPORT_COLUMNS if c in table_columns]
+                select = [f"`{c}`" for c in columns]
+            keys = ('doctype', 'fieldname', 'account', *columns)
+
+            count = 0
+            for chunk in stream_references(doctype, fieldname, names, select, chunk_size):
+                if writer:
+                    writer.writerows(chunk)
+                else:
+                    f.writelines(json.dumps(dict(zip(keys, row)), default=str) + '\n' for row in chunk)
+                count += len(chunk)
+            stats.append((doctype, fieldname, count, time.perf_counter() - table_start))
+
+    print_impact_summary(path, stats, time.perf_counter() - start)
+    return stats
+
+
+def stream_references(doctype, fieldname, names, select, chunk_size=IMPACT_CHUNK_SIZE):
+    """
+    Yield lists of at most chunk_size rows referencing names.
+
+    Rows are (doctype, fieldname, account, *select); select is a list of
+    SQL expressions starting with `name`. The caller must not query the
+    database while iterating: the unbuffered cursor holds the connection.
+    """
+    select = ', '.join([f"%(doctype)s, %(fieldname)s, `{fieldname}`"] + list(select))
+    for i in range(0, len(names), ACCOUNT_CHUNK_SIZE):
+        accounts = tuple(names[i:i + ACCOUNT_CHUNK_SIZE])
+
+        if hasattr(frappe.db, 'unbuffered_cursor'):
+            with frappe.db.unbuffered_cursor():
+                rows = frappe.db.sql(f"""
+                    SELECT {select} FROM `tab{doctype}`
+                    WHERE `{fieldname}` IN %(accounts)s
+                """, {'doctype': doctype, 'fieldname': fieldname, 'accounts': accounts}, as_iterator=True)
+                while True:
+                    chunk = list(islice(rows, chunk_size))
+                    if not chunk:
+                        break
+                    yield chunk
+            continue
+
+        # Frappe < 15: page through each account's rows by primary key,
+        # which the link-field index already holds in order
+        for account in accounts:
+            after = ''
+            while True:
+                chunk = frappe.db.sql(f"""
+                    SELECT {select} FROM `tab{doctype}`
+                    WHERE `{fieldname}` = %(account)s AND name > %(after)s
+                    ORDER BY name LIMIT {int(chunk_size)}
+                """, {'doctype': doctype, 'fieldname': fieldname, 'account': account, 'after': after})
+                if not chunk:
+                    break
+                yield chunk
+                after = chunk[-1][3]
+
+
+def print_impact_summary(path, stats, elapsed):
+    total = sum(rows for _, _, rows, _ in stats)
+    size = os.path.getsize(path)
+    print(f"\n{'='*60}")
+    print(f"📊 Impact report: {path} ({size / 1e6:.1f} MB)")
+    for doctype, fieldname, rows, seconds in stats:
+        if rows:
+            print(f"   {doctype + '.' + fieldname:<36} {rows:>10,} rows {seconds:>7.2f}s "
+                  f"{rows / max(seconds, 1e-6):>10,.0f} rows/s")
+    print(f"   {'total':<36} {total:>10,} rows {elapsed:>7.2f}s {total / max(elapsed, 1e-6):>10,.0f} rows/s")
+    print(f"{'='*60}\n")
@@ -0,0 +1,132 @@
+"""
+Checkpoint journal for resumable chart imports.
+
+The journal records which rows of which files were applied. Files are
+identified by the SHA-256 of their content, rows by their line number,
+and applied lines are stored as compact [start, end] ranges.
+
+It is kept as a JSON file under the site's private/chart_journals folder
+(shared with the queue workers through the sites volume) and rewritten
+when each batch of accounts commits, so after a crash it describes what
+was committed, at most one batch behind; rows of that batch already exist
+and are skipped by the importer's existence check. With --resume the
+journaled rows are skipped before any naming or existence check, but the
+files are still read and parsed from the start.
+"""
+import hashlib
+import json
+import os
+
+import frappe
+
+JOURNAL_DIR = 'chart_journals'
+
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 16), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def open_journal(company, paths, resume=False):
+    """
+    Return the journal for this company and set of files.
+
+    Without resume, any journal left by an earlier run of the same files
+    is discarded and a fresh one is started.
+    """
+    digests = {path: file_digest(path) for path in paths}
+    seed = '\n'.join([company] + sorted(digests.values()))
+    key = hashlib.sha1(seed.encode()).hexdigest()[:16]
+
+    journal = {'key': key, 'company': company, 'digests': digests, 'applied': {}}
+    stored = _read_journal(key) if resume else None
+    if stored:
+        for digest, ranges in stored['applied'].items():
+            journal['applied'][digest] = {
+                line for start, end in ranges for line in range(start, end + 1)
+            }
+    return journal
+
+
+def is_applied(journal, row):
+    """True if the row was committed by an earlier run."""
+    digest = journal['digests'].get(row['file'])
+    return row['line'] in journal['applied'].get(digest, ())
+
+
+def mark_applied(journal, row):
+    """Record a row as applied (persisted by the next save_journal)."""
+    digest = journal['digests'][row['file']]
+    journal['applied'].setdefault(digest, set()).add(row['line'])
+
+
+def unmark_applied(journal, row):
+    """Drop a row marked in a batch that was rolled back."""
+    digest = journal['digests'][row['file']]
+    journal['applied'].get(digest, set()).discard(row['line'])
+
+
+def applied_count(journal):
+    return sum(len(lines) for lines in journal['applied'].values())
+
+
+def save_journal(journal):
+    """
+    Write the journal once the current transaction commits.
+
+    Nothing is written if it rolls back, so the file never records rows
+    that were not committed.
+    """
+    data = {
+        'company': journal['company'],
+        'applied': {digest: _to_ranges(lines) for digest, lines in journal['applied'].items()},
+    }
+    frappe.db.after_commit.add(lambda: _write_journal(journal['key'], data))
+
+
+def clear_journal(journal):
+    """Forget the journal once the import has completed (when the caller commits)."""
+    frappe.db.after_commit.add(lambda: _remove_journal(journal['key']))
+
+
+def journal_path(key):
+    return frappe.get_site_path('private', JOURNAL_DIR, f"{key}.json")
+
+
+def _read_journal(key):
+    try:
+        with open(journal_path(key), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_journal(key, data):
+    path = journal_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # A resume in another process only ever reads a complete file
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def _remove_journal(key):
+    try:
+        os.remove(journal_path(key))
+    except FileNotFoundError:
+        pass
+
+
+def _to_ranges(lines):
+    ranges = []
+    for line in sorted(lines):
+        if ranges and line == ranges[-1][1] + 1:
+            ranges[-1][1] = line
+        else:
+            ranges.append([line, line])
+    return ranges
@@ -0,0 +1,108 @@
+"""
+Set-based nested-set maintenance for tree doctypes.
+
+frappe.utils.nestedset.rebuild_tree walks the tree with two queries per
+node. rebuild_nested_set loads every (name, parent) pair in one query,
+numbers the tree in memory and writes back only the rows whose lft/rgt
+changed, in batched UPDATE statements.
+"""
+import frappe
+
+from dm_erpnext_utilities.commands.chart_lock import nested_set_lock
+
+# Rows per batched UPDATE statement
+UPDATE_CHUNK_SIZE = 500
+
+
+def rebuild_nested_set(doctype='Account', parent_field='parent_account'):
+    """
+    Recompute lft/rgt for the whole doctype.
+
+    Siblings keep their current relative order (by lft, then name), so a
+    tree that is already consistent produces no writes. Runs under the
+    doctype's nested set lock, held until the caller commits or rolls
+    back. Does not commit.
+
+    Returns:
+        Number of rows whose bounds were updated
+    """
+    with nested_set_lock('rebuild', doctype):
+        # A locking read sees every committed row: this transaction's
+        # snapshot may predate a writer (e.g. another company's pool
+        # worker) that committed while we waited for the lock
+        nodes = frappe.db.sql(f"""
+            SELECT name, `{parent_field}`, lft, rgt
+            FROM `tab{doctype}`
+            FOR UPDATE
+        """)
+
+        names = {name for name, _, _, _ in nodes}
+        children = {}
+        for name, parent, lft, rgt in nodes:
+            # Dangling parents are treated as roots, like a fresh rebuild would
+            key = parent if parent in names else None
+            children.setdefault(key, []).append((not lft, lft or 0, name))
+        for siblings in children.values():
+            siblings.sort()
+
+        bounds = number_tree(children)
+        changed = [
+            (name, bounds[name][0], bounds[name][1]) for name, _, lft, rgt in nodes
+            if name in bounds and (lft, rgt) != bounds[name]
+        ]
+
+        for i in range(0, len(changed), UPDATE_CHUNK_SIZE):
+            write_bounds(doctype, changed[i:i + UPDATE_CHUNK_SIZE])
+
+        if doctype == 'Account':
+            # Rows were written without documents, so no doc_events fired
+            from dm_erpnext_utilities.commands.tree_cache import invalidate_company_trees
+
+            invalidate_company_trees()
+
+        return len(changed)
+
+
+def number_tree(children):
+    """
+    Assign nested-set bounds iteratively from a parent -> children index.
+
+    children maps a parent name (None for roots) to sorted sibling tuples
+    whose last item is the node name. Nodes in a parent cycle are never
+    reached from a root and get no bounds.
+    """
+    bounds = {}
+    counter = 1
+    stack = [(name, False) for *_, name in reversed(children.get(None, []))]
+    while stack:
+        name, done = stack.pop()
+        if done:
+            bounds[name] = (bounds[name], counter)
+            counter += 1
+            continue
+        bounds[name] = counter
+        counter += 1
+        stack.append((name, True))
+        stack.extend((child, False) for *_, child in reversed(children.get(name, [])))
+    return bounds
+
+
+def write_bounds(doctype, rows):
+    """Update lft/rgt for (name, lft, rgt) rows in a single statement."""
+    values = {}
+    lft_cases = []
+    rgt_cases = []
+    for i, (name, lft, rgt) in enumerate(rows):
+        values[f'n{i}'] = name
+        values[f'l{i}'] = lft
+        values[f'r{i}'] = rgt
+        lft_cases.append(f"WHEN %(n{i})s THEN %(l{i})s")
+        rgt_cases.append(f"WHEN %(n{i})s THEN %(r{i})s")
+    values['names'] = tuple(name for name, _, _ in rows)
+
+    frappe.db.sql(f"""
+        UPDATE `tab{doctype}`
+        SET lft = CASE name {' '.join(lft_cases)} END,
+            rgt = CASE name {' '.join(rgt_cases)} END
+        WHERE name IN %(names)s
+    """, values)
@@ -0,0 +1,202 @@
+"""
+Run a chart operation on several companies with a process pool.
+
+Each worker process initializes Frappe once and keeps its own database
+connection for every company it handles. A failing company is rolled
+back and reported without stopping the others, and the per-company
+results are merged into one summary.
+
+Workers share the site's lft/rgt numbering. Their structural writes
+(inserts, deletes, nested-set rebuilds) queue on the nested set lock,
+which each one keeps until it commits, and a rebuild reads the tree with
+a locking read; so a --bulk import in one worker never renumbers the
+tree from a snapshot that misses another worker's accounts.
+
+run_company() is also what the HTTP API uses to run one operation inside
+a web worker; its output capture is per thread, so concurrent requests
+served by the same process never read each other's output.
+"""
+import contextlib
+import io
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import frappe
+
+from dm_erpnext_utilities.commands.profiler import QueryProfiler, get_active_profiler
+
+# Guards installing and removing the per-thread sys.stdout (see capture_output)
+_stdout_lock = threading.Lock()
+# The installed wrapper and the number of captures using it
+_capturing = {'stdout': None, 'active': 0}
+
+
+def get_all_companies():
+    """Return every company name on the connected site."""
+    return frappe.get_all('Company', pluck='name', order_by='name asc')
+
+
+def run_for_companies(site, companies, method, kwargs, workers=None):
+    """
+    Call a dotted-path function once per company across a worker pool.
+
+    The function is called as method(company=company, **kwargs) and must
+    return a truthy value on success. Its printed output is captured per
+    company and replayed in order, so reports do not interleave. Under
+    --profile each worker profiles its company and the statistics are
+    merged into the command's profiler.
+
+    Args:
+        site: Site name each worker connects to
+        companies: List of company names
+        method: Dotted path, e.g. 'dm_erpnext_utilities.commands.account_importer.import_accounts_from_csv'
+        kwargs: Keyword arguments shared by every call
+        workers: Pool size (default: min(companies, CPU count))
+
+    Returns:
+        List of result dicts ({'company', 'ok', 'elapsed', 'output', 'error'})
+        in the order of companies
+    """
+    workers = workers or min(len(companies), os.cpu_count() or 1)
+    print(f"🚀 Running on {len(companies)} company(ies) with {workers} worker(s)...\n")
+
+    # spawn: workers must not inherit the parent's database connection
+    context = multiprocessing.get_context('spawn')
+    profiler = get_active_profiler()
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(site,)) as pool:
+        futures = {pool.submit(run_company, method, company, kwargs, profile=profiler is not None): company
+                   for company in companies}
+        for future in as_completed(futures):
+            company = futures[future]
+            try:
+                results[company] = future.result()
+                if profiler is not None:
+                    profiler.merge(results[company].pop('profile'))
+            except Exception as e:
+                # The worker itself died (e.g. could not connect)
+                results[company] = {'company': company, 'ok': False, 'elapsed': 0.0,
+                                    'output': '', 'error': str(e)}
+            status = "✅" if results[company]['ok'] else "❌"
+            print(f"   {status} {company} ({results[company]['elapsed']:.1f}s)")
+
+    return [results[company] for company in companies]
+
+
+def print_company_summary(results):
+    """Replay each company's output, then print the merged summary."""
+    for result in results:
+        print(f"\n{'#'*60}")
+        print(f"# {result['company']}")
+        print(f"{'#'*60}")
+        print(result['output'], end='')
+        if result['error']:
+            print(f"❌ ERROR: {result['error']}")
+
+    succeeded = [r for r in results if r['ok']]
+    print(f"\n{'='*60}")
+    print(f"📊 Multi-company Summary:")
+    for result in results:
+        status = "✅" if result['ok'] else "❌"
+        print(f"   {status} {result['company']:<30} {result['elapsed']:>8.1f}s")
+    print(f"   Succeeded: {len(succeeded)}/{len(results)}")
+    print(f"{'='*60}\n")
+
+    return len(succeeded) == len(results)
+
+
+def _init_worker(site):
+    frappe.init(site=site)
+    frappe.connect()
+
+
+def run_company(method, company, kwargs, profile=False):
+    """
+    Call method(company=company, **kwargs) and collect what it prints.
+
+    A failure is rolled back and reported in the result instead of raised.
+
+    Args:
+        profile: Also run the call under a quiet QueryProfiler and return
+            its statistics under 'profile'
+
+    Returns:
+        Dict with 'company', 'ok', 'elapsed', 'output' and 'error' (and
+        'profile' when profiled)
+    """
+    start = time.perf_counter()
+    ok = False
+    error = None
+    profiler = QueryProfiler(quiet=True) if profile else contextlib.nullcontext()
+
+    with capture_output() as output:
+        try:
+            with profiler:
+                ok = bool(frappe.get_attr(method)(company=company, **kwargs))
+        except Exception as e:
+            frappe.db.rollback()
+            error = str(e)
+            traceback.print_exc(file=output)
+
+    result = {
+        'company': company,
+        'ok': ok,
+        'elapsed': time.perf_counter() - start,
+        'output': output.getvalue(),
+        'error': error,
+    }
+    if profile:
+        result['profile'] = profiler.stats()
+    return result
+
+
+@contextlib.contextmanager
+def capture_output():
+    """
+    Collect what the current thread prints into a StringIO.
+
+    Unlike contextlib.redirect_stdout, which swaps sys.stdout for the whole
+    process, other threads keep printing to the original stream. The
+    per-thread wrapper is installed by the first capture and the original
+    sys.stdout is put back when the last one ends.
+    """
+    with _stdout_lock:
+        if not _capturing['active']:
+            _capturing['stdout'] = _ThreadStdout(sys.stdout)
+            sys.stdout = _capturing['stdout']
+        _capturing['active'] += 1
+        stdout = _capturing['stdout']
+    previous = getattr(stdout.local, 'buffer', None)
+    stdout.local.buffer = output = io.StringIO()
+    try:
+        yield output
+    finally:
+        stdout.local.buffer = previous
+        with _stdout_lock:
+            _capturing['active'] -= 1
+            if not _capturing['active']:
+                # Unless someone replaced it meanwhile; the wrapper then
+                # keeps passing through to the original stream
+                if sys.stdout is stdout:
+                    sys.stdout = stdout.stream
+                _capturing['stdout'] = None
+
+
+class _ThreadStdout(io.TextIOBase):
+    """sys.stdout replacement writing to the calling thread's capture, if any."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def write(self, text):
+        return (getattr(self.local, 'buffer', None) or self.stream).write(text)
+
+    def flush(self):
+        (getattr(self.local, 'buffer', None) or self.stream).flush()
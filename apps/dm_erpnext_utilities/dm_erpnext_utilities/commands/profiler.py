@@ -0,0 +1,194 @@
+"""
+Opt-in query profiling for the chart commands (--profile).
+
+QueryProfiler wraps frappe.db.sql for the duration of a command. Every
+statement is reduced to its shape (literals and parameters replaced by
+?, IN lists collapsed) and counted per shape with its total and p95
+latency and the rows it returned. frappe.db.exists/get_value/commit and
+document inserts all end up in frappe.db.sql, so they are included.
+
+Commands mark the end of their phases with profile_phase(); the
+profiler charges the time and statements since the previous mark to
+that phase. Without an active profiler profile_phase() returns at once
+and frappe.db.sql is left untouched, so the flag costs nothing when off.
+
+Multi-company runs profile each company in its worker process
+(parallel.run_company) and merge the statistics into the command's
+profiler, so the report covers every company.
+"""
+import cProfile
+import json
+import re
+import time
+
+import frappe
+
+SHAPE_WIDTH = 70
+
+_active = None
+
+
+def profile_phase(phase):
+    """End the current phase of the active profiler, if there is one."""
+    if _active is not None:
+        _active.mark(phase)
+
+
+def get_active_profiler():
+    """Return the QueryProfiler of the running command, or None."""
+    return _active
+
+
+def statement_shape(query):
+    """Normalise a statement so calls differing only in values group together."""
+    shape = re.sub(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\"", '?', str(query))
+    shape = re.sub(r'%\(\w+\)s|%s|\b\d+(?:\.\d+)?\b', '?', shape)
+    shape = re.sub(r'\(\s*\?(?:\s*,\s*\?)*\s*\)', '(?)', shape)
+    shape = re.sub(r'(\(\?\)\s*,\s*)+\(\?\)', '(?), ...', shape)
+    return re.sub(r'\s+', ' ', shape).strip()
+
+
+class QueryProfiler:
+    """
+    Context manager collecting statement and phase statistics.
+
+    Args:
+        output: Optional artifact path; '.prof' or '.pstats' writes a
+            cProfile dump of this process, anything else a JSON report
+        quiet: Do not print the summary on exit (worker processes, whose
+            statistics are merged by the parent; see stats() and merge())
+    """
+
+    def __init__(self, output=None, quiet=False):
+        self.output = output
+        self.quiet = quiet
+        self.shapes = {}
+        self.phases = {}
+        self.merged = 0
+        self.pending = [0, 0.0]
+        self.cprofile = None
+        self.original_sql = None
+
+    def __enter__(self):
+        global _active
+        self.original_sql = frappe.db.sql
+        frappe.db.sql = self._sql
+        _active = self
+        if self.output and self.output.endswith(('.prof', '.pstats')):
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        self.started = self.last_mark = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active
+        self.elapsed = time.perf_counter() - self.started
+        if self.cprofile:
+            self.cprofile.disable()
+        _active = None
+        frappe.db.sql = self.original_sql
+        if self.pending[0]:
+            self.mark('other')
+        if not self.quiet:
+            self.print_summary()
+        if self.output:
+            self.write(self.output)
+        return False
+
+    def _sql(self, query, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            result = self.original_sql(query, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            shape = statement_shape(query)
+            stats = self.shapes.get(shape)
+            if stats is None:
+                stats = self.shapes[shape] = {'count': 0, 'rows': 0, 'latencies': []}
+            stats['count'] += 1
+            stats['latencies'].append(elapsed)
+            self.pending[0] += 1
+            self.pending[1] += elapsed
+        if isinstance(result, (list, tuple)):
+            stats['rows'] += len(result)
+        return result
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        stats = self.phases.setdefault(phase, {'wall': 0.0, 'queries': 0, 'sql_time': 0.0})
+        stats['wall'] += now - self.last_mark
+        stats['queries'] += self.pending[0]
+        stats['sql_time'] += self.pending[1]
+        self.pending = [0, 0.0]
+        self.last_mark = now
+
+    def stats(self):
+        """Return the raw, picklable statistics, for merge() in another process."""
+        return {'shapes': self.shapes, 'phases': self.phases}
+
+    def merge(self, stats):
+        """Add the statistics of a worker's profiler; phase times add up across workers."""
+        for shape, worker in stats['shapes'].items():
+            mine = self.shapes.setdefault(shape, {'count': 0, 'rows': 0, 'latencies': []})
+            mine['count'] += worker['count']
+            mine['rows'] += worker['rows']
+            mine['latencies'].extend(worker['latencies'])
+        for phase, worker in stats['phases'].items():
+            mine = self.phases.setdefault(phase, {'wall': 0.0, 'queries': 0, 'sql_time': 0.0})
+            for key in mine:
+                mine[key] += worker[key]
+        self.merged += 1
+
+    def report(self):
+        """Return the statistics as a JSON-ready dict, slowest shapes first."""
+        shapes = []
+        for shape, stats in self.shapes.items():
+            latencies = sorted(stats['latencies'])
+            shapes.append({
+                'shape': shape,
+                'count': stats['count'],
+                'total': sum(latencies),
+                'p95': latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+                'rows': stats['rows'],
+            })
+        shapes.sort(key=lambda s: s['total'], reverse=True)
+        return {
+            'elapsed': self.elapsed,
+            'queries': sum(s['count'] for s in shapes),
+            'sql_time': sum(s['total'] for s in shapes),
+            'workers': self.merged,
+            'phases': self.phases,
+            'statements': shapes,
+        }
+
+    def print_summary(self, limit=15):
+        report = self.report()
+        print(f"\n{'='*60}")
+        workers = f" ({report['workers']} company run(s) merged)" if report['workers'] else ''
+        print(f"🔬 Profile: {report['queries']} statement(s), {report['sql_time']:.2f}s in SQL "
+              f"of {report['elapsed']:.2f}s{workers}")
+        print(f"{'='*60}")
+        if report['phases']:
+            print(f"   {'phase':<12} {'wall ms':>10} {'sql ms':>10} {'queries':>8}")
+            for phase, stats in report['phases'].items():
+                print(f"   {phase:<12} {stats['wall']*1000:>10.1f} {stats['sql_time']*1000:>10.1f} "
+                      f"{stats['queries']:>8}")
+            print()
+        print(f"   {'count':>7} {'total ms':>10} {'p95 ms':>8} {'rows':>8}  statement")
+        for stats in report['statements'][:limit]:
+            shape = stats['shape']
+            if len(shape) > SHAPE_WIDTH:
+                shape = shape[:SHAPE_WIDTH - 3] + '...'
+            print(f"   {stats['count']:>7} {stats['total']*1000:>10.1f} {stats['p95']*1000:>8.2f} "
+                  f"{stats['rows']:>8}  {shape}")
+        if len(report['statements']) > limit:
+            print(f"   ... and {len(report['statements']) - limit} more statement shape(s)")
+        print(f"{'='*60}\n")
+
+    def write(self, path):
+        if self.cprofile:
+            self.cprofile.dump_stats(path)
+        else:
+            with open(path, 'w') as f:
+                json.dump(self.report(), f, indent=2)
+        print(f"💾 Profile written to {path}")
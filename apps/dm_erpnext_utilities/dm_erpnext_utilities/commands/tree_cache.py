@@ -0,0 +1,165 @@
+"""
+Redis-backed, versioned snapshots of each company's account tree.
+
+get_company_tree(company) returns an AccountTree with names, parents,
+numbers and types, siblings in lft order. The snapshot is built from one
+query, serialized (JSON, zlib) into redis-cache and shared by every
+process of the site; a small LRU of decoded trees sits in front of it.
+
+Each snapshot is tagged with a version token made of two keys: one per
+company and one generation for the whole chart. A lookup reads both in
+one MGET and reuses the LRU entry (or the stored snapshot) only when the
+tag matches, so a warm lookup costs one round trip and no SQL.
+
+Invalidation deletes the keys:
+
+- Account doc_events (see hooks.py) drop the account's company. An
+  insert shifts the lft/rgt of other companies too, but never their
+  structure or sibling order, which is all a snapshot holds.
+- Set-based writes that bypass documents (bulk delete, nested-set
+  rebuild, chart sync) call invalidate_company_trees themselves, and
+  drop the generation when they may touch every company.
+
+Keys are dropped right away, so the writing transaction reads its own
+changes, and again when the transaction commits or rolls back, so no
+snapshot read in between outlives it. The companies to drop then are
+collected on frappe.local, with one callback per transaction however
+many rows it writes.
+"""
+import json
+import uuid
+import zlib
+from collections import OrderedDict
+
+import frappe
+
+from dm_erpnext_utilities.commands.account_tree import AccountTree
+
+SNAPSHOT_KEY = 'dm_erpnext_utilities:account_tree:{}'
+VERSION_KEY = 'dm_erpnext_utilities:account_tree_version:{}'
+GENERATION_KEY = 'dm_erpnext_utilities:account_tree_generation'
+
+# Bumped whenever the serialized layout changes
+SNAPSHOT_FORMAT = 2
+# No lft/rgt: inserts in other companies would make them stale
+SNAPSHOT_FIELDS = ('account_name', 'account_number', 'account_type', 'root_type', 'is_group')
+# Safety net for keys missed by every invalidation path
+SNAPSHOT_TTL = 24 * 3600
+
+# Decoded trees kept per process, most recently used last
+LRU_SIZE = 16
+_trees = OrderedDict()
+
+
+def get_company_tree(company):
+    """
+    Return the company's account tree, from this process, Redis or the database.
+
+    The tree carries every column in SNAPSHOT_FIELDS and must be treated
+    as read-only, since it is shared between callers.
+    """
+    cache = frappe.cache()
+    version = _current_version(cache, company)
+
+    cached = _trees.get(company)
+    if cached and cached[0] == version:
+        _trees.move_to_end(company)
+        return cached[1]
+
+    tree = _load_snapshot(cache, company, version)
+    if tree is None:
+        # The version was read before the query: if the chart changes
+        # meanwhile, this snapshot is stored under a tag nobody asks for
+        tree = AccountTree.from_company(company, fields=SNAPSHOT_FIELDS)
+        _store_snapshot(cache, company, version, tree)
+
+    _trees[company] = (version, tree)
+    _trees.move_to_end(company)
+    while len(_trees) > LRU_SIZE:
+        _trees.popitem(last=False)
+    return tree
+
+
+def invalidate_company_trees(company=None):
+    """
+    Drop the cached tree of one company, or of every company when None.
+
+    Runs now and again when the current transaction ends: after a commit
+    other processes may have cached the old rows meanwhile, after a
+    rollback this process may have cached rows that never existed.
+    """
+    _drop_versions(company)
+    # Frappe < 14 has no transaction callbacks; the immediate drop is all we get
+    if getattr(frappe.db, 'after_commit', None) is None:
+        return
+    pending = getattr(frappe.local, 'account_tree_invalidations', None)
+    if pending is None:
+        # First write of this transaction: exactly one of the two runs
+        pending = frappe.local.account_tree_invalidations = set()
+        frappe.db.after_commit.add(_drop_pending)
+        frappe.db.after_rollback.add(_drop_pending)
+    pending.add(company)
+
+
+def on_account_change(doc, method=None, *args):
+    """doc_events handler for Account (after_insert, on_update, on_trash, after_rename)."""
+    # Moves, merges and renames stay within the account's company
+    invalidate_company_trees(doc.company)
+
+
+def _current_version(cache, company):
+    """Return the snapshot tag '<generation>:<company version>', creating missing parts."""
+    keys = [cache.make_key(GENERATION_KEY), cache.make_key(VERSION_KEY.format(company))]
+    values = [_text(value) for value in cache.mget(keys)]
+    for i, key in enumerate(keys):
+        if not values[i]:
+            # Another process may create it at the same time; keep the winner
+            cache.set(key, uuid.uuid4().hex, nx=True)
+            values[i] = _text(cache.get(key))
+    return ':'.join(values)
+
+
+def _drop_pending():
+    pending = getattr(frappe.local, 'account_tree_invalidations', None) or set()
+    frappe.local.account_tree_invalidations = None
+    if None in pending:
+        _drop_versions()
+        return
+    for company in pending:
+        _drop_versions(company)
+
+
+def _drop_versions(company=None):
+    cache = frappe.cache()
+    if company is None:
+        cache.delete(cache.make_key(GENERATION_KEY))
+        _trees.clear()
+    else:
+        cache.delete(cache.make_key(VERSION_KEY.format(company)), cache.make_key(SNAPSHOT_KEY.format(company)))
+        _trees.pop(company, None)
+
+
+def _load_snapshot(cache, company, version):
+    blob = cache.get(cache.make_key(SNAPSHOT_KEY.format(company)))
+    if not blob:
+        return None
+    snapshot = json.loads(zlib.decompress(blob))
+    if snapshot.get('format') != SNAPSHOT_FORMAT or snapshot.get('version') != version:
+        return None
+    return AccountTree(snapshot['names'], snapshot['parents'], snapshot['columns'])
+
+
+def _store_snapshot(cache, company, version, tree):
+    snapshot = {
+        'format': SNAPSHOT_FORMAT,
+        'version': version,
+        'names': tree.names,
+        'parents': [tree.parent(name) for name in tree.names],
+        'columns': tree.columns,
+    }
+    blob = zlib.compress(json.dumps(snapshot, separators=(',', ':'), default=str).encode())
+    cache.set(cache.make_key(SNAPSHOT_KEY.format(company)), blob, ex=SNAPSHOT_TTL)
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
@@ -0,0 +1,445 @@
+"""
+Bulk import and recursive delete for any nested-set tree doctype.
+
+The Account engine generalized to Cost Center, Item Group and Territory
+(see TREE_DOCTYPES): the subtree is fetched with one query on lft/rgt,
+usage is checked in batched UNION ALL queries over every Link field to
+the doctype (GL Entry.cost_center, Budget, Item.item_group, ...), and
+bulk imports write multi-row INSERTs followed by a single nested-set
+rebuild. Planning (record lookup, parent resolution, cycle and group
+checks) and the document-by-document delete are the Account engine's
+own functions, parametrized by doctype. Account itself is routed to
+account_manager/account_importer, which know about account numbers,
+root and report types.
+
+Tree files are CSV with one row per record (see TREE_HEADER_ALIASES):
+
+    Cost Center Name,Parent Cost Center,Cost Center Number,Is Group
+    Casa Geral,,100,1
+    Cozinha,Casa Geral,110,0
+"""
+import csv
+import time
+
+import frappe
+
+from dm_erpnext_utilities.commands.account_importer import (
+    add_to_account_index,
+    build_account_index,
+    find_existing_account,
+    import_accounts_from_csv,
+    order_parents_first,
+    print_import_summary,
+    resolve_account,
+)
+from dm_erpnext_utilities.commands.account_manager import (
+    _record_phase,
+    bulk_delete_subtree,
+    check_accounts_have_transactions,
+    delete_company_account,
+    delete_docs,
+    print_phase_timings,
+)
+from dm_erpnext_utilities.commands.account_tree import AccountTree
+from dm_erpnext_utilities.commands.chart_lock import company_locked, nested_set_lock
+from dm_erpnext_utilities.commands.chart_reader import map_headers, parse_flag
+from dm_erpnext_utilities.commands.nestedset import rebuild_nested_set
+from dm_erpnext_utilities.commands.profiler import profile_phase
+
+# Tree doctypes handled here. company: records belong to a company and
+# are named "<number> - <title> - <abbr>" like accounts; otherwise the
+# name is the title.
+TREE_DOCTYPES = {
+    'Account': {
+        'parent_field': 'parent_account',
+        'title_field': 'account_name',
+        'number_field': 'account_number',
+        'company': True,
+    },
+    'Cost Center': {
+        'parent_field': 'parent_cost_center',
+        'title_field': 'cost_center_name',
+        'number_field': 'cost_center_number',
+        'company': True,
+    },
+    'Item Group': {
+        'parent_field': 'parent_item_group',
+        'title_field': 'item_group_name',
+        'number_field': None,
+        'company': False,
+    },
+    'Territory': {
+        'parent_field': 'parent_territory',
+        'title_field': 'territory_name',
+        'number_field': None,
+        'company': False,
+    },
+}
+
+# Normalized field -> accepted CSV headers (compared case-insensitively),
+# covering the Data Import export of each doctype and Portuguese labels
+TREE_HEADER_ALIASES = {
+    'name': ('id', 'name'),
+    'title': ('cost center name', 'cost_center_name', 'nome do centro de custo', 'centro de custo',
+              'item group name', 'item_group_name', 'nome do grupo de itens', 'grupo de itens',
+              'territory name', 'territory_name', 'nome do território', 'território', 'title', 'nome'),
+    'parent': ('parent cost center', 'parent_cost_center', 'centro de custo pai',
+               'parent item group', 'parent_item_group', 'grupo de itens pai',
+               'parent territory', 'parent_territory', 'território pai', 'parent', 'pai'),
+    'number': ('cost center number', 'cost_center_number', 'número do centro de custo',
+               'number', 'número', 'numero'),
+    'is_group': ('is group', 'is_group', 'é grupo', 'e grupo'),
+}
+
+# Rows per multi-row INSERT, and per commit when inserting document by document
+BULK_INSERT_CHUNK_SIZE = 500
+IMPORT_BATCH_SIZE = 100
+
+
+def get_tree_meta(doctype):
+    """Return the TREE_DOCTYPES entry of doctype or raise ValueError."""
+    if doctype not in TREE_DOCTYPES:
+        raise ValueError(f"Unsupported tree doctype: {doctype} (expected one of {', '.join(TREE_DOCTYPES)})")
+    return TREE_DOCTYPES[doctype]
+
+
+def tree_autoname(doctype, title, number=None, company=None):
+    """Name a record the way the doctype's autoname does."""
+    if not get_tree_meta(doctype)['company']:
+        return title.strip()
+    parts = [title.strip(), frappe.get_cached_value('Company', company, 'abbr')]
+    if number:
+        parts.insert(0, str(number).strip())
+    return ' - '.join(parts)
+
+
+def resolve_tree_name(doctype, name, company=None):
+    """Return the record named as given or with the company abbreviation suffix."""
+    meta = get_tree_meta(doctype)
+    candidates = [name]
+    if meta['company'] and company:
+        candidates.append(f"{name} - {frappe.get_cached_value('Company', company, 'abbr')}")
+    for candidate in candidates:
+        filters = {'name': candidate}
+        if meta['company'] and company:
+            filters['company'] = company
+        if frappe.db.get_value(doctype, filters):
+            return candidate
+    return None
+
+
+def find_tree_children(doctype, name):
+    """
+    Return the descendants of a record, every one before its parent.
+
+    One query on the nested-set bounds; when they are not usable, the
+    doctype's (name, parent) pairs are loaded and walked in memory.
+    Rows have 'name', 'title' and 'is_group'.
+    """
+    meta = get_tree_meta(doctype)
+    fields = ['name', f"`{meta['title_field']}` as title", 'is_group']
+    bounds = frappe.db.get_value(doctype, name, ['lft', 'rgt'], as_dict=True)
+    if not bounds:
+        return []
+
+    if bounds.lft and bounds.rgt and bounds.rgt > bounds.lft:
+        if bounds.rgt - bounds.lft == 1:
+            return []
+        return frappe.get_all(doctype,
+            filters={'lft': ['>', bounds.lft], 'rgt': ['<', bounds.rgt]},
+            fields=fields,
+            order_by='rgt asc'
+        )
+
+    rows = frappe.get_all(doctype, fields=fields + [meta['parent_field']], order_by='lft asc')
+    tree = AccountTree.from_rows(rows, parent_field=meta['parent_field'], fields=('title', 'is_group'))
+    return tree.leaves_first(name) if name in tree else []
+
+
+@company_locked('delete')
+def delete_tree_node(doctype, name, company=None, dry_run=False, bulk=False):
+    """
+    Delete a tree record and all its descendants.
+
+    Nothing is deleted if any record of the subtree is referenced (see
+    account_usage). With bulk=True the whole lft..rgt range goes in one
+    DELETE; otherwise records are deleted one by one, leaves first.
+    """
+    if doctype == 'Account':
+        return delete_company_account(name, company, dry_run=dry_run, bulk=bulk)
+
+    timings = {}
+    phase_start = time.perf_counter()
+
+    print(f"\n{'='*60}")
+    print(f"Deleting {doctype}: {name}")
+    if company:
+        print(f"Company: {company}")
+    print(f"Mode: {'DRY RUN (simulation)' if dry_run else 'REAL DELETE'}{' (bulk)' if bulk else ''}")
+    print(f"{'='*60}\n")
+
+    record = resolve_tree_name(doctype, name, company)
+    if not record:
+        print(f"❌ ERROR: {doctype} '{name}' does not exist!")
+        return False
+
+    children = find_tree_children(doctype, record)
+    names = [child.name for child in children] + [record]
+    phase_start = _record_phase(timings, 'resolve', phase_start)
+
+    print(f"🔍 Checking references to {len(names)} record(s)...")
+    usage = check_accounts_have_transactions(names, doctype=doctype)
+    phase_start = _record_phase(timings, 'check', phase_start)
+    used = [(n, u) for n, u in usage.items() if u['total']]
+    for used_name, entry in used[:20]:
+        breakdown = ', '.join(f"{d}: {c}" for d, c in sorted(entry['by_doctype'].items()))
+        print(f"   ⚠️  {used_name} ({entry['total']} references - {breakdown})")
+    if used:
+        print(f"\n⚠️  WARNING: {len(used)} record(s) are referenced!")
+        if not dry_run:
+            print("\n⚠️  Referenced records cannot be deleted. Use --dry-run first to review.")
+            return False
+
+    print(f"\n📝 Total records to delete: {len(names)}")
+    if dry_run:
+        print(f"\n{'='*60}")
+        print(f"🔍 DRY RUN - No records were deleted")
+        print(f"{'='*60}\n")
+        print_phase_timings(timings)
+        return True
+
+    if bulk:
+        return bulk_delete_subtree(frappe._dict(name=record), len(names), timings, phase_start, doctype=doctype)
+
+    return delete_docs(names, timings, phase_start, doctype=doctype) == len(names)
+
+
+def read_tree_file(path):
+    """Yield {'file', 'line', 'name', 'title', 'parent', 'number', 'is_group'} per CSV row."""
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = map_headers(header, TREE_HEADER_ALIASES)
+
+        for row in reader:
+            if not any(cell.strip() for cell in row):
+                continue
+            record = {'file': path, 'line': reader.line_num}
+            for field in TREE_HEADER_ALIASES:
+                i = columns.get(field)
+                record[field] = row[i].strip() if i is not None and i < len(row) else ''
+            record['is_group'] = parse_flag(record['is_group'])
+            yield record
+
+
+@company_locked('import')
+def import_tree_from_csv(doctype, csv_files, company=None, bulk=False):
+    """
+    Import tree records from one or more CSV files, in any row order.
+
+    Parents may be given by name, by name without the company
+    abbreviation or by title; an empty parent means the doctype's root
+    (e.g. the company's root cost center, 'All Item Groups'). Records
+    that already exist are skipped. The whole file is validated (unknown
+    parents, cycles, duplicates) before anything is written.
+
+    Args:
+        doctype: 'Cost Center', 'Item Group', 'Territory' (or 'Account')
+        csv_files: List of CSV paths
+        company: Company, for company-scoped doctypes
+        bulk: Insert with multi-row INSERTs, one nested-set rebuild and
+            one commit instead of one document at a time
+
+    Returns:
+        True if success, False if failure
+    """
+    if doctype == 'Account':
+        return import_accounts_from_csv(csv_files, company, skip_root=True, bulk=bulk)
+
+    meta = get_tree_meta(doctype)
+    print(f"\n{'='*60}")
+    print(f"Importing {doctype} tree")
+    print(f"{'='*60}\n")
+
+    if meta['company'] and not frappe.db.exists('Company', company or ''):
+        print(f"❌ ERROR: {doctype} needs an existing company (got '{company}')")
+        return False
+
+    start = time.perf_counter()
+    plan = plan_tree_import(doctype, csv_files, company)
+    profile_phase('plan')
+    if plan['errors']:
+        print(f"\n❌ Validation failed, nothing was imported:")
+        for error in plan['errors']:
+            print(f"   ❌ {error}")
+        print_import_summary(0, plan['skipped'], len(plan['errors']), time.perf_counter() - start)
+        return False
+
+    rows = plan['rows']
+    print(f"🌳 {len(rows)} record(s) to create\n")
+    if bulk:
+        imported, errors = bulk_insert_tree_rows(doctype, rows, company)
+    else:
+        imported, errors = insert_tree_docs(doctype, rows, company)
+    profile_phase('insert')
+
+    print_import_summary(imported, plan['skipped'], errors, time.perf_counter() - start)
+    return errors == 0
+
+
+def plan_tree_import(doctype, csv_files, company=None):
+    """
+    Validate tree files against the existing records.
+
+    Same planning as the Account importer: records are looked up and
+    parents resolved through build_account_index (by name, name without
+    the company abbreviation, number or unambiguous title), and the
+    graph is checked and ordered by order_parents_first.
+
+    Returns:
+        Dict with 'rows' (parents before children, each with 'name',
+        'title', 'number', 'parent_name', 'is_group'), 'skipped' and
+        'errors'
+    """
+    meta = get_tree_meta(doctype)
+    index = build_account_index(company if meta['company'] else None, doctype)
+    existing = index['accounts']
+    roots = [name for name, row in existing.items() if not row.parent_account]
+
+    pending = {}
+    skipped = 0
+    errors = []
+    for path in csv_files:
+        print(f"📄 Reading file: {path}")
+        for record in read_tree_file(path):
+            where = f"{record['file']}:{record['line']}"
+            title = record['title'] or record['name']
+            if not title:
+                errors.append(f"{where}: missing name")
+                continue
+            if meta['company'] and not record['title']:
+                # Only an ID column: strip the abbreviation to get the title
+                title = title.rsplit(' - ', 1)[0]
+            name = record['name'] or tree_autoname(doctype, title, record['number'], company)
+            match = find_existing_account(index, name, title, record['number'] or None)
+            if match in existing:
+                skipped += 1
+                continue
+            if match in pending:
+                errors.append(f"{where}: duplicate {name} (first at line {pending[match]['line']})")
+                continue
+            pending[name] = dict(record, name=name, title=title, where=where)
+            add_to_account_index(index, name, title, record['number'] or None)
+
+    orphans = set()
+    for name, row in pending.items():
+        # An empty parent means the doctype's single root
+        parent = resolve_account(index, row['parent']) if row['parent'] else (roots[0] if len(roots) == 1 else None)
+        if parent is None:
+            errors.append(f"{row['where']}: unknown or ambiguous parent '{row['parent'] or '(root)'}' for {name}")
+            orphans.add(name)
+        elif parent in existing and not existing[parent].is_group:
+            errors.append(f"{row['where']}: parent is not a group: {parent}")
+        row['parent_name'] = parent
+
+    levels = order_parents_first(pending, errors, orphans)
+    rows = [row for level in levels for row in level]
+    return {'rows': rows, 'skipped': skipped, 'errors': errors}
+
+
+def insert_tree_docs(doctype, rows, company=None):
+    """
+    Insert rows as documents, parents first.
+
+    Works like account_importer.insert_accounts_by_level: a row whose
+    parent failed is not attempted, and a commit is made every
+    IMPORT_BATCH_SIZE rows and at the end. A failing insert is rolled
+    back to a savepoint, so the rows before it in the batch are kept.
+
+    Returns:
+        (imported, errors)
+    """
+    meta = get_tree_meta(doctype)
+    imported = errors = 0
+    failed = set()
+    uncommitted = 0
+    for row in rows:
+        if row['parent_name'] in failed:
+            print(f"   ❌ Parent failed: {row['parent_name']} (for {row['name']})")
+            failed.add(row['name'])
+            errors += 1
+            continue
+
+        values = {
+            'doctype': doctype,
+            meta['title_field']: row['title'],
+            meta['parent_field']: row['parent_name'],
+            'is_group': row['is_group'],
+        }
+        if meta['number_field'] and row['number']:
+            values[meta['number_field']] = row['number']
+        if meta['company']:
+            values['company'] = company
+        frappe.db.savepoint('tree_import_row')
+        try:
+            with nested_set_lock('import', doctype):
+                frappe.get_doc(values).insert(ignore_permissions=True)
+            imported += 1
+            print(f"   ✅ Imported: {row['name']}")
+        except Exception as e:
+            frappe.db.rollback(save_point='tree_import_row')
+            failed.add(row['name'])
+            errors += 1
+            print(f"   ❌ {row['where']}: {row['name']}: {e}")
+
+        uncommitted += 1
+        if uncommitted >= IMPORT_BATCH_SIZE:
+            frappe.db.commit()
+            uncommitted = 0
+    frappe.db.commit()
+    return imported, errors
+
+
+def bulk_insert_tree_rows(doctype, rows, company=None):
+    """
+    Insert rows with multi-row INSERTs (lft/rgt 0), rebuild lft/rgt once
+    and commit once; any failure rolls everything back.
+
+    Returns:
+        (imported, errors)
+    """
+    from frappe.utils import now as now_datetime
+
+    meta = get_tree_meta(doctype)
+    now = now_datetime()
+    user = frappe.session.user
+    fields = ['name', 'owner', 'creation', 'modified', 'modified_by', 'docstatus', 'idx',
+              meta['title_field'], meta['parent_field'], 'old_parent', 'is_group', 'lft', 'rgt']
+    if meta['number_field']:
+        fields.append(meta['number_field'])
+    if meta['company']:
+        fields.append('company')
+
+    values = []
+    for row in rows:
+        value = [row['name'], user, now, now, user, 0, 0,
+                 row['title'], row['parent_name'], row['parent_name'], row['is_group'], 0, 0]
+        if meta['number_field']:
+            value.append(row['number'] or None)
+        if meta['company']:
+            value.append(company)
+        values.append(tuple(value))
+
+    print(f"💾 Inserting {len(rows)} record(s) in batches of {BULK_INSERT_CHUNK_SIZE}...")
+    try:
+        with nested_set_lock('import', doctype):
+            frappe.db.bulk_insert(doctype, fields, values, chunk_size=BULK_INSERT_CHUNK_SIZE)
+            rebuild_nested_set(doctype, meta['parent_field'])
+        frappe.db.commit()
+    except Exception as e:
+        frappe.db.rollback()
+        print(f"   ❌ Bulk insert failed, rolled back: {e}")
+        return 0, len(rows)
+    return len(rows), 0
@@ -24,3 +24,72 @@ app_license = "MIT"
 # This allows using:
 # bench --site erpnext.example.com delete-account-recursive "ACCOUNT NAME" "COMPANY"
 # bench --site erpnext.example.com import-chart-of-accounts path/to/csv "COMPANY"
+
+# Account Usage Checks
+# --------------------
+# Extra (doctype, link field) pairs probed before deleting accounts, on top of
+# every Link field to 'Account' found in DocField/Custom Field metadata.
+# Other apps can declare the same hook to register their own ledgers.
+
+account_usage_checks = [
+    {"doctype": "Payment Ledger Entry", "fieldname": "account"},
+    {"doctype": "Stock Ledger Entry", "fieldname": "account"},
+]
+
+# Same for the other tree doctypes handled by delete-tree-recursive
+tree_usage_checks = [
+    {"tree": "Cost Center", "doctype": "Payment Ledger Entry", "fieldname": "cost_center"},
+]
+
+# Chart of Accounts Templates
+# ---------------------------
+# Directories of ERPNext nested JSON charts, compiled into each site after
+# install and migrate (commands/chart_templates.py). Other apps can declare
+# the same hook to ship their own templates.
+
+chart_of_accounts_templates = [
+    {"app": "dm_erpnext_utilities", "path": "charts"},
+]
+
+# ERPNext lists and loads templates from its own directory only; these
+# overrides and the Company validate event below add the compiled ones
+# (see overrides.py)
+override_whitelisted_methods = {
+    "erpnext.accounts.doctype.account.chart_of_accounts.chart_of_accounts.get_charts_for_country":
+        "dm_erpnext_utilities.overrides.get_charts_for_country",
+    "erpnext.accounts.doctype.account.chart_of_accounts.chart_of_accounts.build_tree_from_json":
+        "dm_erpnext_utilities.overrides.build_tree_from_json",
+    "erpnext.accounts.doctype.account.chart_of_accounts.chart_of_accounts.validate_bank_account":
+        "dm_erpnext_utilities.overrides.validate_bank_account",
+}
+
+# Document Events
+# ---------------
+# Keep the Redis account tree cache (commands/tree_cache.py) in step with
+# every change made through Account documents. Company validate runs
+# before on_update creates the default accounts, so the chart loader is
+# in place without overriding the Company class.
+
+doc_events = {
+    "Company": {
+        "validate": "dm_erpnext_utilities.overrides.on_company_validate",
+    },
+    "Account": {
+        "after_insert": "dm_erpnext_utilities.commands.tree_cache.on_account_change",
+        "on_update": "dm_erpnext_utilities.commands.tree_cache.on_account_change",
+        "on_trash": "dm_erpnext_utilities.commands.tree_cache.on_account_change",
+        "after_rename": "dm_erpnext_utilities.commands.tree_cache.on_account_change",
+    },
+}
+
+# Installation and Migration
+# --------------------------
+
+after_install = [
+    "dm_erpnext_utilities.commands.chart_templates.install_chart_templates",
+]
+
+after_migrate = [
+    "dm_erpnext_utilities.commands.account_usage.clear_usage_checks_cache",
+    "dm_erpnext_utilities.commands.chart_templates.install_chart_templates",
+]
@@ -0,0 +1,92 @@
+"""
+Point ERPNext's chart of accounts templates at the ones apps ship.
+
+ERPNext lists and loads templates by reading every JSON file of its own
+`chart_of_accounts/verified` directory. Templates registered through the
+`chart_of_accounts_templates` hook are compiled per site instead (see
+commands/chart_templates.py), and hooks.py routes ERPNext to them:
+
+- override_whitelisted_methods: the chart dropdown of the company form
+  and setup wizard, the chart preview and the bank account check.
+- doc_events Company validate: company creation, whose on_update builds
+  the default accounts through chart_of_accounts.get_chart.
+
+Loading goes through install_chart_loader(), which wraps ERPNext's
+get_chart once per process and leaves the wrapper in place. Nothing is
+swapped back and forth per request, so threads of one worker never see
+each other's state, and the Company class is left to ERPNext and to
+other apps that override it.
+
+Templates ERPNext ships itself keep working unchanged.
+"""
+import threading
+
+import frappe
+from erpnext.accounts.doctype.account.chart_of_accounts import chart_of_accounts
+
+from dm_erpnext_utilities.commands.chart_templates import get_template_tree, get_templates
+
+STANDARD_CHARTS = ('Standard', 'Standard with Numbers')
+
+_loader_lock = threading.Lock()
+
+
+@frappe.whitelist()
+def get_charts_for_country(country, with_standard=False):
+    """ERPNext's chart names for a country, plus the app templates of that country."""
+    charts = [chart for chart in chart_of_accounts.get_charts_for_country(country, with_standard=True)
+              if chart not in STANDARD_CHARTS]
+
+    country_code = frappe.get_cached_value('Country', country, 'code')
+    if country_code:
+        for name, template in get_templates(country_code).items():
+            # Same rule as ERPNext for its own files
+            if (template['disabled'] == 'No' or frappe.local.flags.allow_unverified_charts) and name not in charts:
+                charts.append(name)
+
+    if len(charts) != 1 or with_standard:
+        charts += STANDARD_CHARTS
+    return charts
+
+
+@frappe.whitelist()
+def build_tree_from_json(chart_template, chart_data=None, from_coa_importer=False):
+    install_chart_loader()
+    return chart_of_accounts.build_tree_from_json(chart_template, chart_data, from_coa_importer)
+
+
+@frappe.whitelist()
+def validate_bank_account(coa, bank_account):
+    install_chart_loader()
+    return chart_of_accounts.validate_bank_account(coa, bank_account)
+
+
+def on_company_validate(doc, method=None):
+    """doc_events hook: app templates must be loadable before on_update creates the accounts."""
+    install_chart_loader()
+
+
+def install_chart_loader():
+    """
+    Make ERPNext's get_chart find app templates, once per process.
+
+    The wrapper serves an app template when one has the requested name
+    (and no existing company is being copied), and calls ERPNext's own
+    get_chart otherwise.
+    """
+    if getattr(chart_of_accounts.get_chart, 'loads_app_templates', False):
+        return
+    with _loader_lock:
+        get_chart = chart_of_accounts.get_chart
+        if getattr(get_chart, 'loads_app_templates', False):
+            return
+
+        def get_app_chart(chart_template, existing_company=None):
+            if not existing_company:
+                tree = get_template_tree(chart_template)
+                if tree is not None:
+                    return tree
+            return get_chart(chart_template, existing_company)
+
+        get_app_chart.loads_app_templates = True
+        chart_of_accounts.get_chart = get_app_chart
@@ -0,0 +1,32 @@
+"""
+Shared setup for the unit tests: the benchmark suite's SQLite stand-in.
+
+The stand-in is registered as `frappe` once per process, before any
+command module is imported, so every module binds to the same object;
+each test then starts from an empty copy of the schema.
+"""
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+
+from bench_find_children import load_command_module  # noqa: E402
+from run_suite import build_chart, seed_company, write_chart_csv  # noqa: E402
+from sqlite_frappe import SqliteFrappe  # noqa: E402
+
+backend = SqliteFrappe()
+backend.create_schema()
+backend.install()
+EMPTY = backend.snapshot()
+
+__all__ = ['SqliteTestCase', 'backend', 'build_chart', 'load_command_module', 'seed_company', 'write_chart_csv']
+
+
+class SqliteTestCase(unittest.TestCase):
+    """Restores an empty database before every test."""
+
+    def setUp(self):
+        backend.restore(EMPTY)
+        # Also removes the temporary site folder of the last test
+        self.addCleanup(backend.restore, EMPTY)
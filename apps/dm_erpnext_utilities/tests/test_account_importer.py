@@ -0,0 +1,82 @@
+import contextlib
+import csv
+import io
+import os
+import random
+import tempfile
+import unittest
+
+from stand_in import SqliteTestCase, backend, build_chart, load_command_module, seed_company, write_chart_csv
+
+importer = load_command_module('account_importer')
+
+CHART = build_chart(300)
+
+
+class TestImportAccounts(SqliteTestCase):
+    def setUp(self):
+        super().setUp()
+        # Only the five roots exist
+        seed_company(backend, 'Import Co', 'IC', CHART[:5])
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'chart.csv')
+        write_chart_csv(self.path, CHART)
+        # Rows in any order: children may come before their parents
+        with open(self.path, newline='', encoding='utf-8') as f:
+            header, *rows = list(csv.reader(f))
+        random.Random(7).shuffle(rows)
+        with open(self.path, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows([header] + rows)
+
+    def run_import(self, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return importer.import_accounts_from_csv([self.path], 'Import Co', skip_root=True, **kwargs)
+
+    def tree(self):
+        return set(backend.sql("SELECT name, parent_account, is_group, root_type FROM `tabAccount`"))
+
+    def assert_nested_set_consistent(self):
+        rows = {name: (parent, lft, rgt) for name, parent, lft, rgt in backend.sql(
+            "SELECT name, parent_account, lft, rgt FROM `tabAccount`")}
+        bounds = sorted(bound for _, lft, rgt in rows.values() for bound in (lft, rgt))
+        self.assertEqual(bounds, list(range(1, 2 * len(rows) + 1)))
+        for name, (parent, lft, rgt) in rows.items():
+            if parent:
+                self.assertTrue(rows[parent][1] < lft and rgt < rows[parent][2], name)
+
+    def test_bulk_and_document_imports_build_the_same_tree(self):
+        self.assertTrue(self.run_import())
+        self.assertEqual(len(self.tree()), len(CHART))
+        self.assert_nested_set_consistent()
+        by_document = self.tree()
+
+        self.setUp()
+        self.assertTrue(self.run_import(bulk=True))
+        self.assert_nested_set_consistent()
+        self.assertEqual(self.tree(), by_document)
+
+    def test_second_import_skips_existing_accounts(self):
+        self.assertTrue(self.run_import(bulk=True))
+        before = self.tree()
+        self.assertTrue(self.run_import())
+        self.assertEqual(self.tree(), before)
+
+    def test_reset_replaces_the_chart(self):
+        self.assertTrue(self.run_import())
+        backend.conn.execute("DELETE FROM `tabAccount` WHERE account_name = 'Account 299'")
+        self.assertTrue(self.run_import(bulk=True, reset=True))
+        self.assertEqual(len(self.tree()), len(CHART))
+        self.assert_nested_set_consistent()
+
+    def test_invalid_chart_writes_nothing(self):
+        with open(self.path, 'a', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerow(['Stray', 'No Such Parent', '999999', '0', 'Asset'])
+        for bulk in (False, True):
+            with self.subTest(bulk=bulk):
+                self.assertFalse(self.run_import(bulk=bulk))
+                self.assertEqual(len(self.tree()), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
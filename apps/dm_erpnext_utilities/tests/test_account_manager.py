@@ -0,0 +1,141 @@
+import contextlib
+import io
+import unittest
+
+from stand_in import SqliteTestCase, backend, build_chart, load_command_module, seed_company
+
+manager = load_command_module('account_manager')
+
+
+def add_link_table(doctype, fieldname):
+    """Create a table with a Link field to Account and register it in the metadata."""
+    backend.conn.execute(f"CREATE TABLE `tab{doctype}` (name TEXT PRIMARY KEY, `{fieldname}` TEXT)")
+    backend.conn.execute("INSERT INTO `tabDocType` (name) VALUES (?)", (doctype,))
+    backend.conn.execute("INSERT INTO `tabDocField` VALUES (?, ?, 'Link', 'Account')", (doctype, fieldname))
+
+
+class AccountTestCase(SqliteTestCase):
+    def setUp(self):
+        super().setUp()
+        # Five roots, 'Account 5'..'Account 12' under Assets, Account 5's children are 45..52
+        self.names, _, _ = seed_company(backend, 'Reset Co', 'RC', build_chart(60))
+
+    def quiet(self, func, *args, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return func(*args, **kwargs)
+
+    def accounts(self):
+        return set(backend.get_all('Account', filters={'company': 'Reset Co'}, pluck='account_name'))
+
+    def add_gl_entry(self, index):
+        backend.conn.execute("INSERT INTO `tabGL Entry` VALUES (?, ?, 'Reset Co', 1, 0)",
+                             (f'GLE-{index}', self.names[index]))
+
+    def assert_nested_set_consistent(self):
+        rows = {name: (parent, lft, rgt) for name, parent, lft, rgt in backend.sql(
+            "SELECT name, parent_account, lft, rgt FROM `tabAccount`")}
+        for name, (parent, lft, rgt) in rows.items():
+            self.assertLess(lft, rgt, name)
+            if parent:
+                self.assertTrue(rows[parent][1] < lft and rgt < rows[parent][2], name)
+
+
+class TestUsageChecks(AccountTestCase):
+    def setUp(self):
+        super().setUp()
+        self.add_gl_entry(45)
+        backend.conn.execute("INSERT INTO `tabGL Entry` VALUES ('GLE-45b', ?, 'Reset Co', 0, 1)", (self.names[45],))
+        backend.conn.execute("INSERT INTO `tabJournal Entry Account` VALUES ('JEA-1', 'JV-1', ?)", (self.names[46],))
+        backend.conn.execute("INSERT INTO `tabPayment Entry` VALUES ('PE-1', ?, ?)", (self.names[46], self.names[47]))
+
+    def test_usage_is_counted_per_account_and_doctype(self):
+        usage = manager.check_accounts_have_transactions(self.names[44:49])
+        self.assertEqual({name: entry['total'] for name, entry in usage.items()},
+                         {self.names[44]: 0, self.names[45]: 2, self.names[46]: 2,
+                          self.names[47]: 1, self.names[48]: 0})
+        self.assertEqual(usage[self.names[46]]['by_doctype'], {'Journal Entry Account': 1, 'Payment Entry': 1})
+        self.assertEqual(usage[self.names[45]]['gl_entries'], 2)
+
+    def test_chunking_does_not_change_the_counts(self):
+        names = self.names[40:60]
+        self.assertEqual(manager.check_accounts_have_transactions(names, chunk_size=3),
+                         manager.check_accounts_have_transactions(names))
+
+    def test_any_account_has_transactions(self):
+        self.assertIsNone(manager.any_account_has_transactions(self.names[48:60], chunk_size=4))
+        self.assertEqual(manager.any_account_has_transactions(self.names[47:60], chunk_size=4),
+                         (self.names[47], 'Payment Entry'))
+
+
+class TestResetCompanyAccounts(AccountTestCase):
+    def test_ledger_reference_refuses(self):
+        self.add_gl_entry(45)
+        result = self.quiet(manager.reset_company_accounts, 'Reset Co')
+        self.assertFalse(result['ok'])
+        self.assertEqual(len(self.accounts()), 60)
+
+    def test_configuration_links_are_cleared(self):
+        add_link_table('Mode of Payment Account', 'default_account')
+        backend.conn.execute("INSERT INTO `tabMode of Payment Account` VALUES ('MOPA-1', ?)", (self.names[6],))
+        result = self.quiet(manager.reset_company_accounts, 'Reset Co')
+        self.assertTrue(result['ok'])
+        self.assertEqual((result['deleted'], result['kept']), (55, 0))
+        self.assertEqual(result['cleared'], {'Mode of Payment Account': 1})
+        self.assertEqual(backend.get_value('Mode of Payment Account', 'MOPA-1', 'default_account'), None)
+        self.assertEqual(self.accounts(), {'Assets', 'Liabilities', 'Equity', 'Income', 'Expenses'})
+        self.assert_nested_set_consistent()
+
+    def test_keep_used_keeps_ancestors_and_configuration(self):
+        add_link_table('Mode of Payment Account', 'default_account')
+        backend.conn.execute("INSERT INTO `tabMode of Payment Account` VALUES ('MOPA-1', ?)", (self.names[7],))
+        self.add_gl_entry(45)
+        result = self.quiet(manager.reset_company_accounts, 'Reset Co', keep_used=True)
+        self.assertTrue(result['ok'])
+        self.assertEqual((result['deleted'], result['kept'], result['cleared']), (52, 3, {}))
+        self.assertTrue({'Account 5', 'Account 45', 'Account 7'} <= self.accounts())
+        self.assertEqual(backend.get_value('Mode of Payment Account', 'MOPA-1', 'default_account'), self.names[7])
+        self.assert_nested_set_consistent()
+
+
+class TestDeleteSubtree(AccountTestCase):
+    def setUp(self):
+        super().setUp()
+        seed_company(backend, 'Other Co', 'OC', build_chart(20))
+        self.subtree = {self.names[5]} | set(self.names[45:53])
+
+    def remaining(self):
+        return set(backend.get_all('Account', pluck='name'))
+
+    def test_bulk_delete_removes_the_range_and_closes_the_gap(self):
+        before = self.remaining()
+        self.assertTrue(self.quiet(manager.delete_account_and_children, self.names[5], 'Reset Co', bulk=True))
+        self.assertEqual(self.remaining(), before - self.subtree)
+        self.assert_nested_set_consistent()
+        # Numbering stays dense: no gap is left where the subtree was
+        self.assertEqual(backend.sql("SELECT MAX(rgt) FROM `tabAccount`")[0][0], 2 * len(before - self.subtree))
+
+    def test_bulk_and_document_deletes_agree(self):
+        self.quiet(manager.delete_account_and_children, self.names[5], 'Reset Co', bulk=True)
+        bulk = backend.sql("SELECT name, lft, rgt FROM `tabAccount` ORDER BY name")
+        self.setUp()
+        self.quiet(manager.delete_account_and_children, self.names[5], 'Reset Co')
+        self.assertEqual(backend.sql("SELECT name, lft, rgt FROM `tabAccount` ORDER BY name"), bulk)
+
+    def test_used_subtree_is_kept(self):
+        self.add_gl_entry(47)
+        before = self.remaining()
+        self.assertFalse(self.quiet(manager.delete_account_and_children, self.names[5], 'Reset Co', bulk=True))
+        self.assertEqual(self.remaining(), before)
+
+    def test_changed_subtree_is_rolled_back(self):
+        before = self.remaining()
+        main = backend.get_doc('Account', self.names[5])
+        # The checked subtree had one account more than the range holds now
+        ok = self.quiet(manager.bulk_delete_subtree, main, len(self.subtree) + 1, {}, 0.0)
+        self.assertFalse(ok)
+        self.assertEqual(self.remaining(), before)
+        self.assert_nested_set_consistent()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import contextlib
+import io
+import unittest
+
+from stand_in import SqliteTestCase, backend, build_chart, load_command_module, seed_company
+
+account_merge = load_command_module('account_merge')
+
+
+class TestMergeAccountSubtree(SqliteTestCase):
+    def setUp(self):
+        super().setUp()
+        # Account 5's children are 45..52; Account 7 is an Assets ledger
+        self.names, _, _ = seed_company(backend, 'Merge Co', 'MC', build_chart(60))
+        rows = [(f'GLE-{i}', self.names[index]) for i, index in enumerate((45, 45, 46, 47, 47, 5))]
+        backend.conn.executemany("INSERT INTO `tabGL Entry` VALUES (?, ?, 'Merge Co', 1, 0)", rows)
+        backend.conn.execute("INSERT INTO `tabPayment Entry` VALUES ('PE-1', ?, ?)", (self.names[46], self.names[13]))
+
+    def merge(self, source, target, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return account_merge.merge_account_subtree(self.names[source], self.names[target], 'Merge Co', **kwargs)
+
+    def gl_accounts(self):
+        return sorted(backend.get_all('GL Entry', pluck='account'))
+
+    def test_references_move_in_chunks_and_the_subtree_is_deleted(self):
+        self.assertTrue(self.merge(5, 7, chunk_size=2))
+        self.assertEqual(self.gl_accounts(), [self.names[7]] * 6)
+        self.assertEqual(backend.get_value('Payment Entry', 'PE-1', ['paid_from', 'paid_to']),
+                         (self.names[7], self.names[13]))
+        remaining = set(backend.get_all('Account', pluck='name'))
+        self.assertFalse(remaining & ({self.names[5]} | set(self.names[45:53])))
+        self.assertIn(self.names[7], remaining)
+
+    def test_keep_source_and_dry_run(self):
+        before = self.gl_accounts()
+        self.assertTrue(self.merge(5, 7, dry_run=True))
+        self.assertEqual(self.gl_accounts(), before)
+
+        self.assertTrue(self.merge(5, 7, keep_source=True))
+        self.assertEqual(self.gl_accounts(), [self.names[7]] * 6)
+        self.assertTrue(backend.exists('Account', self.names[5]))
+
+    def test_invalid_targets_are_refused(self):
+        before = self.gl_accounts()
+        # Inside the subtree, a group, and another root type
+        for target in (46, 6, 13):
+            with self.subTest(target=target):
+                self.assertFalse(self.merge(5, target))
+        self.assertEqual(self.gl_accounts(), before)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+
+from stand_in import SqliteTestCase, backend, build_chart, load_command_module, seed_company
+
+AccountTree = load_command_module('account_tree').AccountTree
+
+# A - B - D
+#   \ C
+# E
+NAMES = ['A', 'B', 'C', 'D', 'E']
+PARENTS = [None, 'A', 'A', 'B', '']
+
+
+class TestAccountTree(unittest.TestCase):
+    def setUp(self):
+        self.tree = AccountTree(NAMES, PARENTS)
+
+    def test_structure(self):
+        tree = self.tree
+        self.assertEqual(len(tree), 5)
+        self.assertEqual(tree.roots(), ['A', 'E'])
+        self.assertEqual(tree.children('A'), ['B', 'C'])
+        self.assertEqual(tree.parent('D'), 'B')
+        self.assertIsNone(tree.parent('A'))
+        self.assertTrue(tree.has_children('B'))
+        self.assertFalse(tree.has_children('C'))
+        self.assertEqual([tree.depth(n) for n in NAMES], [0, 1, 1, 2, 0])
+        self.assertIn('D', tree)
+        self.assertNotIn('Z', tree)
+        self.assertIsNone(tree.get('Z'))
+
+    def test_orders(self):
+        tree = self.tree
+        self.assertEqual([node.name for node in tree], ['A', 'B', 'D', 'C', 'E'])
+        self.assertEqual(tree.subtree('A'), ['A', 'B', 'D', 'C'])
+        self.assertEqual(tree.descendants('B'), ['D'])
+        self.assertEqual([node.name for node in tree.leaves_first('A')], ['D', 'B', 'C'])
+        self.assertEqual([node.name for node in tree.leaves_first()], ['D', 'B', 'C', 'A', 'E'])
+        self.assertEqual(tree.leaves_first('C'), [])
+
+    def test_leaves_first_puts_every_node_after_its_descendants(self):
+        chart = build_chart(500)
+        names = [row[0] for row in chart]
+        tree = AccountTree(names, [names[row[3]] if row[3] >= 0 else None for row in chart])
+        seen = set()
+        for node in tree.leaves_first():
+            self.assertTrue(set(tree.descendants(node.name)) <= seen, node.name)
+            seen.add(node.name)
+        self.assertEqual(len(seen), len(names))
+
+    def test_ancestry(self):
+        tree = self.tree
+        self.assertEqual(tree.ancestors('D'), ['B', 'A'])
+        self.assertTrue(tree.is_under('D', 'A'))
+        self.assertFalse(tree.is_under('A', 'A'))
+        self.assertFalse(tree.is_under('E', 'A'))
+
+    def test_cycle_is_unreached(self):
+        tree = AccountTree(['R', 'X', 'Y', 'Z'], [None, 'Y', 'X', 'Y'])
+        self.assertEqual(tree.roots(), ['R'])
+        self.assertEqual(sorted(tree.unreached()), ['X', 'Y', 'Z'])
+        self.assertEqual(tree.subtree('X'), [])
+        self.assertEqual(tree.leaves_first('X'), [])
+        # Bounded even though the parent chain loops
+        self.assertEqual(len(tree.ancestors('X')), 4)
+
+    def test_unknown_parent_makes_a_root(self):
+        tree = AccountTree(['A', 'B'], [None, 'Missing'])
+        self.assertEqual(tree.roots(), ['A', 'B'])
+
+    def test_columns_read_as_attributes(self):
+        rows = [
+            {'name': 'A', 'parent_account': None, 'account_name': 'Assets', 'is_group': 1},
+            {'name': 'B', 'parent_account': 'A', 'account_name': 'Bank', 'is_group': 0},
+        ]
+        tree = AccountTree.from_rows(rows, fields=('account_name', 'is_group'))
+        node = tree['B']
+        self.assertEqual((node.account_name, node.is_group, node.parent_account), ('Bank', 0, 'A'))
+        self.assertEqual(node.depth, 1)
+        with self.assertRaises(AttributeError):
+            node.account_type
+
+
+class TestAccountTreeFromCompany(SqliteTestCase):
+    def test_matches_nested_set(self):
+        names, _, _ = seed_company(backend, 'Tree Co', 'TC', build_chart(200))
+        tree = AccountTree.from_company('Tree Co')
+        self.assertEqual(len(tree), 200)
+        # Pre-order of the tree is lft order
+        self.assertEqual([node.name for node in tree], [
+            row[0] for row in backend.conn.execute(
+                "SELECT name FROM `tabAccount` WHERE company = 'Tree Co' ORDER BY lft")
+        ])
+        self.assertEqual(set(tree.roots()), set(names[:5]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+from unittest import mock
+
+from stand_in import SqliteTestCase, backend, load_command_module
+
+account_usage = load_command_module('account_usage')
+frappe = account_usage.frappe
+
+
+class TestUsageRegistry(SqliteTestCase):
+    def test_core_links_without_the_tree_itself(self):
+        self.assertEqual(account_usage.build_usage_checks('Account'), [
+            ('GL Entry', 'account'),
+            ('Journal Entry Account', 'account'),
+            ('Payment Entry', 'paid_from'),
+            ('Payment Entry', 'paid_to'),
+        ])
+
+    def test_custom_fields_and_hooks_are_merged(self):
+        backend.conn.execute("CREATE TABLE `tabMy Ledger` (name TEXT PRIMARY KEY, account TEXT, offset_account TEXT)")
+        backend.conn.execute("INSERT INTO `tabCustom Field` VALUES ('My Ledger', 'offset_account', 'Link', 'Account')")
+        hooks = {'account_usage_checks': [{'doctype': 'My Ledger', 'fieldname': 'account'}]}
+        with mock.patch.object(frappe, 'get_hooks', lambda name, default=None: hooks.get(name, default)):
+            checks = account_usage.build_usage_checks('Account')
+        self.assertIn(('My Ledger', 'account'), checks)
+        self.assertIn(('My Ledger', 'offset_account'), checks)
+
+    def test_singles_and_missing_tables_are_skipped(self):
+        backend.conn.execute("INSERT INTO `tabDocType` (name, issingle) VALUES ('Accounts Settings', 1)")
+        backend.conn.execute("INSERT INTO `tabDocField` VALUES ('Accounts Settings', 'round_off_account', 'Link', 'Account')")
+        backend.conn.execute("INSERT INTO `tabDocField` VALUES ('Not Installed', 'account', 'Link', 'Account')")
+        checks = {dt for dt, _ in account_usage.build_usage_checks('Account')}
+        self.assertFalse(checks & {'Accounts Settings', 'Not Installed'})
+
+    def test_registry_is_cached_until_cleared(self):
+        first = account_usage.get_usage_checks('Account')
+        backend.conn.execute("CREATE TABLE `tabMy Ledger` (name TEXT PRIMARY KEY, account TEXT)")
+        backend.conn.execute("INSERT INTO `tabCustom Field` VALUES ('My Ledger', 'account', 'Link', 'Account')")
+        self.assertEqual(account_usage.get_usage_checks('Account'), first)
+        account_usage.clear_usage_checks_cache()
+        self.assertIn(('My Ledger', 'account'), account_usage.get_usage_checks('Account'))
+
+    def test_ledger_and_configuration_split(self):
+        backend.conn.execute("CREATE TABLE `tabParty Account` (name TEXT PRIMARY KEY, account TEXT)")
+        backend.conn.execute("INSERT INTO `tabDocField` VALUES ('Party Account', 'account', 'Link', 'Account')")
+        ledger, configuration = account_usage.split_usage_checks('Account')
+        self.assertEqual(configuration, [('Party Account', 'account')])
+        self.assertEqual({dt for dt, _ in ledger}, {'GL Entry', 'Journal Entry Account', 'Payment Entry'})
+
+
+if __name__ == '__main__':
+    unittest.main()
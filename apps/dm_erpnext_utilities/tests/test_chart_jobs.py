@@ -0,0 +1,77 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from stand_in import SqliteTestCase, backend, build_chart, load_command_module, seed_company, write_chart_csv
+
+chart_jobs = load_command_module('chart_jobs')
+importer = load_command_module('account_importer')
+
+
+class TestRunImport(SqliteTestCase):
+    def setUp(self):
+        super().setUp()
+        seed_company(backend, 'Job Co', 'JC', build_chart(5))
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        # 'Account 5'..'Account 12' under Assets; Account 5's children are 45..52
+        self.path = os.path.join(tmp.name, 'chart.csv')
+        write_chart_csv(self.path, build_chart(60))
+        self.cache = backend.cache()
+
+    def run_import(self, **options):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return chart_jobs._run_import('job', 'Job Co', dict(options, csv_files=[self.path]), self.cache)
+
+    def accounts(self):
+        return set(backend.get_all('Account', filters={'company': 'Job Co'}, pluck='account_name'))
+
+    def assert_nested_set_consistent(self):
+        rows = {name: (parent, lft, rgt) for name, parent, lft, rgt in backend.sql(
+            "SELECT name, parent_account, lft, rgt FROM `tabAccount`")}
+        for name, (parent, lft, rgt) in rows.items():
+            self.assertLess(lft, rgt, name)
+            if parent:
+                self.assertTrue(rows[parent][1] < lft and rgt < rows[parent][2], name)
+
+    def test_document_import_skips_children_of_a_failed_batch(self):
+        insert_account = backend.insert_account
+        attempted = []
+
+        def insert(doc):
+            attempted.append(doc.account_name)
+            if doc.account_name == 'Account 5':
+                raise chart_jobs.frappe.ValidationError('Account 5 is invalid')
+            return insert_account(doc)
+
+        with mock.patch.object(chart_jobs, 'JOB_BATCH_SIZE', 4), \
+                mock.patch.object(backend, 'insert_account', side_effect=insert):
+            self.assertFalse(self.run_import())
+
+        # Account 5's children are in later batches and are never attempted
+        children = {f'Account {i}' for i in range(45, 53)}
+        self.assertFalse(children & set(attempted))
+        self.assertFalse(children & self.accounts())
+        self.assertIn('Account 6', self.accounts())
+        self.assert_nested_set_consistent()
+
+    def test_bulk_import_rebuilds_once(self):
+        with mock.patch.object(importer, 'rebuild_nested_set', wraps=importer.rebuild_nested_set) as rebuild, \
+                mock.patch.object(chart_jobs, 'JOB_BATCH_SIZE', 4):
+            self.assertTrue(self.run_import(bulk=True))
+        self.assertEqual(rebuild.call_count, 1)
+        self.assertEqual(len(self.accounts()), 60)
+        self.assert_nested_set_consistent()
+        self.assertEqual(chart_jobs.get_job_progress('job', self.cache)['done'], 1)
+
+    def test_failed_bulk_import_writes_nothing(self):
+        with mock.patch.object(importer, 'insert_account_rows', side_effect=RuntimeError('lost connection')):
+            self.assertFalse(self.run_import(bulk=True))
+        self.assertEqual(len(self.accounts()), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import glob
+import json
+import os
+import tempfile
+import unittest
+
+from stand_in import load_command_module
+
+lint = load_command_module('chart_lint')
+
+HEADER = 'Account Name,Parent Account,Account Number,Account Type,Is Group,Root Type\n'
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATES = os.path.join(TESTS_DIR, '..', '..', '..', 'templates', 'account', 'br')
+APP_CHARTS = os.path.join(TESTS_DIR, '..', 'dm_erpnext_utilities', 'charts')
+
+
+class TestChartLint(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        return path
+
+    def findings(self, *texts, workers=1):
+        paths = [self.write(f'chart{i}.csv', HEADER + text) for i, text in enumerate(texts)]
+        return lint.lint_chart_files(paths, workers=workers)['findings']
+
+    def codes(self, *texts, **kwargs):
+        return sorted({(severity, code) for _, _, severity, code, _ in self.findings(*texts, **kwargs)})
+
+    def test_clean_chart(self):
+        self.assertEqual(self.codes(
+            'Assets,,1000,,1,Asset\n'
+            'Bank,Assets,1100,Bank,0,\n'
+        ), [])
+
+    def test_errors(self):
+        cases = {
+            'missing-name': ',Assets,1100,,0,\n',
+            'bad-flag': 'Bank,Assets,1100,,maybe,\n',
+            'bad-root-type': 'Bank,Assets,1100,,0,Money\n',
+            'duplicate-account': 'Bank,Assets,1100,,0,\nBank,Assets,1100,,0,\n',
+            'duplicate-number': 'Bank,Assets,1100,,0,\nCash,Assets,1100,,0,\n',
+            'root-type-mismatch': 'Bank,Assets,1100,,0,Expense\n',
+            'not-a-group': 'Bank,Assets,1100,,0,\nCash,Bank,1110,,0,\n',
+            'parent-cycle': 'Loop A,Loop B,,,1,\nLoop B,Loop A,,,1,\n',
+        }
+        for code, rows in cases.items():
+            with self.subTest(code):
+                self.assertIn(('error', code), self.codes('Assets,,1000,,1,Asset\n' + rows))
+
+    def test_missing_root_type(self):
+        self.assertIn(('error', 'missing-root-type'), self.codes('Assets,,1000,,1,\n'))
+
+    def test_warnings_and_notes(self):
+        self.assertEqual(self.codes(
+            'Assets,,1000,,1,Asset\n'
+            'Banks,Assets,1100,Bank,1,\n'
+            'Cash,ASSETS - XX,1200,,0,\n'
+            'Stock,Inventory - XX,1300,,0,\n'
+        ), [('note', 'external-parent'), ('warning', 'group-account-type'), ('warning', 'parent-spelling')])
+
+    def test_checks_span_files(self):
+        # Parents and duplicates are checked across files, in parallel or not
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                self.assertEqual(self.codes('Assets,,1000,,1,Asset\n', 'Bank,Assets,1000,,0,\n', workers=workers),
+                                 [('error', 'duplicate-number')])
+
+    def test_mixed_quoting_across_files(self):
+        self.assertEqual(self.codes('Assets,,1000,,"1",Asset\n', 'Bank,Assets,1100,,0,\n'),
+                         [('warning', 'mixed-quoting')])
+
+    def test_findings_point_at_lines(self):
+        findings = self.findings('Assets,,1000,,1,Asset\nBank,Assets,1100,,0,\nCash,Assets,1100,,0,\n')
+        self.assertEqual([(line, code) for _, line, _, code, _ in findings], [(4, 'duplicate-number')])
+
+    def test_json_tree(self):
+        path = self.write('chart.json', json.dumps({'tree': {
+            'Assets': {'root_type': 'Asset', 'Bank': {'account_number': '1100', 'is_group': 0, 'Cash': {}}},
+        }}))
+        result = lint.lint_chart_files([path], workers=1)
+        self.assertEqual([code for _, _, _, code, _ in result['findings']], ['not-a-group'])
+        self.assertEqual(result['rows'], 3)
+
+    def test_shipped_examples_are_clean(self):
+        paths = sorted(glob.glob(os.path.join(TEMPLATES, 'csv', 'plano_de_contas_nivel_[234]*.csv')))
+        self.assertEqual(len(paths), 3)
+        result = lint.lint_chart_files(paths, workers=1)
+        self.assertEqual((result['errors'], result['warnings']), (0, 0), result['findings'])
+        charts = glob.glob(os.path.join(TEMPLATES, 'plano_de_contas_*.json')) + glob.glob(os.path.join(APP_CHARTS, '*.json'))
+        self.assertEqual(len(charts), 4)
+        for path in charts:
+            with self.subTest(path=os.path.basename(path)):
+                self.assertEqual(lint.lint_chart_files([path], workers=1)['errors'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
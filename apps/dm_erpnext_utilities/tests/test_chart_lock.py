@@ -0,0 +1,28 @@
+import unittest
+from unittest import mock
+
+from stand_in import SqliteTestCase, load_command_module
+
+chart_lock = load_command_module('chart_lock')
+
+
+class TestLockLog(SqliteTestCase):
+    def test_log_is_capped_newest_first(self):
+        with mock.patch.object(chart_lock, 'LOG_SIZE', 3):
+            for company in ('A', 'B', 'C', 'D', 'E'):
+                with chart_lock.company_lock(company, 'import', wait=1):
+                    pass
+        log = chart_lock.get_lock_log()
+        self.assertEqual([entry['scope'] for entry in log], ['Account:E', 'Account:D', 'Account:C'])
+        self.assertEqual({entry['operation'] for entry in log}, {'import'})
+        self.assertTrue(all(entry['held'] >= 0 and entry['waited'] >= 0 for entry in log))
+
+    def test_reentrant_lock_is_logged_once(self):
+        with chart_lock.company_lock('A', 'import', wait=1):
+            with chart_lock.company_lock('A', 'sync', wait=1):
+                pass
+        self.assertEqual(len(chart_lock.get_lock_log()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
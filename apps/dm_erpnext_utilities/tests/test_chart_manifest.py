@@ -0,0 +1,63 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from stand_in import SqliteTestCase, backend, build_chart, load_command_module, seed_company, write_chart_csv
+
+chart_manifest = load_command_module('chart_manifest')
+
+
+class TestAtomicManifest(SqliteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.names, _, _ = seed_company(backend, 'Atomic Co', 'AC', build_chart(12))
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.chart = os.path.join(tmp.name, 'chart.csv')
+        write_chart_csv(self.chart, build_chart(20))
+        self.missing = os.path.join(tmp.name, 'missing.csv')
+
+    def run_atomic(self, *steps):
+        steps = [dict(step, number=number) for number, step in enumerate(steps, start=1)]
+        with mock.patch.object(chart_manifest.frappe.db, 'commit', wraps=backend.commit) as commit, \
+                contextlib.redirect_stdout(io.StringIO()):
+            ok = chart_manifest.run_manifest_atomic({'Atomic Co': steps})
+        return ok, commit.call_count
+
+    def accounts(self):
+        return set(backend.get_all('Account', filters={'company': 'Atomic Co'}, pluck='name'))
+
+    def test_steps_commit_once_at_the_end(self):
+        ok, commits = self.run_atomic(
+            {'op': 'delete', 'account': self.names[6], 'bulk': True},
+            {'op': 'import', 'files': [self.chart], 'skip_root': True},
+        )
+        self.assertTrue(ok)
+        self.assertEqual(commits, 1)
+        self.assertIn('100019 - Account 19 - AC', self.accounts())
+
+    def test_failed_step_rolls_back_earlier_steps(self):
+        ok, commits = self.run_atomic(
+            {'op': 'delete', 'account': self.names[6], 'bulk': True},
+            {'op': 'import', 'files': [self.chart], 'skip_root': True},
+            {'op': 'import', 'files': [self.missing], 'skip_root': True},
+        )
+        self.assertFalse(ok)
+        self.assertEqual(commits, 0)
+        self.assertIn(self.names[6], self.accounts())
+        self.assertNotIn('100019 - Account 19 - AC', self.accounts())
+
+    def test_merge_is_refused(self):
+        ok, commits = self.run_atomic(
+            {'op': 'delete', 'account': self.names[6], 'bulk': True},
+            {'op': 'merge', 'account': self.names[7], 'target': self.names[8]},
+        )
+        self.assertEqual((ok, commits), (False, 0))
+        self.assertIn(self.names[6], self.accounts())
+
+
+if __name__ == '__main__':
+    unittest.main()
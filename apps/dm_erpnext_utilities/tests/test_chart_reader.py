@@ -0,0 +1,88 @@
+import json
+import os
+import tempfile
+import unittest
+
+from stand_in import load_command_module
+
+chart_reader = load_command_module('chart_reader')
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+TREE = {
+    'Ativo': {
+        'Circulante': {
+            'Caixa': {'account_number': '1.1.1', 'account_type': 'Cash'},
+            'Bancos': {'is_group': 1},
+        },
+        'root_type': 'Asset',
+    },
+    'Passivo': {'root_type': 'Liability', 'is_group': 1},
+}
+
+
+class TestChartReader(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def write(self, name, content):
+        path = os.path.join(self.dir, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content if isinstance(content, str) else json.dumps(content))
+        return path
+
+    def brief(self, records):
+        return [(r['line'], r['account_name'], r['parent_account'], r['account_number'], r['is_group'])
+                for r in records]
+
+    def test_csv_headers_in_portuguese_with_bom(self):
+        path = self.write('chart.csv', '\ufeffNome da Conta,Conta Pai,Número da Conta,É Grupo,Extra\n'
+                                       'Caixa,Circulante,1.1.1,Não,x\n'
+                                       ',,,,\n'
+                                       'Bancos,Circulante\n')
+        self.assertEqual(self.brief(chart_reader.read_chart(path)), [
+            (2, 'Caixa', 'Circulante', '1.1.1', 0),
+            (4, 'Bancos', 'Circulante', '', None),
+        ])
+
+    def test_flat_json(self):
+        path = self.write('chart.json', {'accounts': [
+            {'account_name': 'Caixa', 'parent_account': 'Circulante', 'is_group': False, 'account_number': 111},
+        ]})
+        self.assertEqual(self.brief(chart_reader.read_chart(path)), [(1, 'Caixa', 'Circulante', '111', 0)])
+
+    def test_nested_tree_parents_first(self):
+        path = self.write('chart.json', {'country_code': 'br', 'tree': TREE})
+        self.assertEqual(self.brief(chart_reader.read_chart(path)), [
+            (1, 'Ativo', '', '', 1),
+            (2, 'Circulante', 'Ativo', '', 1),
+            (3, 'Caixa', 'Circulante', '1.1.1', None),
+            (4, 'Bancos', 'Circulante', '', 1),
+            (5, 'Passivo', '', '', 1),
+        ])
+
+    @unittest.skipUnless(ijson, 'ijson is not installed')
+    def test_streamed_tree_matches_the_loaded_one(self):
+        path = self.write('chart.json', {'tree': TREE})
+        loaded = list(chart_reader.walk_tree(path, TREE))
+        streamed = sorted(chart_reader.read_chart(path), key=lambda r: r['line'])
+        self.assertEqual(streamed, loaded)
+
+    def test_unrecognized_json(self):
+        path = self.write('chart.json', {'rows': []})
+        with self.assertRaises(ValueError):
+            list(chart_reader.read_chart(path))
+
+    def test_parse_flag(self):
+        for value, flag in ((True, 1), (0, 0), (' Sim ', 1), ('nao', 0), ('', None), ('maybe', None), (None, None)):
+            with self.subTest(value=value):
+                self.assertEqual(chart_reader.parse_flag(value), flag)
+
+
+if __name__ == '__main__':
+    unittest.main()
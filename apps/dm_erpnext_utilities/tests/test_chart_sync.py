@@ -0,0 +1,73 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from stand_in import SqliteTestCase, backend, build_chart, load_command_module, seed_company
+
+sync = load_command_module('chart_sync')
+
+HEADER = ['Account Name', 'Parent Account', 'Account Number', 'Is Group', 'Root Type']
+
+
+class TestPlanSync(SqliteTestCase):
+    def setUp(self):
+        super().setUp()
+        # 'Account 5'..'Account 11' are ledgers under Assets; the seeded GL
+        # rows reference 5, 6, 7, 8 and 10
+        seed_company(backend, 'Sync Co', 'SC', build_chart(12), gl_rows=5)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def plan(self, rows, delete=False):
+        path = os.path.join(self.tmp.name, 'chart.csv')
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADER)
+            writer.writerows(rows)
+        return sync.plan_sync([path], 'Sync Co', delete=delete)
+
+    def test_changeset(self):
+        changes = self.plan([
+            ['Renamed', 'Assets', '100005', '0', ''],
+            ['Group', 'Assets', '1500', '', ''],
+            ['Account 6', 'Group', '100006', '0', ''],
+            ['New', 'Group', '1501', '0', ''],
+        ], delete=True)
+        self.assertEqual(changes['errors'], [])
+        self.assertEqual([(row['name'], row['parent_name'], row['is_group'], row['root_type'])
+                          for row in changes['creates']], [
+            ('1500 - Group - SC', 'Assets - SC', 1, 'Asset'),
+            ('1501 - New - SC', '1500 - Group - SC', 0, 'Asset'),
+        ])
+        self.assertEqual(changes['updates'], {
+            '100005 - Account 5 - SC': {'account_name': ('Account 5', 'Renamed')},
+            '100006 - Account 6 - SC': {'parent_account': ('Assets - SC', '1500 - Group - SC')},
+        })
+        self.assertEqual(changes['renames'], [('100005 - Account 5 - SC', '100005 - Renamed - SC')])
+        # Absent and unused; accounts with ledger rows and the roots are kept
+        self.assertEqual(changes['deletes'], ['100009 - Account 9 - SC', '100011 - Account 11 - SC'])
+
+    def test_matching_chart_is_unchanged(self):
+        changes = self.plan([[f'Account {i}', 'Assets', str(100000 + i), '0', ''] for i in range(5, 12)])
+        self.assertEqual((changes['creates'], changes['updates'], changes['renames'], changes['deletes']),
+                         ([], {}, [], []))
+        self.assertEqual(changes['unchanged'], 12)
+
+    def test_ledger_with_entries_cannot_become_a_group(self):
+        changes = self.plan([['Account 5', 'Assets', '100005', '1', '']])
+        self.assertEqual(changes['errors'], ['100005 - Account 5 - SC has ledger entries and cannot become a group'])
+
+    def test_parent_cycle(self):
+        changes = self.plan([
+            ['Loop A', 'Loop B', '2001', '1', 'Asset'],
+            ['Loop B', 'Loop A', '2002', '1', 'Asset'],
+        ])
+        self.assertEqual(sorted(changes['errors']), [
+            'parent cycle through 2001 - Loop A - SC -> 2002 - Loop B - SC',
+            'parent cycle through 2002 - Loop B - SC -> 2001 - Loop A - SC',
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+The standalone scripts/ copies of the subtree walk (copied into the
+container on their own, without the app) must return the same
+children-before-parents order as account_manager.
+"""
+import importlib.util
+import os
+import unittest
+
+from stand_in import SqliteTestCase, backend, build_chart, load_command_module, seed_company
+
+manager = load_command_module('account_manager')
+
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'scripts')
+
+
+def load_script(name):
+    spec = importlib.util.spec_from_file_location(f'scripts_{name}', os.path.join(SCRIPTS_DIR, f'{name}.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+SCRIPTS = [load_script('delete_account_core'), load_script('delete_account_recursive')]
+
+
+class TestDeleteScriptsOrder(SqliteTestCase):
+    def setUp(self):
+        super().setUp()
+        # Three levels: Assets > Account 5..12 > Account 45..52 (under Account 5) ...
+        self.names, _, _ = seed_company(backend, 'Script Co', 'SC', build_chart(120))
+        self.accounts = ['Assets - SC', self.names[5], self.names[6], self.names[45]]
+
+    def expected(self, account):
+        return [row.name for row in manager.find_children_recursive(account, 'Script Co')]
+
+    def test_nested_set_query_matches(self):
+        for script in SCRIPTS:
+            for account in self.accounts:
+                with self.subTest(script=script.__name__, account=account):
+                    self.assertEqual([row.name for row in script.find_children_recursive(account, 'Script Co')],
+                                     self.expected(account))
+
+    def test_in_memory_walk_matches(self):
+        for script in SCRIPTS:
+            for account in self.accounts:
+                with self.subTest(script=script.__name__, account=account):
+                    self.assertEqual([row.name for row in script.find_children_in_memory(account, 'Script Co')],
+                                     [node.name for node in manager.find_children_in_memory(account, 'Script Co')])
+                    self.assertEqual([row.name for row in script.find_children_in_memory(account, 'Script Co')],
+                                     self.expected(account))
+
+    def test_broken_bounds_fall_back_to_the_same_order(self):
+        expected = self.expected('Assets - SC')
+        backend.sql("UPDATE `tabAccount` SET lft = 0 WHERE name = 'Assets - SC'")
+        for script in SCRIPTS:
+            with self.subTest(script=script.__name__):
+                self.assertEqual([row.name for row in script.find_children_recursive('Assets - SC', 'Script Co')],
+                                 expected)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import contextlib
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from stand_in import SqliteTestCase, backend, build_chart, load_command_module, seed_company
+
+impact_report = load_command_module('impact_report')
+db = impact_report.frappe.db
+
+
+class TestImpactReport(SqliteTestCase):
+    def setUp(self):
+        super().setUp()
+        self.names, _, _ = seed_company(backend, 'Impact Co', 'IM', build_chart(20))
+        backend.conn.executemany("INSERT INTO `tabGL Entry` VALUES (?, ?, 'Impact Co', ?, 0)",
+                                 [(f'GLE-{i}', self.names[5 + i % 3], i) for i in range(7)])
+        backend.conn.execute("INSERT INTO `tabPayment Entry` VALUES ('PE-1', ?, ?)", (self.names[5], self.names[9]))
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+
+    def write(self, filename, chunk_size=3):
+        path = os.path.join(self.dir, filename)
+        with contextlib.redirect_stdout(io.StringIO()):
+            stats = impact_report.write_impact_report(self.names[5:8], path, chunk_size=chunk_size)
+        return path, {(doctype, fieldname): rows for doctype, fieldname, rows, _ in stats}
+
+    def test_csv_report(self):
+        path, stats = self.write('impact.csv')
+        self.assertEqual(stats[('GL Entry', 'account')], 7)
+        self.assertEqual(stats[('Payment Entry', 'paid_from')], 1)
+        self.assertEqual(stats[('Payment Entry', 'paid_to')], 0)
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 8)
+        gl = [row for row in rows if row['doctype'] == 'GL Entry']
+        self.assertEqual(sorted(float(row['debit']) for row in gl), list(map(float, range(7))))
+        # Columns the table lacks are left empty
+        self.assertEqual({row['voucher_no'] for row in rows}, {''})
+
+    def test_jsonl_report_has_only_existing_columns(self):
+        path, _ = self.write('impact.jsonl')
+        with open(path, encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f]
+        self.assertEqual(len(rows), 8)
+        payment = next(row for row in rows if row['doctype'] == 'Payment Entry')
+        self.assertEqual(payment, {'doctype': 'Payment Entry', 'fieldname': 'paid_from',
+                                   'account': self.names[5], 'name': 'PE-1'})
+
+    def test_paged_fallback_reports_the_same_rows(self):
+        streamed, _ = self.write('streamed.csv')
+        cursor = db.unbuffered_cursor
+        del db.unbuffered_cursor
+        self.addCleanup(setattr, db, 'unbuffered_cursor', cursor)
+        paged, _ = self.write('paged.csv', chunk_size=2)
+        with open(streamed, encoding='utf-8') as a, open(paged, encoding='utf-8') as b:
+            self.assertEqual(sorted(a), sorted(b))
+
+
+if __name__ == '__main__':
+    unittest.main()
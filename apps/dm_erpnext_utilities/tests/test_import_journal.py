@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+import unittest
+
+from stand_in import SqliteTestCase, backend, load_command_module
+
+import_journal = load_command_module('import_journal')
+
+
+class TestImportJournal(SqliteTestCase):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'chart.csv')
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write('Account Name,Parent Account\n' + ''.join(f'A{i},Assets\n' for i in range(10)))
+
+    def rows(self, *lines):
+        return [{'file': self.path, 'line': line} for line in lines]
+
+    def test_lines_are_stored_as_ranges(self):
+        self.assertEqual(import_journal._to_ranges({7, 2, 3, 4, 9, 10}), [[2, 4], [7, 7], [9, 10]])
+        self.assertEqual(import_journal._to_ranges(set()), [])
+
+    def test_resume_restores_applied_rows(self):
+        journal = import_journal.open_journal('Co', [self.path])
+        for row in self.rows(2, 3, 4, 7):
+            import_journal.mark_applied(journal, row)
+        import_journal.save_journal(journal)
+        # Written when the batch commits, never for a rolled back one
+        self.assertFalse(os.path.exists(import_journal.journal_path(journal['key'])))
+        backend.commit()
+        with open(import_journal.journal_path(journal['key']), encoding='utf-8') as f:
+            stored = json.load(f)
+        self.assertEqual(list(stored['applied'].values()), [[[2, 4], [7, 7]]])
+
+        resumed = import_journal.open_journal('Co', [self.path], resume=True)
+        self.assertEqual(import_journal.applied_count(resumed), 4)
+        self.assertEqual([import_journal.is_applied(resumed, row) for row in self.rows(2, 5, 7)],
+                         [True, False, True])
+
+        # Without resume, or for another company, nothing is applied
+        self.assertEqual(import_journal.applied_count(import_journal.open_journal('Co', [self.path])), 0)
+        self.assertEqual(import_journal.applied_count(
+            import_journal.open_journal('Other Co', [self.path], resume=True)), 0)
+
+    def test_edited_file_starts_a_new_journal(self):
+        journal = import_journal.open_journal('Co', [self.path])
+        import_journal.mark_applied(journal, self.rows(2)[0])
+        import_journal.save_journal(journal)
+        backend.commit()
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('A10,Assets\n')
+        self.assertEqual(import_journal.applied_count(
+            import_journal.open_journal('Co', [self.path], resume=True)), 0)
+
+    def test_unmark_and_clear(self):
+        journal = import_journal.open_journal('Co', [self.path])
+        for row in self.rows(2, 3):
+            import_journal.mark_applied(journal, row)
+        import_journal.unmark_applied(journal, self.rows(3)[0])
+        self.assertEqual(import_journal.applied_count(journal), 1)
+        import_journal.save_journal(journal)
+        backend.commit()
+        import_journal.clear_journal(journal)
+        backend.commit()
+        self.assertFalse(os.path.exists(import_journal.journal_path(journal['key'])))
+
+    def test_rolled_back_batch_is_not_journaled(self):
+        journal = import_journal.open_journal('Co', [self.path])
+        import_journal.mark_applied(journal, self.rows(2)[0])
+        import_journal.save_journal(journal)
+        backend.rollback()
+        self.assertEqual(import_journal.applied_count(
+            import_journal.open_journal('Co', [self.path], resume=True)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
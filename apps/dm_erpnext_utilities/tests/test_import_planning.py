@@ -0,0 +1,130 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from stand_in import SqliteTestCase, backend, build_chart, load_command_module, seed_company
+
+importer = load_command_module('account_importer')
+
+HEADER = ['Account Name', 'Parent Account', 'Account Number', 'Is Group', 'Root Type']
+
+
+class TestPlanImport(SqliteTestCase):
+    def setUp(self):
+        super().setUp()
+        # Five roots plus 'Account 5'..'Account 11', ledgers under Assets
+        seed_company(backend, 'Plan Co', 'PC', build_chart(12))
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, rows):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADER)
+            writer.writerows(rows)
+        return path
+
+    def plan(self, *files):
+        return importer.plan_import(list(files), 'Plan Co', skip_root=True)
+
+    def names(self, plan):
+        return [[row['name'] for row in level] for level in plan['levels']]
+
+    def test_children_before_parents_across_files(self):
+        leaves = self.write('leaves.csv', [['Caixa', 'Banks', '1111', '0', '']])
+        groups = self.write('groups.csv', [['Banks', 'Assets', '1110', '', '']])
+        plan = self.plan(leaves, groups)
+        self.assertEqual(plan['errors'], [])
+        self.assertEqual(self.names(plan), [['1110 - Banks - PC'], ['1111 - Caixa - PC']])
+        group, leaf = plan['levels'][0][0], plan['levels'][1][0]
+        # Undeclared Is Group follows the children; root type follows the parent
+        self.assertEqual((group['is_group'], leaf['is_group']), (1, 0))
+        self.assertEqual((group['root_type'], leaf['root_type']), ('Asset', 'Asset'))
+
+    def test_parent_by_number_or_full_name(self):
+        path = self.write('chart.csv', [
+            ['Banks', 'Assets - PC', '1110', '1', ''],
+            ['Caixa', '1110', '1111', '0', ''],
+        ])
+        plan = self.plan(path)
+        self.assertEqual(plan['errors'], [])
+        self.assertEqual(plan['levels'][1][0]['parent_name'], '1110 - Banks - PC')
+
+    def test_existing_accounts_are_skipped(self):
+        path = self.write('chart.csv', [['Account 5', 'Assets', '100005', '0', '']])
+        plan = self.plan(path)
+        self.assertEqual((plan['errors'], plan['levels'], plan['skipped']), ([], [], 1))
+
+    def test_orphan_and_its_subtree_are_left_out(self):
+        path = self.write('chart.csv', [
+            ['Lost', 'Nowhere', '9000', '1', 'Asset'],
+            ['Lost Child', 'Lost', '9001', '0', ''],
+            ['Kept', 'Assets', '1500', '0', ''],
+        ])
+        plan = self.plan(path)
+        self.assertEqual(self.names(plan), [['1500 - Kept - PC']])
+        self.assertEqual(len(plan['errors']), 1)
+        self.assertIn('parent does not exist: Nowhere', plan['errors'][0])
+
+    def test_parent_cycle(self):
+        path = self.write('chart.csv', [
+            ['Loop A', 'Loop B', '', '1', 'Asset'],
+            ['Loop B', 'Loop A', '', '1', 'Asset'],
+        ])
+        plan = self.plan(path)
+        self.assertEqual(plan['levels'], [])
+        self.assertEqual(sorted(e.split(': ', 1)[1] for e in plan['errors']), [
+            'parent cycle through Loop A - PC -> Loop B - PC',
+            'parent cycle through Loop B - PC -> Loop A - PC',
+        ])
+
+    def test_ledger_with_children(self):
+        path = self.write('chart.csv', [
+            ['Banks', 'Assets', '1110', '0', ''],
+            ['Caixa', 'Banks', '1111', '0', ''],
+        ])
+        errors = self.plan(path)['errors']
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(errors[0].endswith('1110 - Banks - PC is not a group but has children'), errors)
+
+    def test_parent_is_an_existing_ledger(self):
+        path = self.write('chart.csv', [['Sub', 'Account 6', '1600', '0', '']])
+        self.assertIn('parent is not a group: 100006 - Account 6 - PC', self.plan(path)['errors'][0])
+
+    def test_duplicates(self):
+        path = self.write('chart.csv', [
+            ['Banks', 'Assets', '1110', '1', ''],
+            ['Banks', 'Assets', '1110', '1', ''],
+            ['Other', 'Assets', '100007', '0', ''],
+        ])
+        errors = self.plan(path)['errors']
+        self.assertEqual(len(errors), 2)
+        self.assertIn('duplicate account 1110 - Banks - PC', errors[0])
+        self.assertIn('account number 100007 already used by 100007 - Account 7 - PC', errors[1])
+
+
+class TestOrdering(unittest.TestCase):
+    def pending(self, parents):
+        return {name: {'name': name, 'parent_name': parent, 'is_group': None, 'where': f'f:{i}'}
+                for i, (name, parent) in enumerate(parents.items(), start=2)}
+
+    def test_find_cycles_ignores_rows_hanging_off_a_cycle(self):
+        pending = self.pending({'a': 'b', 'b': 'a', 'c': 'a', 'd': None})
+        self.assertEqual(sorted(importer._find_cycles(pending, placed={'d'})), ['a', 'b'])
+
+    def test_find_cycles_self_parent(self):
+        self.assertEqual(importer._find_cycles(self.pending({'a': 'a'}), placed=set()), ['a'])
+
+    def test_order_parents_first(self):
+        pending = self.pending({'leaf': 'mid', 'mid': 'top', 'top': 'Existing', 'orphan': None, 'under': 'orphan'})
+        errors = []
+        levels = importer.order_parents_first(pending, errors, orphans={'orphan'})
+        self.assertEqual(errors, [])
+        self.assertEqual([[row['name'] for row in level] for level in levels], [['top'], ['mid'], ['leaf']])
+        self.assertEqual([pending[n]['is_group'] for n in ('top', 'mid', 'leaf')], [1, 1, 0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import sys
+import threading
+import unittest
+
+from stand_in import load_command_module
+
+parallel = load_command_module('parallel')
+
+
+class TestCaptureOutput(unittest.TestCase):
+    def test_threads_capture_their_own_output(self):
+        outputs = {}
+        barrier = threading.Barrier(4)
+
+        def work(i):
+            with parallel.capture_output() as output:
+                barrier.wait()
+                for line in range(20):
+                    print(i, line)
+            outputs[i] = output.getvalue().splitlines()
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for i, lines in outputs.items():
+            self.assertEqual(lines, [f'{i} {line}' for line in range(20)])
+
+    def test_original_stdout_is_restored(self):
+        original = sys.stdout
+        with parallel.capture_output() as outer:
+            self.assertIsNot(sys.stdout, original)
+            with parallel.capture_output() as inner:
+                print('inner')
+            print('outer')
+        self.assertIs(sys.stdout, original)
+        self.assertEqual((outer.getvalue(), inner.getvalue()), ('outer\n', 'inner\n'))
+
+
+if __name__ == '__main__':
+    unittest.main()
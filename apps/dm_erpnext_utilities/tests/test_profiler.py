@@ -0,0 +1,88 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from stand_in import SqliteTestCase, backend, build_chart, load_command_module, seed_company
+
+profiler = load_command_module('profiler')
+parallel = load_command_module('parallel')
+# The stand-in registered as `frappe`
+db = profiler.frappe.db
+
+
+class TestStatementShape(unittest.TestCase):
+    def test_values_become_placeholders(self):
+        cases = {
+            "SELECT name FROM `tabAccount` WHERE company = 'DM-CASA' AND lft > 10":
+                "SELECT name FROM `tabAccount` WHERE company = ? AND lft > ?",
+            'SELECT * FROM t WHERE a = "x" AND b = %(b)s AND c = %s':
+                "SELECT * FROM t WHERE a = ? AND b = ? AND c = ?",
+            "SELECT 1 FROM t WHERE name IN ('a', 'b', 'c')":
+                "SELECT ? FROM t WHERE name IN (?)",
+            "INSERT INTO t VALUES (1, 'a'), (2, 'b'), (3, 'c')":
+                "INSERT INTO t VALUES (?), ...",
+            "SELECT 'it''s', 'a\\'b'  FROM\n  t":
+                "SELECT ?, ? FROM t",
+            "SELECT col2 FROM tab1":
+                "SELECT col2 FROM tab1",
+        }
+        for query, shape in cases.items():
+            with self.subTest(query):
+                self.assertEqual(profiler.statement_shape(query), shape)
+
+    def test_same_shape_for_different_values(self):
+        self.assertEqual(profiler.statement_shape("DELETE FROM t WHERE name IN ('a')"),
+                         profiler.statement_shape("DELETE FROM t WHERE name IN ('b', 'c', 'd')"))
+
+
+class TestQueryProfiler(SqliteTestCase):
+    def test_statements_and_phases(self):
+        seed_company(backend, 'Profile Co', 'PR', build_chart(20))
+        original_sql = db.sql
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'profile.json')
+            with contextlib.redirect_stdout(io.StringIO()):
+                with profiler.QueryProfiler(output):
+                    for i in range(3):
+                        db.sql("SELECT name FROM `tabAccount` WHERE lft > %s", (i,))
+                    profiler.profile_phase('resolve')
+                    db.sql("SELECT COUNT(*) FROM `tabAccount`")
+            with open(output) as f:
+                report = json.load(f)
+
+        self.assertIs(db.sql, original_sql)
+        self.assertEqual(report['queries'], 4)
+        self.assertEqual({phase: stats['queries'] for phase, stats in report['phases'].items()},
+                         {'resolve': 3, 'other': 1})
+        statements = {s['shape']: s for s in report['statements']}
+        self.assertEqual(statements['SELECT name FROM `tabAccount` WHERE lft > ?']['count'], 3)
+        self.assertEqual(statements['SELECT name FROM `tabAccount` WHERE lft > ?']['rows'], 20 + 19 + 18)
+
+    def test_profile_phase_without_profiler_is_a_no_op(self):
+        profiler.profile_phase('plan')
+
+    def test_company_runs_merge_into_one_report(self):
+        seed_company(backend, 'Profile Co', 'PR', build_chart(20))
+        method = 'dm_erpnext_utilities.commands.account_manager.find_children_recursive'
+        results = [parallel.run_company(method, 'Profile Co', {'account_name': 'Assets - PR'}, profile=True)
+                   for _ in range(2)]
+        self.assertTrue(all(result['ok'] for result in results))
+        # Quiet: nothing printed into the company's output
+        self.assertEqual([result['output'] for result in results], ['', ''])
+
+        with contextlib.redirect_stdout(io.StringIO()) as printed:
+            with profiler.QueryProfiler() as parent:
+                for result in results:
+                    parent.merge(result['profile'])
+        report = parent.report()
+        single = sum(stats['count'] for stats in results[0]['profile']['shapes'].values())
+        self.assertEqual((report['workers'], report['queries']), (2, 2 * single))
+        self.assertIn('2 company run(s) merged', printed.getvalue())
+        self.assertNotIn('profile', parallel.run_company(method, 'Profile Co', {'account_name': 'Assets - PR'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
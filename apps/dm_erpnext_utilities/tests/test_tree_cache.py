@@ -0,0 +1,66 @@
+import unittest
+
+from stand_in import SqliteTestCase, backend, build_chart, load_command_module, seed_company
+
+tree_cache = load_command_module('tree_cache')
+
+
+class TestTreeCacheInvalidation(SqliteTestCase):
+    def setUp(self):
+        super().setUp()
+        seed_company(backend, 'Cache A', 'CA', build_chart(12))
+        seed_company(backend, 'Cache B', 'CB', build_chart(12))
+        tree_cache._trees.clear()
+
+    def version(self, company):
+        return tree_cache._current_version(backend.cache(), company)
+
+    def insert(self, account_name, company, abbr):
+        doc = backend.get_doc({'doctype': 'Account', 'account_name': account_name, 'company': company,
+                               'parent_account': f'Assets - {abbr}', 'account_number': None,
+                               'account_type': None, 'root_type': None, 'is_group': 0}).insert()
+        tree_cache.on_account_change(doc, 'after_insert')
+        return doc
+
+    def test_one_callback_per_transaction(self):
+        tree_cache.get_company_tree('Cache A')
+        for i in range(20):
+            self.insert(f'New {i}', 'Cache A', 'CA')
+        self.assertEqual(len(backend.after_commit.functions), 1)
+        self.assertEqual(len(backend.after_rollback.functions), 1)
+
+        backend.commit()
+        self.assertEqual((backend.after_commit.functions, backend.after_rollback.functions), ([], []))
+        self.assertIn('New 19 - CA', tree_cache.get_company_tree('Cache A'))
+
+        # The next transaction registers its own callback
+        self.insert('New 20', 'Cache A', 'CA')
+        self.assertEqual(len(backend.after_commit.functions), 1)
+
+    def test_insert_keeps_other_companies_snapshots(self):
+        tree_b = tree_cache.get_company_tree('Cache B')
+        version_b = self.version('Cache B')
+        version_a = self.version('Cache A')
+
+        self.insert('New', 'Cache A', 'CA')
+        backend.commit()
+        self.assertEqual(self.version('Cache B'), version_b)
+        self.assertIs(tree_cache.get_company_tree('Cache B'), tree_b)
+        self.assertNotEqual(self.version('Cache A'), version_a)
+
+    def test_rollback_drops_what_the_transaction_cached(self):
+        self.insert('Ghost', 'Cache A', 'CA')
+        self.assertIn('Ghost - CA', tree_cache.get_company_tree('Cache A'))
+        backend.rollback()
+        self.assertNotIn('Ghost - CA', tree_cache.get_company_tree('Cache A'))
+
+    def test_set_based_write_drops_every_company(self):
+        version_b = self.version('Cache B')
+        tree_cache.invalidate_company_trees('Cache A')
+        tree_cache.invalidate_company_trees()
+        backend.commit()
+        self.assertNotEqual(self.version('Cache B'), version_b)
+
+
+if __name__ == '__main__':
+    unittest.main()
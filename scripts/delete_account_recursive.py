@@ -17,26 +17,69 @@ import os
 import argparse
 
 def find_children_recursive(account_name, company):
-    """Encontra todos os filhos de uma conta recursivamente."""
+    """
+    Encontra todos os filhos de uma conta recursivamente.
+    
+    Carrega a subárvore inteira em uma única consulta usando os limites
+    do nested set (lft/rgt). Ordenar por rgt devolve os filhos antes dos
+    pais, a mesma ordem da versão recursiva.
+    """
     import frappe
     
-    children = []
+    bounds = frappe.db.get_value('Account', account_name, ['lft', 'rgt'], as_dict=True)
+    if not bounds:
+        return []
+    
+    if not bounds.lft or not bounds.rgt or bounds.rgt <= bounds.lft:
+        return find_children_in_memory(account_name, company)
     
-    # Buscar filhos diretos
-    direct_children = frappe.get_all('Account',
+    return frappe.get_all('Account',
         filters={
-            'parent_account': account_name,
-            'company': company
+            'company': company,
+            'lft': ['>', bounds.lft],
+            'rgt': ['<', bounds.rgt]
         },
-        fields=['name', 'account_name', 'is_group']
+        fields=['name', 'account_name', 'is_group'],
+        order_by='rgt asc'
     )
+
+
+def find_children_in_memory(account_name, company):
+    """
+    Encontra os filhos a partir de uma única consulta de toda a empresa.
     
-    for child in direct_children:
-        # Primeiro adiciona os netos (recursão)
-        grandchildren = find_children_recursive(child.name, company)
-        children.extend(grandchildren)
-        # Depois adiciona o filho
-        children.append(child)
+    Usado quando lft/rgt não são confiáveis (rebuild pendente).
+    """
+    import frappe
+    
+    accounts = frappe.get_all('Account',
+        filters={'company': company},
+        fields=['name', 'account_name', 'is_group', 'parent_account'],
+        order_by='lft asc'
+    )
+    
+    children_index = {}
+    for account in accounts:
+        if account.parent_account:
+            children_index.setdefault(account.parent_account, []).append(account)
+    
+    # Percurso pós-ordem iterativo: filhos antes dos pais
+    children = []
+    visited = {account_name}
+    path = []
+    stack = [iter(children_index.get(account_name, ()))]
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+            if path:
+                children.append(path.pop())
+            continue
+        if child.name in visited:
+            continue
+        visited.add(child.name)
+        path.append(child)
+        stack.append(iter(children_index.get(child.name, ())))
     
     return children
 
@@ -7,6 +7,10 @@
 # This script copies custom Chart of Accounts templates from the local
 # workspace to the ERPNext container's verified templates directory.
 #
+# Only needed on sites without the dm_erpnext_utilities app: with the app
+# installed, the templates in its charts/ directory are listed and applied
+# by the app itself (see "Chart Templates" in the app README).
+#
 # Usage:
 #   ./copy_templates_to_container.sh [CONTAINER_NAME] [--clear-cache]
 #
@@ -60,7 +64,7 @@ done
 # Paths
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 PROJECT_ROOT="$(cd "${SCRIPT_DIR}/../.." && pwd)"
-TEMPLATES_SOURCE="${PROJECT_ROOT}/templates/account"
+TEMPLATES_SOURCE="${PROJECT_ROOT}/apps/dm_erpnext_utilities/dm_erpnext_utilities/charts"
 CONTAINER_TARGET_DIR="/home/frappe/frappe-bench/apps/erpnext/erpnext/accounts/doctype/account/chart_of_accounts/verified"
 
 echo -e "${BLUE}═══════════════════════════════════════════════════════════${NC}"
@@ -97,11 +101,7 @@ TEMPLATE_COUNT=0
 # Function to copy templates for a country
 copy_country_templates() {
     local country_code="$1"
-    local country_dir="${TEMPLATES_SOURCE}/${country_code}"
-    
-    if [ ! -d "${country_dir}" ]; then
-        return
-    fi
+    local country_dir="${TEMPLATES_SOURCE}"
     
     echo -e "${YELLOW}→${NC} Processing templates for country: ${country_code}"
     
@@ -126,7 +126,7 @@ copy_country_templates() {
             docker exec --user root "${CONTAINER_NAME}" chown frappe:frappe "${target_file}"
             docker exec --user root "${CONTAINER_NAME}" chmod 644 "${target_file}"
             echo -e "  ${GREEN}✓${NC} Deployed: ${filename}"
-            ((TEMPLATE_COUNT++))
+            TEMPLATE_COUNT=$((TEMPLATE_COUNT + 1))
         else
             echo -e "  ${RED}✗${NC} Failed to copy: ${filename}"
             exit 1
@@ -140,15 +140,9 @@ echo -e "${BLUE} Chart of Accounts Templates${NC}"
 echo -e "${BLUE}──────────────────────────────────────────────────────────${NC}"
 echo ""
 
-# Find all country directories (two-letter codes)
-for country_dir in "${TEMPLATES_SOURCE}"/*; do
-    if [ -d "${country_dir}" ]; then
-        country_code=$(basename "${country_dir}")
-        # Only process if it looks like a country code (2 letters)
-        if [[ "${country_code}" =~ ^[a-z]{2}$ ]]; then
-            copy_country_templates "${country_code}"
-        fi
-    fi
+# Country codes from the file names ({country_code}_{identifier}.json)
+for country_code in $(find "${TEMPLATES_SOURCE}" -maxdepth 1 -name '[a-z][a-z]_*.json' -type f -printf '%f\n' | cut -c1-2 | sort -u); do
+    copy_country_templates "${country_code}"
 done
 
 echo ""